@@ -0,0 +1,85 @@
+"""Memory per message for large sessions.
+
+Compares the in-memory footprint of a loaded 10k-message session against the
+previous representation (a plain dataclass per message plus the parallel list
+of ``{"role", "content"}`` dicts built for the provider on every request).
+
+Run: ``PYTHONPATH=src python benchmarks/bench_message_memory.py [--messages N]``
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+from ai_tutor.services.session_store import ChatMessage, SessionStore
+
+
+@dataclass
+class _LegacyChatMessage:
+    role: str
+    content: str
+
+
+def _measure(build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        obj = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del obj
+    return current
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--content-chars", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(base_dir=tmp, append_log=True, cache_size=0, compact_threshold=1 << 40)
+        session = store.create_session(subject="Benchmark", goal=None)
+        body = "x" * args.content_chars
+        store.append_messages(
+            session.session_id,
+            [ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"{i} {body}") for i in range(args.messages)],
+        )
+        raw_lines = (store.sessions_dir / f"{session.session_id}.jsonl").read_text(encoding="utf-8").splitlines()
+
+        def legacy() -> object:
+            messages = [_LegacyChatMessage(**json.loads(line)) for line in raw_lines]
+            payload = [{"role": m.role, "content": m.content} for m in messages]
+            return messages, payload
+
+        def current() -> object:
+            loaded = store.load_session(session.session_id)
+            return loaded, loaded.view()
+
+        # Content strings dominate both; report them separately so the per-message overhead is visible
+        content_bytes = _measure(lambda: [json.loads(line)["content"] for line in raw_lines])
+        legacy_bytes = _measure(legacy)
+        current_bytes = _measure(current)
+
+    n = args.messages
+    report = {
+        "messages": n,
+        "content_bytes_per_message": round(content_bytes / n, 1),
+        "legacy_bytes_per_message": round(legacy_bytes / n, 1),
+        "current_bytes_per_message": round(current_bytes / n, 1),
+        "legacy_overhead_per_message": round((legacy_bytes - content_bytes) / n, 1),
+        "current_overhead_per_message": round((current_bytes - content_bytes) / n, 1),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,252 @@
+"""Storage-layer latency and throughput at production scale.
+
+Builds synthetic corpora in a temporary directory (session counts, sessions of
+10-5000 messages, quiz results) and times the store operations the app calls
+on every page load or turn: ``load_session``, ``append_message``,
+``list_sessions``, ``find_session_by_subject_goal``, ``QuizStore.list_results``
+and ``save_quiz``. Each benchmark reports ops/sec, p50/p99 latency and the
+process's peak RSS so far. The JSON report (with the git commit) is written to
+``--output`` so runs can be diffed between commits.
+
+Run: ``PYTHONPATH=src python benchmarks/bench_storage.py [--sessions 1000,10000,100000]
+[--messages 10,500,5000] [--results 100000] [--backend json|sqlite] [--output FILE]``
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from ai_tutor.services.quiz_store import QuizStore
+from ai_tutor.services.session_store import ChatMessage, SessionStore
+from ai_tutor.services.session_store_sqlite import SqliteSessionStore
+
+
+_SUBJECTS = ["Math", "Physics", "Chemistry", "Biology", "History", "Geography", "English", "Music"]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _time(name: str, fn: Callable[[int], object], samples: int, **labels: object) -> Dict:
+    latencies: List[float] = []
+    for i in range(samples):
+        started = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - started)
+    ordered = sorted(latencies)
+    result = {
+        "name": name,
+        **labels,
+        "samples": samples,
+        "ops_per_sec": round(samples / sum(latencies), 1) if sum(latencies) else None,
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    print(json.dumps(result), flush=True)
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _open_store(backend: str, base_dir: Path, cache_size: int = 64):
+    if backend == "sqlite":
+        return SqliteSessionStore(base_dir=base_dir)
+    return SessionStore(base_dir=base_dir, append_log=True, cache_size=cache_size)
+
+
+def _message(i: int, body: str) -> ChatMessage:
+    return ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"{i} {body}")
+
+
+def bench_session_counts(args, base_dir: Path, rng: random.Random) -> List[Dict]:
+    """list_sessions and find_session_by_subject_goal as the number of sessions grows."""
+    store = _open_store(args.backend, base_dir)
+    results: List[Dict] = []
+    pairs: List[tuple] = []
+    for tier in sorted(args.sessions):
+        started = time.perf_counter()
+        while len(pairs) < tier:
+            subject, goal = rng.choice(_SUBJECTS), f"goal {len(pairs)}"
+            store.create_session(subject, goal)
+            pairs.append((subject, goal))
+        print(f"# built {tier} sessions in {time.perf_counter() - started:.1f}s", file=sys.stderr, flush=True)
+        results.append(_time("list_sessions", lambda i: store.list_sessions(limit=50), args.samples, sessions=tier, limit=50))
+        results.append(
+            _time("list_sessions", lambda i: store.list_sessions(), max(args.samples // 10, 3), sessions=tier, limit=None)
+        )
+        results.append(
+            _time(
+                "find_session_by_subject_goal",
+                lambda i: store.find_session_by_subject_goal(*pairs[rng.randrange(len(pairs))]),
+                args.samples,
+                sessions=tier,
+                outcome="hit",
+            )
+        )
+        results.append(
+            _time(
+                "find_session_by_subject_goal",
+                lambda i: store.find_session_by_subject_goal("Math", f"missing {i}"),
+                args.samples,
+                sessions=tier,
+                outcome="miss",
+            )
+        )
+    return results
+
+
+def bench_message_counts(args, base_dir: Path) -> List[Dict]:
+    """load_session (cold and cached) and append_message on sessions of growing length."""
+    store = _open_store(args.backend, base_dir)
+    cold = _open_store(args.backend, base_dir, cache_size=0)
+    body = "x" * args.content_chars
+    results: List[Dict] = []
+    for count in sorted(args.messages):
+        session = store.create_session("Benchmark", f"{count} messages")
+        store.append_messages(session.session_id, [_message(i, body) for i in range(count)])
+        sid = session.session_id
+        results.append(_time("load_session", lambda i: cold.load_session(sid), args.samples, messages=count, cache="cold"))
+        if args.backend == "json":
+            results.append(
+                _time("load_session", lambda i: store.load_session(sid), args.samples, messages=count, cache="warm")
+            )
+        results.append(
+            _time("append_message", lambda i: store.append_message(sid, _message(count + i, body)), args.samples, messages=count)
+        )
+    return results
+
+
+def _write_results(quiz_dir: Path, total: int, per_session: int) -> List[str]:
+    # Written directly in QuizStore's per-session layout: save_result fsyncs every file and
+    # updates analytics, which would make building 100k results dominate the run
+    results_dir = quiz_dir / "quiz_results"
+    results_dir.mkdir(parents=True, exist_ok=True)
+    (results_dir / ".per_session_layout").write_text("1\n", encoding="utf-8")
+    session_ids: List[str] = []
+    for n in range(total):
+        sid = f"s{n // per_session:06d}"
+        if n % per_session == 0:
+            (results_dir / sid).mkdir()
+            session_ids.append(sid)
+        payload = {
+            "session_id": sid,
+            "quiz_id": f"q{n:07d}",
+            "topic": _SUBJECTS[n % len(_SUBJECTS)],
+            "total_questions": 5,
+            "correct_answers": n % 6,
+            "selected_indices": [0, 1, 2, 3, 0],
+            "incorrect_indices": [1, 3],
+            "difficulty": "medium",
+            "learner_id": sid,
+            "saved_at": 1_700_000_000 + n,
+        }
+        (results_dir / sid / f"q{n:07d}.json").write_text(json.dumps(payload), encoding="utf-8")
+    return session_ids
+
+
+def bench_quiz_store(args, base_dir: Path, rng: random.Random) -> List[Dict]:
+    started = time.perf_counter()
+    session_ids = _write_results(base_dir, args.results, args.results_per_session)
+    print(f"# built {args.results} quiz results in {time.perf_counter() - started:.1f}s", file=sys.stderr, flush=True)
+    store = QuizStore(base_dir=base_dir, enable_analytics=False)
+    quiz = {
+        "quiz_id": "q",
+        "subject": "Math",
+        "topic": "Fractions",
+        "difficulty": "medium",
+        "questions": [
+            {"question": f"Question {i}?", "options": ["a", "b", "c", "d"], "correct_index": i % 4, "explanation": "..."}
+            for i in range(5)
+        ],
+    }
+    return [
+        _time(
+            "list_results",
+            lambda i: store.list_results(rng.choice(session_ids)),
+            args.samples,
+            results=args.results,
+            scope="session",
+        ),
+        _time("list_results", lambda i: store.list_results(), 3, results=args.results, scope="all"),
+        _time("save_quiz", lambda i: store.save_quiz("bench", f"quiz{i}", quiz), args.samples),
+    ]
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--sessions", type=_int_list, default=[1_000, 10_000, 100_000], help="Comma-separated corpus sizes")
+    parser.add_argument("--messages", type=_int_list, default=[10, 500, 5_000], help="Comma-separated session lengths")
+    parser.add_argument("--results", type=int, default=100_000)
+    parser.add_argument("--results-per-session", type=int, default=100)
+    parser.add_argument("--content-chars", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None, help="Build corpora here instead of a temp directory")
+    parser.add_argument("--output", default="bench_storage.json")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(dir=args.data_dir) as tmp:
+        root = Path(tmp)
+        benchmarks = bench_session_counts(args, root / "sessions", rng)
+        benchmarks += bench_message_counts(args, root / "messages")
+        benchmarks += bench_quiz_store(args, root / "quizzes", rng)
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "backend": args.backend,
+        "params": {
+            "sessions": args.sessions,
+            "messages": args.messages,
+            "results": args.results,
+            "results_per_session": args.results_per_session,
+            "content_chars": args.content_chars,
+            "samples": args.samples,
+            "seed": args.seed,
+        },
+        "peak_rss_mb": _peak_rss_mb(),
+        "benchmarks": benchmarks,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"# wrote {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
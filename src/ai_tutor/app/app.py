@@ -14,12 +14,13 @@ if str(_SRC_DIR) not in sys.path:
     sys.path.insert(0, str(_SRC_DIR))
 
 from ai_tutor.graph.lang_tutor import LangTutorGraph
+from ai_tutor.services.jobs import JobExecutor
 from ai_tutor.llm.providers import is_llm_configured
+from ai_tutor.services.metrics import start_metrics_server
 from ai_tutor.services.session_store import ChatMessage, SessionStore
+from ai_tutor.services.session_store_sqlite import SqliteSessionStore
 from ai_tutor.services.web_search import is_tavily_configured
-from ai_tutor.services.quiz import generate_mcq_quiz
 from ai_tutor.services.quiz_store import QuizResult, QuizStore
-from ai_tutor.services.remediation import generate_remediation
 from ai_tutor.app.i18n import t, get_lang_code, popular_subjects_for_lang, difficulty_display_and_map
 from ai_tutor.services.voice import ensure_wav_mono_16k, transcribe_wav_to_text
 
@@ -54,6 +55,9 @@ def _reset_quiz_ui_state() -> None:
                 pass
     st.session_state.pop("active_quiz_id", None)
     st.session_state.pop("active_quiz", None)
+    st.session_state.pop("active_lesson", None)
+    st.session_state.pop("quiz_job_id", None)
+    st.session_state.pop("lesson_job_id", None)
 
 
 load_dotenv()  # load .env for local runs (Docker uses env_file)
@@ -61,9 +65,42 @@ _init_state()
 
 st.set_page_config(page_title="AI Tutor", page_icon="🎓", layout="wide")
 
-store = SessionStore()
+@st.cache_resource
+def _get_session_store():
+    # Shared across reruns so the store's in-process session cache survives between them.
+    # SESSION_BACKEND=sqlite switches to the single-database store (run its "migrate" command first)
+    if os.getenv("SESSION_BACKEND", "").lower() == "sqlite":
+        return SqliteSessionStore()
+    return SessionStore(append_log=True)
+
+
+@st.cache_resource
+def _get_quiz_store() -> QuizStore:
+    # Shared across reruns so the analytics arrays are loaded once per process
+    return QuizStore()
+
+
+@st.cache_resource
+def _get_job_executor() -> JobExecutor:
+    # Quiz and lesson generation run here so the page stays responsive; SPECULATIVE_GENERATION=on
+    # also pre-generates the next quiz after each turn and the lesson after each graded quiz
+    return JobExecutor(_get_quiz_store())
+
+
+@st.cache_resource
+def _start_metrics_endpoint():
+    # METRICS_PORT exposes /metrics (Prometheus text) and /metrics.json for scraping
+    port = os.getenv("METRICS_PORT", "").strip()
+    if not port:
+        return None
+    return start_metrics_server(int(port), host=os.getenv("METRICS_HOST", "127.0.0.1"))
+
+
+_start_metrics_endpoint()
+store = _get_session_store()
 lang_graph = LangTutorGraph(store=store)
-quiz_store = QuizStore()
+quiz_store = _get_quiz_store()
+jobs = _get_job_executor()
 
 with st.sidebar:
     # Language selector first, so the rest of the UI reflects the latest choice in the same rerun
@@ -174,39 +211,120 @@ if not is_llm_configured():
     st.warning(t(lang_code, "llm_not_configured"), icon="⚠️")
 
 
+# Number of most recent messages rendered initially and per "load earlier" click
+CHAT_PAGE_SIZE = 30
+
+
+def _current_subject() -> str:
+    if st.session_state.subject_choice == t(lang_code, "subject_custom_option"):
+        return st.session_state.subject_custom
+    return st.session_state.subject_choice
+
+
+def _speculate_next_quiz(session_id: str) -> None:
+    # Uses the quiz settings from the last render (or their defaults)
+    try:
+        jobs.speculate_quiz(
+            store.load_session(session_id),
+            topic=st.session_state.get("quiz_topic") or _current_subject(),
+            num_questions=int(st.session_state.get("quiz_num", 5)),
+            difficulty=st.session_state.get("quiz_difficulty", "medium"),
+        )
+    except Exception:
+        pass
+
+
+def _render_question(idx: int, q: dict) -> None:
+    st.subheader(f"Q{idx}. {q['question']}")
+    options = q.get("options", [])
+    widget_key = f"quiz_{st.session_state.session_id}_q_{idx}"
+    choice = st.radio(t(lang_code, "select_answer_for", idx=idx), options, index=None, key=widget_key, horizontal=False)
+    if choice is not None:
+        sel_index = options.index(choice)
+        if sel_index == q.get("correct_index", -1):
+            st.success(t(lang_code, "correct") + q.get("explanation", ""))
+        else:
+            st.error(t(lang_code, "incorrect_prefix") + f"{options[q.get('correct_index', 0)]}\n\n{q.get('explanation','')}")
+
+
+@st.fragment(run_every=1.0)
+def _poll_job(state_key: str, label: str) -> None:
+    # Reruns on its own every second until the job finishes, then refreshes the page once.
+    # Quiz questions are shown (and can be answered) as soon as they are streamed in.
+    job_id = st.session_state.get(state_key)
+    job = jobs.get(job_id) if job_id else None
+    if job is None or job.finished:
+        st.rerun(scope="app")
+    for idx, q in enumerate(job.partial, start=1):
+        _render_question(idx, q)
+    st.caption("⏳ " + label)
+
+
+def _finished_job(state_key: str, label: str):
+    """The job in ``state_key`` once it has finished (cleared from state); None while it runs."""
+    job_id = st.session_state.get(state_key)
+    if not job_id:
+        return None
+    job = jobs.get(job_id)
+    if job is not None and not job.finished:
+        _poll_job(state_key, label)
+        return None
+    st.session_state.pop(state_key, None)
+    if job is None or job.status != "done":
+        st.error(job.error if job is not None and job.error else t(lang_code, "job_failed"))
+        return None
+    return job
+
+
 def render_chat(session_id: str) -> None:
-    session = store.load_session(session_id)
+    if st.session_state.get("chat_window_session") != session_id:
+        st.session_state.chat_window_session = session_id
+        st.session_state.chat_window = CHAT_PAGE_SIZE
     # Apply pending actions before rendering any widgets
-    if st.session_state.get("_to_send"):
-        pending_text = st.session_state.pop("_to_send", "").strip()
-        if pending_text:
-            with st.spinner("Thinking..."):
-                try:
-                    _ = lang_graph.continue_session(
-                        session_id=session_id,
-                        user_message=pending_text,
-                        enable_web_search=st.session_state.enable_web_search,
-                    )
-                except Exception as exc:
-                    st.error(str(exc))
-                else:
-                    st.session_state["_clear_compose"] = True
-            session = store.load_session(session_id)
+    pending_text = st.session_state.pop("_to_send", "").strip() if st.session_state.get("_to_send") else ""
 
     if st.session_state.get("_append_transcript"):
         transcript = st.session_state.pop("_append_transcript", "")
         current = st.session_state.get("compose_text", "")
         st.session_state["compose_text"] = (current + " " + transcript).strip()
 
-    if st.session_state.get("_clear_compose"):
-        st.session_state.pop("_clear_compose", None)
-        st.session_state["compose_text"] = ""
-    for msg in session.messages:
+    # Render only the most recent window; fetch one extra to know whether older messages exist
+    window = int(st.session_state.chat_window)
+    recent = store.load_tail(session_id, window + 1)
+    if len(recent) > window:
+        recent = recent[1:]
+        if st.button(t(lang_code, "load_earlier_messages"), key="btn_load_earlier"):
+            st.session_state.chat_window = window + CHAT_PAGE_SIZE
+            st.rerun()
+    for msg in recent:
         if msg.role == "system":
             continue
         with st.chat_message(msg.role):
             st.markdown(msg.content)
 
+    # Stream the reply to a just-sent message below the history; the turn is stored once complete
+    if pending_text:
+        with st.chat_message("user"):
+            st.markdown(pending_text)
+        with st.chat_message("assistant"):
+            try:
+                st.write_stream(
+                    lang_graph.stream_session(
+                        session_id=session_id,
+                        user_message=pending_text,
+                        enable_web_search=st.session_state.enable_web_search,
+                    )
+                )
+            except Exception as exc:
+                st.error(str(exc))
+            else:
+                st.session_state["_clear_compose"] = True
+                _speculate_next_quiz(session_id)
+
+    if st.session_state.get("_clear_compose"):
+        st.session_state.pop("_clear_compose", None)
+        st.session_state["compose_text"] = ""
+
     # Compose bar: text + mic/cancel/confirm + send
     try:
         from audio_recorder_streamlit import audio_recorder  # type: ignore
@@ -313,12 +431,7 @@ if st.session_state.session_id:
     with st.expander(t(lang_code, "generate_mcq_quiz")):
         col1, col2, col3 = st.columns([2, 1, 1])
         with col1:
-            current_subject = (
-                st.session_state.subject_custom
-                if st.session_state.subject_choice == t(lang_code, "subject_custom_option")
-                else st.session_state.subject_choice
-            )
-            topic = current_subject
+            topic = _current_subject()
             st.text_input(t(lang_code, "topic"), value=topic, key="quiz_topic")
         with col2:
             num = st.number_input(t(lang_code, "questions"), min_value=3, max_value=10, value=5, step=1, key="quiz_num")
@@ -327,35 +440,33 @@ if st.session_state.session_id:
             display_choice = st.selectbox(t(lang_code, "difficulty"), display_levels, index=1, key="quiz_difficulty_display")
             st.session_state.quiz_difficulty = level_map[display_choice]
 
-        # Create a new quiz
+        # Create a new quiz in the background (instant when a speculative one is ready)
         if st.button(t(lang_code, "create_quiz"), type="primary"):
-            with st.spinner("Generating quiz..."):
-                try:
-                    session = store.load_session(st.session_state.session_id)
-                    quiz = generate_mcq_quiz(
-                        subject=session.subject,
-                        topic=st.session_state.quiz_topic,
-                        conversation_messages=[{"role": m.role, "content": m.content} for m in session.messages],
-                        num_questions=int(st.session_state.quiz_num),
-                        difficulty=st.session_state.quiz_difficulty,
-                    )
-                except Exception as exc:
-                    st.error(str(exc))
-                else:
-                    payload = quiz.model_dump()
-                    # persist quiz JSON for review later and keep in session for rerender
-                    quiz_store.save_quiz(
-                        session_id=session.session_id,
-                        quiz_id=quiz.quiz_id,
-                        payload=payload,
-                    )
-                    st.session_state["active_quiz_id"] = quiz.quiz_id
-                    st.session_state["active_quiz"] = payload
-                    # Inform user if topic was ignored
-                    meta = payload.get("meta") if isinstance(payload, dict) else None
-                    if meta and not meta.get("topic_used", True):
-                        reason = meta.get("ignored_reason") or "The topic appeared irrelevant to the session context."
-                        st.warning(t(lang_code, "topic_ignored", reason=reason))
+            try:
+                session = store.load_session(st.session_state.session_id)
+                st.session_state["quiz_job_id"] = jobs.submit_quiz(
+                    session,
+                    topic=st.session_state.quiz_topic,
+                    num_questions=int(st.session_state.quiz_num),
+                    difficulty=st.session_state.quiz_difficulty,
+                )
+                # The new quiz streams in place of the previous one
+                st.session_state.pop("active_quiz", None)
+                st.session_state.pop("active_quiz_id", None)
+            except Exception as exc:
+                st.error(str(exc))
+        quiz_job = _finished_job("quiz_job_id", t(lang_code, "generating_quiz"))
+        if quiz_job is not None:
+            # The quiz JSON was persisted by the job; keep it in session for rerender
+            payload = quiz_store.load_quiz(session_id=quiz_job.session_id, quiz_id=quiz_job.result["quiz_id"])
+            st.session_state["active_quiz_id"] = payload["quiz_id"]
+            st.session_state["active_quiz"] = payload
+            st.session_state.pop("active_lesson", None)
+            # Inform user if topic was ignored
+            meta = payload.get("meta") if isinstance(payload, dict) else None
+            if meta and not meta.get("topic_used", True):
+                reason = meta.get("ignored_reason") or "The topic appeared irrelevant to the session context."
+                st.warning(t(lang_code, "topic_ignored", reason=reason))
 
         # Render active quiz (persisted across reruns)
         active_quiz = st.session_state.get("active_quiz")
@@ -370,16 +481,7 @@ if st.session_state.session_id:
 
         if active_quiz:
             for idx, q in enumerate(active_quiz.get("questions", []), start=1):
-                st.subheader(f"Q{idx}. {q['question']}")
-                options = q.get("options", [])
-                widget_key = f"quiz_{st.session_state.session_id}_q_{idx}"
-                choice = st.radio(t(lang_code, "select_answer_for", idx=idx), options, index=None, key=widget_key, horizontal=False)
-                if choice is not None:
-                    sel_index = options.index(choice)
-                    if sel_index == q.get("correct_index", -1):
-                        st.success(t(lang_code, "correct") + q.get("explanation", ""))
-                    else:
-                        st.error(t(lang_code, "incorrect_prefix") + f"{options[q.get('correct_index', 0)]}\n\n{q.get('explanation','')}")
+                _render_question(idx, q)
             # Scoring (computed on demand)
             if st.button(t(lang_code, "submit_answers"), type="secondary"):
                 total = len(active_quiz.get("questions", []))
@@ -405,8 +507,10 @@ if st.session_state.session_id:
                             correct_answers=correct,
                             selected_indices=selected_indices,
                             incorrect_indices=incorrect,
+                            difficulty=active_quiz.get("difficulty", "medium"),
                         )
                     )
+                    jobs.speculate_remediation(session, active_quiz, incorrect)
                 except Exception:
                     pass
 
@@ -414,27 +518,23 @@ if st.session_state.session_id:
                 try:
                     session = store.load_session(st.session_state.session_id)
                     # Load latest result for this active quiz if available
-                    result_files = quiz_store.list_results(session_id=session.session_id)
-                    latest = None
-                    for r in reversed(result_files):
-                        if r.get("quiz_id") == active_quiz.get("quiz_id"):
-                            latest = r
-                            break
+                    latest = quiz_store.latest_result(session.session_id, active_quiz.get("quiz_id", ""))
                     incorrect = latest.get("incorrect_indices", []) if latest else []
                     if not incorrect:
                         st.info("No incorrect answers recorded yet. Submit answers first.")
                     else:
-                        lesson = generate_remediation(
-                            subject=session.subject,
-                            topic=active_quiz.get("topic", ""),
-                            quiz=active_quiz,
-                            incorrect_indices=incorrect,
-                            language=getattr(session, "language", "en"),
-                        )
-                        st.markdown("### " + t(lang_code, "personalized_lesson"))
-                        st.markdown(lesson)
+                        st.session_state["lesson_job_id"] = jobs.submit_remediation(session, active_quiz, incorrect)
                 except Exception as exc:
                     st.error(str(exc))
+            lesson_job = _finished_job("lesson_job_id", t(lang_code, "generating_lesson"))
+            if lesson_job is not None:
+                saved = quiz_store.load_lesson(
+                    lesson_job.session_id, lesson_job.result["quiz_id"], lesson_job.result.get("incorrect_indices", [])
+                )
+                st.session_state["active_lesson"] = saved.get("lesson", "") if saved else ""
+            if st.session_state.get("active_lesson"):
+                st.markdown("### " + t(lang_code, "personalized_lesson"))
+                st.markdown(st.session_state["active_lesson"])
 
     st.markdown("---")
     with st.expander(t(lang_code, "past_quiz_results")):
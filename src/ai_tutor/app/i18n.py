@@ -40,6 +40,10 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "correct": "Correct! ",
         "incorrect_prefix": "Incorrect. Correct answer: ",
         "select_answer_for": "Select answer for Q{idx}",
+        "load_earlier_messages": "Load earlier messages",
+        "generating_quiz": "Generating quiz...",
+        "generating_lesson": "Preparing your lesson...",
+        "job_failed": "Generation failed; please try again.",
     },
     "fa": {
         "app_title": "🎓 آموزگار هوشمند",
@@ -77,6 +81,10 @@ TRANSLATIONS: Dict[str, Dict[str, str]] = {
         "correct": "درست! ",
         "incorrect_prefix": "نادرست. پاسخ صحیح: ",
         "select_answer_for": "انتخاب پاسخ برای سوال {idx}",
+        "load_earlier_messages": "نمایش پیام‌های قبلی",
+        "generating_quiz": "در حال ساخت آزمون...",
+        "generating_lesson": "در حال آماده‌سازی درس...",
+        "job_failed": "ساخت انجام نشد؛ لطفاً دوباره تلاش کنید.",
     },
 }
 
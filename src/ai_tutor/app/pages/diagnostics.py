@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hmac
+import json
+import os
+import sys
+from pathlib import Path
+
+import streamlit as st
+from dotenv import load_dotenv
+
+# Ensure project src/ is on sys.path when this page is opened first
+_SRC_DIR = Path(__file__).resolve().parents[3]
+if str(_SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(_SRC_DIR))
+
+from ai_tutor.llm.capabilities import get_capability_cache
+from ai_tutor.llm.resilience import resilience_stats
+from ai_tutor.llm.response_cache import get_response_cache
+from ai_tutor.services.jobs import job_stats
+from ai_tutor.services.limiter import QUEUE_WAIT, limiter_stats
+from ai_tutor.services.metrics import SEARCH_LATENCY, STORE_LATENCY, get_registry, llm_task_summary
+from ai_tutor.services.singleflight import singleflight_stats
+
+
+load_dotenv()
+st.set_page_config(page_title="AI Tutor diagnostics", page_icon="🩺", layout="wide")
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 1)
+
+
+def _latency_rows(rows, keys):
+    return [
+        {**{k: r[k] for k in keys}, "count": r["count"], "p50_ms": _ms(r["p50"]), "p95_ms": _ms(r["p95"]), "p99_ms": _ms(r["p99"])}
+        for r in rows
+    ]
+
+
+# Admin-only: the page is hidden unless ADMIN_PASSWORD is set and entered
+admin_password = os.getenv("ADMIN_PASSWORD", "")
+if not admin_password:
+    st.info("Diagnostics are disabled. Set ADMIN_PASSWORD to enable this page.")
+    st.stop()
+if not st.session_state.get("is_admin"):
+    entered = st.text_input("Admin password", type="password")
+    if not entered:
+        st.stop()
+    if not hmac.compare_digest(entered.encode("utf-8"), admin_password.encode("utf-8")):
+        st.error("Wrong password.")
+        st.stop()
+    st.session_state.is_admin = True
+
+st.title("Diagnostics")
+st.caption("Per-process metrics since the server started; latency quantiles cover the most recent calls.")
+if st.button("Refresh"):
+    st.rerun()
+
+st.subheader("LLM calls")
+llm_rows = [
+    {
+        **{k: r.get(k) for k in ("task", "model", "calls", "errors")},
+        "p50_ms": _ms(r.get("p50")),
+        "p95_ms": _ms(r.get("p95")),
+        "p99_ms": _ms(r.get("p99")),
+        "tokens_per_sec": r.get("tokens_per_sec"),
+    }
+    for r in llm_task_summary()
+]
+if llm_rows:
+    st.dataframe(llm_rows, hide_index=True)
+else:
+    st.caption("No LLM calls yet.")
+
+st.subheader("Web search")
+search_rows = _latency_rows(SEARCH_LATENCY.summary(), ("outcome",))
+if search_rows:
+    st.dataframe(search_rows, hide_index=True)
+else:
+    st.caption("No searches yet.")
+
+st.subheader("Stores")
+store_rows = _latency_rows(STORE_LATENCY.summary(), ("store", "op", "outcome"))
+if store_rows:
+    st.dataframe(sorted(store_rows, key=lambda r: (r["store"], r["op"])), hide_index=True)
+else:
+    st.caption("No store calls yet.")
+
+st.subheader("Queue wait")
+wait_rows = _latency_rows(QUEUE_WAIT.summary(), ("limiter", "priority"))
+if wait_rows:
+    st.dataframe(wait_rows, hide_index=True)
+else:
+    st.caption("No limited calls yet.")
+
+col_a, col_b = st.columns(2)
+with col_a:
+    st.subheader("Resilience")
+    st.json(resilience_stats())
+    st.subheader("Coalesced requests")
+    st.json(singleflight_stats())
+    st.subheader("Upstream limiters")
+    st.json(limiter_stats())
+with col_b:
+    st.subheader("Caches")
+    response_cache = get_response_cache()
+    st.json(
+        {
+            "response_cache": response_cache.stats() if response_cache is not None else "disabled",
+            "capability_cache": get_capability_cache().stats(),
+        }
+    )
+    st.subheader("Background jobs")
+    st.json(job_stats())
+
+registry = get_registry()
+col_c, col_d = st.columns(2)
+with col_c:
+    st.download_button("Download Prometheus text", registry.render_prometheus(), file_name="metrics.txt")
+with col_d:
+    st.download_button("Download JSON", json.dumps(registry.snapshot(), indent=2), file_name="metrics.json")
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+_FILLER = (
+    "Let's think about this step by step. First, recall the key definition and why it matters. "
+    "Next, try a small example on your own and notice the pattern. "
+    "Finally, check your answer against the rule. What do you get?"
+).split()
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub server; every knob maps to a command-line flag."""
+
+    latency_ms: float = 300.0
+    # "fixed", "uniform" (latency_ms +/- jitter_ms) or "lognormal" (median latency_ms, sigma)
+    latency_dist: str = "lognormal"
+    jitter_ms: float = 100.0
+    sigma: float = 0.5
+    tokens_per_sec: float = 50.0
+    reply_tokens: int = 60
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (503,)
+    # Answer 400 to requests carrying max_tokens, like reasoning models do
+    reject_max_tokens: bool = False
+    quiz_payload: Optional[Dict] = None
+    seed: Optional[int] = None
+    transcript: str = "This is a stub transcription."
+
+
+@dataclass
+class _Counters:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    requests: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def hit(self, path: str) -> None:
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+
+def _canned_quiz(subject: str, topic: str, difficulty: str, count: int, focus: str = "") -> Dict:
+    # Shards of a sharded quiz ask for different focuses; keep their questions distinct
+    label = f"{topic} / {focus}" if focus else topic
+    questions = []
+    for i in range(count):
+        questions.append(
+            {
+                "question": f"[{label}] Stub question {i + 1}: which option is correct?",
+                "options": [f"Option {c} for question {i + 1}" for c in "ABCD"],
+                "correct_index": i % 4,
+                "explanation": f"Option {'ABCD'[i % 4]} is correct by construction.",
+            }
+        )
+    return {
+        "subject": subject,
+        "topic": topic,
+        "difficulty": difficulty,
+        "questions": questions,
+        "meta": {"topic_used": True, "ignored_reason": None},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    # ---- helpers ---------------------------------------------------------
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: Dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _maybe_fail(self) -> bool:
+        config = self.server.config
+        if config.error_rate and self.server.random() < config.error_rate:
+            status = self.server.choice(config.error_statuses)
+            with self.server.counters.lock:
+                self.server.counters.errors += 1
+            self._send_json(status, {"error": {"message": f"Injected stub error {status}", "type": "stub_error"}})
+            return True
+        return False
+
+    # ---- routes ----------------------------------------------------------
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        self.server.counters.hit(self.path)
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+        elif self.path.rstrip("/") == "/stats":
+            with self.server.counters.lock:
+                self._send_json(200, {"requests": dict(self.server.counters.requests), "errors": self.server.counters.errors})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self) -> None:  # noqa: N802 - stdlib naming
+        body = self._read_body()
+        path = self.path.rstrip("/")
+        self.server.counters.hit(path)
+        if path == "/v1/chat/completions":
+            self._chat(json.loads(body or b"{}"))
+        elif path == "/v1/audio/transcriptions":
+            if not self._maybe_fail():
+                time.sleep(self.server.latency())
+                self._send_json(200, {"text": self.server.config.transcript})
+        elif path == "/search":
+            self._search(json.loads(body or b"{}"))
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def _chat(self, request: Dict) -> None:
+        config = self.server.config
+        if config.reject_max_tokens and "max_tokens" in request:
+            self._send_json(
+                400,
+                {
+                    "error": {
+                        "message": "Unsupported parameter: 'max_tokens' is not supported with this model. "
+                        "Use 'max_completion_tokens' instead.",
+                        "type": "invalid_request_error",
+                        "param": "max_tokens",
+                    }
+                },
+            )
+            return
+        if self._maybe_fail():
+            return
+        text = self.server.reply_for(request.get("messages", []))
+        tokens = re.findall(r"\S+\s*", text) or [text]
+        model = request.get("model", "stub-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        time.sleep(self.server.latency())
+        if not request.get("stream"):
+            time.sleep(len(tokens) / config.tokens_per_sec if config.tokens_per_sec > 0 else 0)
+            self._send_json(
+                200,
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                    ],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                },
+            )
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: Dict, finish: Optional[str] = None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            self.wfile.write(b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for token in tokens:
+            if config.tokens_per_sec > 0:
+                time.sleep(1.0 / config.tokens_per_sec)
+            event({"content": token})
+        event({}, finish="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _search(self, request: Dict) -> None:
+        if self._maybe_fail():
+            return
+        time.sleep(self.server.latency())
+        query = str(request.get("query", ""))
+        count = int(request.get("max_results", 5))
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-") or "query"
+        results = [
+            {
+                "title": f"Stub result {i + 1} for {query}",
+                "url": f"https://example.org/{slug}/{i + 1}",
+                "content": f"Synthetic search snippet {i + 1} about {query}.",
+                "score": round(1.0 - i * 0.1, 2),
+            }
+            for i in range(count)
+        ]
+        self._send_json(200, {"query": query, "results": results, "response_time": 0.0})
+
+
+class StubServer(ThreadingHTTPServer):
+    """OpenAI- and Tavily-compatible stand-in for offline tests, benchmarks and load tests.
+
+    Serves ``/v1/chat/completions`` (plain and SSE streaming), ``/v1/audio/transcriptions``,
+    ``/v1/models`` and Tavily's ``/search``. Quiz prompts get a canned JSON quiz with the
+    requested number of questions; other prompts get filler tutoring text. ``/stats``
+    reports request and injected-error counts.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _Handler)
+        self.config = config or StubConfig()
+        self.counters = _Counters()
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def random(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+    def choice(self, items: Tuple[int, ...]) -> int:
+        with self._random_lock:
+            return self._random.choice(items)
+
+    def latency(self) -> float:
+        """One latency sample in seconds from the configured distribution."""
+        config = self.config
+        with self._random_lock:
+            if config.latency_dist == "fixed":
+                ms = config.latency_ms
+            elif config.latency_dist == "uniform":
+                ms = self._random.uniform(config.latency_ms - config.jitter_ms, config.latency_ms + config.jitter_ms)
+            else:
+                ms = self._random.lognormvariate(math.log(max(config.latency_ms, 1e-3)), config.sigma)
+        return max(ms, 0.0) / 1000.0
+
+    def reply_for(self, messages: List[Dict]) -> str:
+        system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        user = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+        if "multiple-choice quiz" in system:
+            fields = dict(re.findall(r"(Subject|Topic|Difficulty|Number of questions|Focus): ([^.\n]+)", user))
+            if self.config.quiz_payload is not None:
+                return json.dumps(self.config.quiz_payload, ensure_ascii=False)
+            count = int(fields.get("Number of questions", "5").strip() or 5)
+            quiz = _canned_quiz(
+                fields.get("Subject", "Subject").strip(),
+                fields.get("Topic", "Topic").strip(),
+                fields.get("Difficulty", "medium").strip(),
+                count,
+                fields.get("Focus", "").strip(),
+            )
+            return json.dumps(quiz, ensure_ascii=False)
+        words = [f"(stub reply to: {user[:60]})"] + [
+            _FILLER[i % len(_FILLER)] for i in range(max(self.config.reply_tokens - 1, 0))
+        ]
+        return " ".join(words)
+
+    def start(self) -> str:
+        """Serve in a background thread; returns the base URL."""
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local OpenAI/Tavily stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median time to first token")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Half-width for the uniform distribution")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Shape of the lognormal distribution")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument("--error-status", default="503", help="Comma-separated statuses to inject (e.g. 429,503)")
+    parser.add_argument("--reject-max-tokens", action="store_true")
+    parser.add_argument("--quiz-file", default=None, help="JSON quiz returned for every quiz prompt")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        jitter_ms=args.jitter_ms,
+        sigma=args.sigma,
+        tokens_per_sec=args.tokens_per_sec,
+        reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_status.split(",") if s.strip()),
+        reject_max_tokens=args.reject_max_tokens,
+        quiz_payload=json.loads(Path(args.quiz_file).read_text(encoding="utf-8")) if args.quiz_file else None,
+        seed=args.seed,
+    )
+    server = StubServer(config, host=args.host, port=args.port)
+    print(f"Stub server on {server.base_url} (set AI_TUTOR_STUB_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,52 +1,120 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional, TypedDict
+import asyncio
+from itertools import chain
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, TypedDict
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
 
 from ai_tutor.llm.chain import convert_dict_messages_to_langchain, get_langchain_chat
+from ai_tutor.llm.context import ContextManager, count_tokens, message_tokens
+from ai_tutor.llm.resilience import acall_with_policy, call_with_policy
+from ai_tutor.llm.response_cache import make_cache_key
 from ai_tutor.graph.tutor import build_system_prompt
+from ai_tutor.services.limiter import estimate_tokens, get_limiter
+from ai_tutor.services.metrics import track_llm
 from ai_tutor.services.session_store import ChatMessage, Session, SessionStore
-from ai_tutor.services.web_search import is_tavily_configured, tavily_search
+from ai_tutor.services.singleflight import get_flight_group
+from ai_tutor.services.web_search import atavily_search, is_tavily_configured, tavily_search
 
 
 class TutorState(TypedDict, total=False):
-    messages: List[Dict[str, str]]
+    # Budgeted history: system prompt, rolling summary and recent turns (ending with the new user turn)
+    history: Sequence[Mapping[str, str]]
+    # Messages produced during this run (search notes, assistant reply)
+    new_messages: List[ChatMessage]
     enable_web_search: bool
 
 
+def _search_query(state: TutorState) -> str:
+    return state["history"][-1]["content"] if state.get("history") else ""
+
+
+def _add_findings(state: TutorState, results: List[Dict[str, str]]) -> None:
+    if results:
+        bullets = "\n".join(
+            [f"- {r['title']}: {r['url']}" for r in results if r.get("title") and r.get("url")]
+        )
+        augmentation = (
+            "Relevant web findings (use with caution, verify facts):\n" + bullets
+        )
+        state["new_messages"].append(ChatMessage(role="system", content=augmentation))
+
+
 def node_maybe_search(state: TutorState) -> TutorState:
     if state.get("enable_web_search") and is_tavily_configured():
         try:
-            user_last = state["messages"][-1]["content"] if state.get("messages") else ""
-            results = tavily_search(user_last, max_results=3)
-            if results:
-                bullets = "\n".join(
-                    [f"- {r['title']}: {r['url']}" for r in results if r.get("title") and r.get("url")]
-                )
-                augmentation = (
-                    "Relevant web findings (use with caution, verify facts):\n" + bullets
-                )
-                state["messages"].append({"role": "system", "content": augmentation})
+            _add_findings(state, tavily_search(_search_query(state), max_results=3))
         except Exception:
             pass
     return state
 
 
+async def anode_maybe_search(state: TutorState) -> TutorState:
+    if state.get("enable_web_search") and is_tavily_configured():
+        try:
+            _add_findings(state, await atavily_search(_search_query(state), max_results=3))
+        except Exception:
+            pass
+    return state
+
+
+def _endpoint(chat) -> str:
+    return getattr(chat, "openai_api_base", None) or "llm"
+
+
+def _model_name(chat) -> str:
+    return getattr(chat, "model_name", None) or type(chat).__name__
+
+
+def _record_usage(usage, permit, ai_msg, messages: Sequence[Mapping[str, str]]) -> None:
+    usage.from_langchain(ai_msg)
+    if not usage.completion_tokens and ai_msg.content:
+        # Streamed replies (stream_session) come without usage; count the text instead
+        usage.completion_tokens = count_tokens(ai_msg.content)
+        usage.prompt_tokens = usage.prompt_tokens or sum(message_tokens(m) for m in messages)
+    permit.settle(usage.prompt_tokens + usage.completion_tokens)
+
+
+def _invoke(task: str, chat, messages: Sequence[Mapping[str, str]]):
+    lc_messages = convert_dict_messages_to_langchain(messages)
+    with track_llm(task, _model_name(chat)) as usage, get_limiter("llm").slot(task, estimate_tokens(messages)) as permit:
+        ai_msg = call_with_policy(task, lambda timeout: chat.invoke(lc_messages, timeout=timeout), _endpoint(chat))
+        _record_usage(usage, permit, ai_msg, messages)
+    return ai_msg
+
+
 def node_call_llm(state: TutorState) -> TutorState:
     chat = get_langchain_chat()
-    lc_messages = convert_dict_messages_to_langchain(state["messages"])
-    ai_msg = chat.invoke(lc_messages)
-    state["messages"].append({"role": "assistant", "content": ai_msg.content})
+    ai_msg = _invoke("tutoring", chat, list(chain(state["history"], state["new_messages"])))
+    state["new_messages"].append(ChatMessage(role="assistant", content=ai_msg.content))
+    return state
+
+
+async def anode_call_llm(state: TutorState) -> TutorState:
+    chat = get_langchain_chat()
+    messages = list(chain(state["history"], state["new_messages"]))
+    lc_messages = convert_dict_messages_to_langchain(messages)
+    with track_llm("tutoring", _model_name(chat)) as usage:
+        async with get_limiter("llm").aslot("tutoring", estimate_tokens(messages)) as permit:
+            ai_msg = await acall_with_policy(
+                "tutoring", lambda timeout: chat.ainvoke(lc_messages, timeout=timeout), _endpoint(chat)
+            )
+            _record_usage(usage, permit, ai_msg, messages)
+    state["new_messages"].append(ChatMessage(role="assistant", content=ai_msg.content))
     return state
 
 
 class LangTutorGraph:
-    def __init__(self, store: Optional[SessionStore] = None) -> None:
+    def __init__(self, store: Optional[SessionStore] = None, context: Optional[ContextManager] = None) -> None:
         self.store = store or SessionStore()
+        # Bounds the prompt to TUTOR_CONTEXT_TOKENS; older turns live on in the session summary
+        self.context = context or ContextManager(store=self.store)
         self._graph = StateGraph(TutorState)
-        self._graph.add_node("maybe_search", node_maybe_search)
-        self._graph.add_node("call_llm", node_call_llm)
+        # Each node has a sync and an async body: invoke() runs the former, ainvoke() the latter
+        self._graph.add_node("maybe_search", RunnableLambda(node_maybe_search, afunc=anode_maybe_search))
+        self._graph.add_node("call_llm", RunnableLambda(node_call_llm, afunc=anode_call_llm))
         self._graph.set_entry_point("maybe_search")
         self._graph.add_edge("maybe_search", "call_llm")
         self._graph.add_edge("call_llm", END)
@@ -60,7 +128,7 @@ class LangTutorGraph:
         # Proactively generate the first assistant message to kick off the lesson
         try:
             chat = get_langchain_chat()
-            lc_messages = convert_dict_messages_to_langchain([
+            greeting_messages = [
                 {"role": "system", "content": build_system_prompt(subject, goal, language or "en")},
                 {
                     "role": "user",
@@ -69,8 +137,12 @@ class LangTutorGraph:
                         "Ask one quick diagnostic question to gauge current understanding."
                     ),
                 },
-            ])
-            ai_msg = chat.invoke(lc_messages)
+            ]
+            # Learners starting the same subject at the same moment share one greeting call
+            ai_msg = get_flight_group("llm").do(
+                make_cache_key(chat.model_name, greeting_messages, {"endpoint": _endpoint(chat)}),
+                lambda: _invoke("greeting", chat, greeting_messages),
+            )
             session.messages.append(ChatMessage(role="assistant", content=ai_msg.content))
         except Exception:
             # If the proactive call fails, we still return a valid session
@@ -78,28 +150,69 @@ class LangTutorGraph:
         self.store.save_session(session)
         return session
 
-    def continue_session(
-        self, session_id: str, user_message: str, enable_web_search: bool = False
-    ) -> Session:
+    def _prepare_turn(
+        self, session_id: str, user_message: str, enable_web_search: bool
+    ) -> Tuple[Session, ChatMessage, TutorState]:
         session = self.store.load_session(session_id)
-        session.messages.append(ChatMessage(role="user", content=user_message))
+        user_turn = ChatMessage(role="user", content=user_message)
+        session.messages.append(user_turn)
         state: TutorState = {
-            "messages": [{"role": m.role, "content": m.content} for m in session.messages],
+            "history": self.context.prepare(session),
+            "new_messages": [],
             "enable_web_search": enable_web_search,
         }
+        return session, user_turn, state
+
+    def _run_config(self, session: Session) -> Dict:
         # Propagate helpful tracing metadata/tags for LangSmith when enabled via env
-        result = self._app.invoke(
-            state,
-            config={
-                "tags": ["ai_tutor", "langgraph"],
-                "metadata": {"engine": "langgraph", "subject": session.subject},
-            },
+        return {
+            "tags": ["ai_tutor", "langgraph"],
+            "metadata": {"engine": "langgraph", "subject": session.subject},
+        }
+
+    def _commit_turn(self, session: Session, user_turn: ChatMessage, new_messages: List[ChatMessage]) -> None:
+        # Sync back the new assistant message; only the new turn is written
+        session.messages.extend(new_messages)
+        self.store.append_messages(session.session_id, [user_turn] + new_messages)
+
+    def continue_session(
+        self, session_id: str, user_message: str, enable_web_search: bool = False
+    ) -> Session:
+        session, user_turn, state = self._prepare_turn(session_id, user_message, enable_web_search)
+        result = self._app.invoke(state, config=self._run_config(session))
+        self._commit_turn(session, user_turn, list(result["new_messages"]))
+        return session
+
+    async def acontinue_session(
+        self, session_id: str, user_message: str, enable_web_search: bool = False
+    ) -> Session:
+        """Async ``continue_session``: the LLM and search calls await instead of holding a thread."""
+        # Store access is local file/SQLite I/O behind locks; keep it off the event loop
+        session, user_turn, state = await asyncio.to_thread(
+            self._prepare_turn, session_id, user_message, enable_web_search
         )
-        # Sync back the new assistant message
-        new_msgs = result["messages"][len(session.messages) :]
-        for m in new_msgs:
-            session.messages.append(ChatMessage(role=m["role"], content=m["content"]))
-        self.store.save_session(session)
+        result = await self._app.ainvoke(state, config=self._run_config(session))
+        await asyncio.to_thread(self._commit_turn, session, user_turn, list(result["new_messages"]))
         return session
 
+    def stream_session(
+        self, session_id: str, user_message: str, enable_web_search: bool = False
+    ) -> Iterator[str]:
+        """Like ``continue_session`` but yields the assistant reply token by token.
 
+        The turn is persisted once the reply is complete; if the consumer stops
+        early nothing is written.
+        """
+        session, user_turn, state = self._prepare_turn(session_id, user_message, enable_web_search)
+        result: Optional[TutorState] = None
+        for mode, payload in self._app.stream(
+            state, config=self._run_config(session), stream_mode=["messages", "values"]
+        ):
+            if mode == "messages":
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") == "call_llm" and chunk.content:
+                    yield chunk.content
+            else:
+                result = payload
+        if result is not None:
+            self._commit_turn(session, user_turn, list(result["new_messages"]))
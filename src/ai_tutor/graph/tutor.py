@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from typing import List, Mapping, Optional
 
 from ai_tutor.llm.providers import get_llm_provider, is_llm_configured
 from ai_tutor.services.session_store import ChatMessage, Session, SessionStore
@@ -33,9 +33,8 @@ def generate_reply(session: Session, user_message: str, temperature: float = 0.2
         )
     ensure_system_message(session)
     provider = get_llm_provider()
-    messages_payload: List[Dict[str, str]] = [
-        {"role": m.role, "content": m.content} for m in session.messages
-    ]
+    # Messages already read as provider dicts; only the list of references is copied
+    messages_payload: List[Mapping[str, str]] = list(session.messages)
     augmented_user = user_message
     if enable_web_search and is_tavily_configured():
         # Attempt a brief search and add a short summary to the user message to give model fresh context
@@ -51,7 +50,7 @@ def generate_reply(session: Session, user_message: str, temperature: float = 0.2
         except Exception:
             # If online search fails, continue without augmentation
             pass
-    messages_payload.append({"role": "user", "content": augmented_user})
+    messages_payload.append(ChatMessage(role="user", content=augmented_user))
     return provider.generate(messages=messages_payload, temperature=temperature)
 
 
@@ -72,6 +71,7 @@ class TutorGraph:
 
     def continue_session(self, session_id: str, user_message: str, temperature: float = 0.2, enable_web_search: bool = False) -> Session:
         session = self.store.load_session(session_id)
+        had_system = any(m.role == "system" for m in session.messages)
         assistant_reply = generate_reply(
             session=session,
             user_message=user_message,
@@ -79,9 +79,16 @@ class TutorGraph:
             enable_web_search=enable_web_search,
         )
         # Persist user and assistant turns
-        session.messages.append(ChatMessage(role="user", content=user_message))
-        session.messages.append(ChatMessage(role="assistant", content=assistant_reply))
-        self.store.save_session(session)
+        new_turns = [
+            ChatMessage(role="user", content=user_message),
+            ChatMessage(role="assistant", content=assistant_reply),
+        ]
+        session.messages.extend(new_turns)
+        if had_system:
+            self.store.append_messages(session_id, new_turns)
+        else:
+            # generate_reply inserted a system prompt at the front; rewrite the whole history
+            self.store.save_session(session)
         return session
 
 
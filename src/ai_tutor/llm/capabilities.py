@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from ai_tutor.services.fileio import atomic_write_text
+
+
+class CapabilityCache:
+    """Which request parameters each (base_url, model) accepts.
+
+    Entries look like ``{"token_param": "max_completion_tokens", "temperature": False}``
+    and are learned from the first rejected (or accepted) request, so later calls
+    build the right payload without a failed round-trip. When ``path`` is set the
+    cache is loaded from and written back to a JSON file whenever it changes.
+    """
+
+    def __init__(self, path: Optional[Path | str] = None) -> None:
+        self.path: Optional[Path] = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Dict[str, object]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        for item in data.get("models", []):
+            try:
+                self._entries[(item["base_url"], item["model"])] = dict(item["capabilities"])
+            except Exception:
+                continue
+
+    def _persist(self) -> None:
+        if self.path is None:
+            return
+        models = [
+            {"base_url": base_url, "model": model, "capabilities": caps}
+            for (base_url, model), caps in sorted(self._entries.items())
+        ]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, json.dumps({"models": models}, ensure_ascii=False, indent=2))
+
+    def lookup(self, base_url: str, model: str) -> Dict[str, object]:
+        """Return what is known about a model (empty if nothing yet)."""
+        with self._lock:
+            caps = self._entries.get((base_url, model))
+            if caps is None:
+                self.misses += 1
+                return {}
+            self.hits += 1
+            return dict(caps)
+
+    def record(self, base_url: str, model: str, **capabilities: object) -> None:
+        """Merge learned capabilities; the file is only rewritten when something changed."""
+        with self._lock:
+            caps = self._entries.setdefault((base_url, model), {})
+            changed = any(caps.get(name) != value for name, value in capabilities.items())
+            if not changed:
+                return
+            caps.update(capabilities)
+            try:
+                self._persist()
+            except Exception:
+                # The cache is an optimization; an unwritable file must not fail the request
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            try:
+                self._persist()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_default_cache: Optional[CapabilityCache] = None
+_default_lock = threading.Lock()
+
+
+def get_capability_cache() -> CapabilityCache:
+    """Process-wide cache, persisted to ``LLM_CAPABILITY_CACHE`` when that env var names a file."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = CapabilityCache(os.environ.get("LLM_CAPABILITY_CACHE", "").strip() or None)
+        return _default_cache
@@ -1,32 +1,50 @@
 from __future__ import annotations
 
-import os
-from typing import Dict, List
+import threading
+from typing import Dict, Iterable, Mapping, Tuple
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
+from ai_tutor.llm.providers import get_shared_http_client, read_llm_configuration, read_pool_settings
+
 
 def _is_gpt5(model: str) -> bool:
     return model.lower().startswith("gpt-5")
 
 
+# One chat model per (base_url, api_key, model), all sharing the process-wide HTTP pool
+_chat_lock = threading.Lock()
+_chat_models: Dict[Tuple[str, str, str], ChatOpenAI] = {}
+
+
 def get_langchain_chat() -> ChatOpenAI:
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    base_url = os.getenv("OPENAI_BASE_URL", "").strip()
-    model = os.getenv("OPENAI_MODEL", "").strip()
-    if not api_key or not base_url or not model:
-        raise RuntimeError(
-            "LLM is not configured. Ensure OPENAI_API_KEY, OPENAI_BASE_URL, and OPENAI_MODEL are set."
-        )
+    cfg = read_llm_configuration()
+    key = (cfg.base_url, cfg.api_key, cfg.model)
+    with _chat_lock:
+        chat = _chat_models.get(key)
+        if chat is not None:
+            return chat
+    settings = read_pool_settings()
+    kwargs = {
+        "model": cfg.model,
+        "api_key": cfg.api_key,
+        "base_url": cfg.base_url,
+        "http_client": get_shared_http_client(settings),
+        "timeout": settings.timeout,
+        # Retries are owned by llm.resilience (see graph nodes)
+        "max_retries": 0,
+    }
     # For gpt-5* omit temperature/max tokens to avoid unsupported params
-    if _is_gpt5(model):
-        return ChatOpenAI(model=model, api_key=api_key, base_url=base_url)
-    # Default conservative temperature
-    return ChatOpenAI(model=model, api_key=api_key, base_url=base_url, temperature=0)
+    if not _is_gpt5(cfg.model):
+        # Default conservative temperature
+        kwargs["temperature"] = 0
+    chat = ChatOpenAI(**kwargs)
+    with _chat_lock:
+        return _chat_models.setdefault(key, chat)
 
 
-def convert_dict_messages_to_langchain(messages: List[Dict[str, str]]):
+def convert_dict_messages_to_langchain(messages: Iterable[Mapping[str, str]]):
     converted = []
     for m in messages:
         role = m.get("role", "user")
@@ -38,5 +56,3 @@ def convert_dict_messages_to_langchain(messages: List[Dict[str, str]]):
         else:
             converted.append(HumanMessage(content=content))
     return converted
-
-
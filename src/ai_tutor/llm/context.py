@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+
+from ai_tutor.llm.providers import get_llm_provider
+
+
+# Rough chars-per-token ratio of English text for the offline fallback counter
+APPROX_CHARS_PER_TOKEN = 4
+# Per-message framing tokens added by the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+DEFAULT_CONTEXT_TOKENS = 6000
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken  # type: ignore
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Not installed, or the BPE file cannot be fetched offline
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of ``text`` with tiktoken when available, else a chars/4 estimate."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + APPROX_CHARS_PER_TOKEN - 1) // APPROX_CHARS_PER_TOKEN
+
+
+def message_tokens(message: Mapping[str, str]) -> int:
+    return count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def read_context_budget(env: Optional[Dict[str, str]] = None) -> int:
+    """History budget in tokens from ``TUTOR_CONTEXT_TOKENS`` (default 6000)."""
+    environment = env if env is not None else os.environ
+    value = environment.get("TUTOR_CONTEXT_TOKENS", "").strip()
+    return int(value) if value else DEFAULT_CONTEXT_TOKENS
+
+
+def format_transcript(messages: Sequence[Mapping[str, str]]) -> str:
+    return "\n\n".join(f"{m.get('role', 'user')}: {m.get('content', '')}" for m in messages)
+
+
+def _first_turn(messages: Sequence[Mapping[str, str]]) -> int:
+    # The leading system message is the tutor prompt; everything after it is conversation
+    return 1 if messages and messages[0].get("role") == "system" else 0
+
+
+def _window_start(messages: Sequence[Mapping[str, str]], budget: int, floor: int, min_recent: int) -> int:
+    """Smallest index >= ``floor`` whose suffix fits ``budget`` (always keeping ``min_recent`` messages)."""
+    start = len(messages)
+    used = 0
+    while start > floor:
+        cost = message_tokens(messages[start - 1])
+        if used + cost > budget and len(messages) - start >= min_recent:
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+def build_context(
+    messages: Sequence[Mapping[str, str]],
+    max_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    summary: str = "",
+    summary_upto: int = 0,
+    min_recent: int = 4,
+    keep_system_prompt: bool = True,
+) -> List[Mapping[str, str]]:
+    """Budgeted prompt history: system prompt, rolling summary, then the newest turns verbatim.
+
+    Turns before ``summary_upto`` are represented by ``summary``; of the rest,
+    as many recent ones as fit in ``max_tokens`` are kept (at least ``min_recent``).
+    """
+    first = _first_turn(messages)
+    head: List[Mapping[str, str]] = []
+    if keep_system_prompt and first:
+        head.append(messages[0])
+    if summary:
+        head.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+    budget = max_tokens - sum(message_tokens(m) for m in head)
+    start = _window_start(messages, budget, max(first, summary_upto), min_recent)
+    return head + list(messages[start:])
+
+
+def summarize_turns(previous_summary: str, turns: Sequence[Mapping[str, str]], language: str = "en") -> str:
+    """Fold ``turns`` into ``previous_summary`` with one deterministic LLM call."""
+    system = (
+        "You maintain a running summary of a tutoring conversation. Update the summary with the new turns. "
+        "Keep what the learner already understands, their mistakes and open questions, and what was taught. "
+        "Write at most 200 words of plain text."
+    )
+    if language.lower().startswith("fa"):
+        system += " Respond in Persian (Farsi)."
+    user = (
+        f"Current summary:\n{previous_summary or '(empty)'}\n\n"
+        f"New turns:\n{format_transcript(turns)}"
+    )
+    provider = get_llm_provider()
+    return provider.generate(
+        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+        temperature=0,
+        max_tokens=400,
+        task="summary",
+    ).strip()
+
+
+class ContextManager:
+    """Keeps a session's prompt within a token budget using an incremental summary.
+
+    When the turns after ``session.summary_upto`` no longer fit the budget, the
+    oldest of them are folded into ``session.summary`` (one summarizer call on
+    just those turns) until the rest fit in half the budget, and the new summary
+    is saved with the session. Between folds no extra calls are made.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        max_tokens: Optional[int] = None,
+        min_recent: int = 4,
+        summarizer: Optional[Callable[[str, Sequence[Mapping[str, str]], str], str]] = None,
+    ) -> None:
+        self.store = store
+        self.max_tokens = max_tokens if max_tokens is not None else read_context_budget()
+        self.min_recent = min_recent
+        self.summarizer = summarizer or summarize_turns
+
+    def prepare(self, session) -> List[Mapping[str, str]]:
+        messages = session.messages
+        first = _first_turn(messages)
+        head_tokens = (message_tokens(messages[0]) if first else 0) + (
+            message_tokens({"content": SUMMARY_PREFIX + session.summary}) if session.summary else 0
+        )
+        floor = max(first, session.summary_upto)
+        budget = self.max_tokens - head_tokens
+        if _window_start(messages, budget, floor, self.min_recent) > floor:
+            # Fold down to half the budget so the next fold is several turns away
+            fold_to = _window_start(messages, budget // 2, floor, self.min_recent)
+            try:
+                summary = self.summarizer(session.summary, messages[floor:fold_to], session.language)
+            except Exception:
+                # Without a summary the oldest turns are simply left out of the prompt
+                summary = ""
+            if summary:
+                session.summary, session.summary_upto = summary, fold_to
+                if self.store is not None:
+                    try:
+                        self.store.update_summary(session.session_id, summary, fold_to)
+                    except Exception:
+                        pass
+        return build_context(
+            messages,
+            max_tokens=self.max_tokens,
+            summary=session.summary,
+            summary_upto=session.summary_upto,
+            min_recent=self.min_recent,
+        )
@@ -1,15 +1,28 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from typing import Any, Dict, List, Optional
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence, Tuple
 
-from pydantic import BaseModel
+import httpx
+from pydantic import BaseModel, ConfigDict
+
+from ai_tutor.llm.capabilities import CapabilityCache, get_capability_cache
+from ai_tutor.llm.resilience import acall_with_policy, call_with_policy
+from ai_tutor.llm.response_cache import ResponseCache, get_response_cache, make_cache_key
+from ai_tutor.services.limiter import estimate_prompt_tokens, estimate_tokens, get_limiter
+from ai_tutor.services.metrics import LLM_FIRST_TOKEN, track_llm
+from ai_tutor.services.singleflight import get_flight_group
 
 try:
     # OpenAI v1 SDK
-    from openai import OpenAI  # type: ignore
+    from openai import AsyncOpenAI, OpenAI  # type: ignore
 except Exception as exc:  # pragma: no cover - import guard for environments without openai
     OpenAI = None  # type: ignore
+    AsyncOpenAI = None  # type: ignore
 
 
 class LlmConfiguration(BaseModel):
@@ -18,8 +31,32 @@ class LlmConfiguration(BaseModel):
     model: str
 
 
+class ClientPoolSettings(BaseModel):
+    """Connection pool limits and timeouts shared by every LLM client in the process."""
+
+    model_config = ConfigDict(frozen=True)
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+
+
+def read_stub_url(env: Optional[Dict[str, str]] = None) -> str:
+    """Base URL of the local stub server (``AI_TUTOR_STUB_URL``), or "" when unset.
+
+    When set, every LLM, transcription and search call goes to the stub instead
+    of the configured providers; see ``ai_tutor.devtools.stub_server``.
+    """
+    environment = env if env is not None else os.environ
+    return environment.get("AI_TUTOR_STUB_URL", "").strip().rstrip("/")
+
+
 def is_llm_configured(env: Optional[Dict[str, str]] = None) -> bool:
     environment = env if env is not None else os.environ
+    if read_stub_url(environment):
+        return True
     return (
         bool(environment.get("OPENAI_API_KEY"))
         and bool(environment.get("OPENAI_BASE_URL"))
@@ -32,6 +69,11 @@ def read_llm_configuration(env: Optional[Dict[str, str]] = None) -> LlmConfigura
     api_key = environment.get("OPENAI_API_KEY", "").strip()
     base_url = environment.get("OPENAI_BASE_URL", "").strip()
     model = environment.get("OPENAI_MODEL", "").strip()
+    stub_url = read_stub_url(environment)
+    if stub_url:
+        base_url = stub_url + "/v1"
+        api_key = api_key or "stub"
+        model = model or "stub-model"
     if not api_key or not base_url or not model:
         raise RuntimeError(
             "LLM is not configured. Ensure OPENAI_API_KEY, OPENAI_BASE_URL, and OPENAI_MODEL are set."
@@ -39,77 +81,508 @@ def read_llm_configuration(env: Optional[Dict[str, str]] = None) -> LlmConfigura
     return LlmConfiguration(api_key=api_key, base_url=base_url, model=model)
 
 
+def read_pool_settings(env: Optional[Dict[str, str]] = None) -> ClientPoolSettings:
+    """Read optional pool overrides: OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE,
+    OPENAI_KEEPALIVE_EXPIRY, OPENAI_TIMEOUT and OPENAI_CONNECT_TIMEOUT."""
+    environment = env if env is not None else os.environ
+    overrides: Dict[str, Any] = {}
+    for field, name in (
+        ("max_connections", "OPENAI_MAX_CONNECTIONS"),
+        ("max_keepalive_connections", "OPENAI_MAX_KEEPALIVE"),
+        ("keepalive_expiry", "OPENAI_KEEPALIVE_EXPIRY"),
+        ("timeout", "OPENAI_TIMEOUT"),
+        ("connect_timeout", "OPENAI_CONNECT_TIMEOUT"),
+    ):
+        value = environment.get(name, "").strip()
+        if value:
+            overrides[field] = value
+    return ClientPoolSettings(**overrides)
+
+
+# Process-wide registry: one keep-alive HTTP pool, one SDK client per (base_url, api_key)
+# and one provider per (base_url, api_key, model), so turns reuse warm connections.
+_registry_lock = threading.Lock()
+_http_clients: Dict[ClientPoolSettings, httpx.Client] = {}
+_openai_clients: Dict[Tuple[str, str], Any] = {}
+_providers: Dict[Tuple[str, str, str], "OpenAIProvider"] = {}
+# Async clients are bound to the event loop that created them, so they are pooled per loop
+_async_registries: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_shared_http_client(settings: Optional[ClientPoolSettings] = None) -> httpx.Client:
+    """Return the process-wide pooled ``httpx.Client`` for the given pool settings."""
+    settings = settings or read_pool_settings()
+    with _registry_lock:
+        client = _http_clients.get(settings)
+        if client is None:
+            client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=settings.max_connections,
+                    max_keepalive_connections=settings.max_keepalive_connections,
+                    keepalive_expiry=settings.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+            )
+            _http_clients[settings] = client
+        return client
+
+
+def get_openai_client(cfg: Optional[LlmConfiguration] = None) -> Any:
+    """Return the shared OpenAI SDK client for ``cfg`` (read from env if omitted)."""
+    cfg = cfg or read_llm_configuration()
+    if OpenAI is None:
+        raise RuntimeError(
+            "openai package is not available. Ensure dependencies are installed inside the container."
+        )
+    key = (cfg.base_url, cfg.api_key)
+    with _registry_lock:
+        client = _openai_clients.get(key)
+    if client is None:
+        http_client = get_shared_http_client()
+        with _registry_lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                # Retries are owned by llm.resilience, so the SDK's own retry loop is disabled
+                client = OpenAI(
+                    api_key=cfg.api_key, base_url=cfg.base_url, http_client=http_client, max_retries=0
+                )
+                _openai_clients[key] = client
+    return client
+
+
+def _loop_registry() -> Dict[Tuple, Any]:
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        registry = _async_registries.get(loop)
+        if registry is None:
+            registry = {}
+            _async_registries[loop] = registry
+        return registry
+
+
+def get_shared_async_http_client(settings: Optional[ClientPoolSettings] = None) -> httpx.AsyncClient:
+    """Return the pooled ``httpx.AsyncClient`` of the running event loop for the given pool settings."""
+    settings = settings or read_pool_settings()
+    registry = _loop_registry()
+    key = ("http", settings)
+    client = registry.get(key)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+        )
+        registry[key] = client
+    return client
+
+
+def get_async_openai_client(cfg: Optional[LlmConfiguration] = None) -> Any:
+    """Return the running event loop's shared AsyncOpenAI client for ``cfg``."""
+    cfg = cfg or read_llm_configuration()
+    if AsyncOpenAI is None:
+        raise RuntimeError(
+            "openai package is not available. Ensure dependencies are installed inside the container."
+        )
+    registry = _loop_registry()
+    key = ("openai", cfg.base_url, cfg.api_key)
+    client = registry.get(key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=cfg.api_key,
+            base_url=cfg.base_url,
+            http_client=get_shared_async_http_client(),
+            max_retries=0,
+        )
+        registry[key] = client
+    return client
+
+
+async def aclose_async_clients() -> None:
+    """Close the running event loop's pooled async clients (call before the loop shuts down)."""
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        registry = _async_registries.pop(loop, {})
+    for key, client in registry.items():
+        if key[0] == "http":
+            await client.aclose()
+
+
+def reset_llm_clients() -> None:
+    """Drop every pooled client and close the shared connection pools (e.g. after config changes)."""
+    with _registry_lock:
+        http_clients = list(_http_clients.values())
+        _http_clients.clear()
+        _openai_clients.clear()
+        _providers.clear()
+        _async_registries.clear()
+    for client in http_clients:
+        client.close()
+
+
 class OpenAIProvider:
     """Thin wrapper around OpenAI chat completions for our app.
 
     This abstraction avoids calling the LLM directly from the UI, as required by project rules.
+    Parameter support learned from rejected requests is kept in a capability cache per
+    (base_url, model), so only the first call to such a model pays for a retry.
     """
 
-    def __init__(self, client: Any, model: str) -> None:
+    def __init__(
+        self,
+        client: Any,
+        model: str,
+        base_url: str = "",
+        capabilities: Optional[CapabilityCache] = None,
+        async_client: Any = None,
+        response_cache: Optional[ResponseCache] = None,
+    ) -> None:
         self._client = client
         self._model = model
+        self._base_url = base_url or str(getattr(client, "base_url", "") or "")
+        self._capabilities = capabilities if capabilities is not None else get_capability_cache()
+        # Fixed async client (tests); otherwise the running loop's pooled AsyncOpenAI client is used
+        self._async_client = async_client
+        # Explicit cache, or the process-wide one (resolved on first deterministic call)
+        self._response_cache = response_cache
+        # Circuit breaker key: every model behind one base URL shares the endpoint's health
+        self._endpoint = self._base_url or "llm"
 
-    def generate(
+    def _cache_slot(
+        self, messages: Sequence[Mapping[str, str]], temperature: Optional[float], max_tokens: Optional[int], use_cache: bool
+    ) -> Tuple[Optional[ResponseCache], str]:
+        """Return (cache, key) for a deterministic call, or (None, "") when it must not be cached."""
+        # Only temperature-0 completions are reproducible enough to replay
+        if not use_cache or temperature != 0:
+            return None, ""
+        cache = self._response_cache if self._response_cache is not None else get_response_cache()
+        if cache is None:
+            return None, ""
+        key = make_cache_key(
+            self._model, messages, {"base_url": self._base_url, "temperature": 0, "max_tokens": max_tokens}
+        )
+        return cache, key
+
+    def _cache_lookup(
+        self, messages: Sequence[Mapping[str, str]], temperature: Optional[float], max_tokens: Optional[int], use_cache: bool
+    ) -> Tuple[Optional[ResponseCache], str, Optional[str]]:
+        cache, key = self._cache_slot(messages, temperature, max_tokens, use_cache)
+        if cache is None:
+            return None, "", None
+        try:
+            return cache, key, cache.get(key)
+        except Exception:
+            # The cache is an optimization; a locked or broken file must not fail the request
+            return None, "", None
+
+    def invalidate_cached(self, messages: Sequence[Mapping[str, str]], max_tokens: Optional[int] = None) -> None:
+        """Forget a cached deterministic reply (e.g. one the caller could not parse)."""
+        cache, key = self._cache_slot(messages, 0, max_tokens, True)
+        if cache is not None:
+            try:
+                cache.delete(key)
+            except Exception:
+                pass
+
+    def _cache_store(self, cache: Optional[ResponseCache], key: str, text: str, started: float) -> None:
+        if cache is None or not text:
+            return
+        try:
+            cache.put(key, self._model, text, latency=time.perf_counter() - started)
+        except Exception:
+            pass
+
+    def _build_payload(
         self,
-        messages: List[Dict[str, str]],
-        temperature: float = 0.2,
-        max_tokens: Optional[int] = None,
-    ) -> str:
+        messages: Sequence[Mapping[str, str]],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        json_mode: bool = False,
+    ) -> Dict[str, object]:
         # Build a payload compatible with multiple backends. Some models (e.g., gpt-5-nano)
         # do not support temperature or max_tokens; proactively omit for gpt-5*.
         payload: Dict[str, object] = {
             "model": self._model,
-            "messages": messages,
+            # The SDK serializes any Mapping message, but expects a list container
+            "messages": messages if isinstance(messages, list) else list(messages),
         }
+        caps = self._capabilities.lookup(self._base_url, self._model)
+        token_param = str(caps.get("token_param", "max_tokens"))
         is_gpt5: bool = self._model.lower().startswith("gpt-5")
         if not is_gpt5 and max_tokens is not None:
-            payload["max_tokens"] = max_tokens
+            payload[token_param] = max_tokens
         # Only set temperature if model supports it and caller changed from default 1
-        if not is_gpt5 and temperature is not None and temperature != 1:
+        if not is_gpt5 and caps.get("temperature", True) and temperature is not None and temperature != 1:
             payload["temperature"] = temperature
+        # JSON mode is a hint: backends that reject it get the same prompt without it
+        if json_mode and caps.get("json_mode", True):
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    def _learn(self, payload: Dict[str, object]) -> None:
+        # A request was accepted: remember the parameters it carried
+        learned: Dict[str, object] = {}
+        if "max_tokens" in payload or "max_completion_tokens" in payload:
+            learned["token_param"] = "max_tokens" if "max_tokens" in payload else "max_completion_tokens"
+        if "temperature" in payload:
+            learned["temperature"] = True
+        if "response_format" in payload:
+            learned["json_mode"] = True
+        if learned:
+            self._capabilities.record(self._base_url, self._model, **learned)
+
+    def _adjust_for_error(self, payload: Dict[str, object], text: str) -> bool:
+        """Rewrite ``payload`` after a parameter rejection; False if the error is something else."""
+        # Handle unsupported max_tokens → retry with max_completion_tokens
+        if "max_tokens" in payload and (
+            "Unsupported parameter: 'max_tokens'" in text
+            or "'max_tokens' is not supported" in text
+        ):
+            payload["max_completion_tokens"] = payload.pop("max_tokens")
+            self._capabilities.record(self._base_url, self._model, token_param="max_completion_tokens")
+            return True
+        # Handle unsupported temperature value → retry without temperature
+        if "temperature" in payload and (
+            "Unsupported value: 'temperature'" in text
+            or "does not support" in text and "temperature" in text
+        ):
+            payload.pop("temperature", None)
+            self._capabilities.record(self._base_url, self._model, temperature=False)
+            return True
+        # Handle unsupported JSON mode → retry with a plain text response
+        if "response_format" in payload and ("response_format" in text or "json_object" in text):
+            payload.pop("response_format", None)
+            self._capabilities.record(self._base_url, self._model, json_mode=False)
+            return True
+        return False
+
+    def _create(self, payload: Dict[str, object], timeout: Optional[float] = None) -> Any:
+        """Call chat completions, retrying once per unsupported parameter."""
+        options = {"timeout": timeout} if timeout is not None else {}
+        while True:
+            try:
+                response = self._client.chat.completions.create(**payload, **options)  # type: ignore[arg-type]
+            except Exception as exc:
+                # Each adjustment removes a parameter, so this retries at most twice
+                if not self._adjust_for_error(payload, str(exc)):
+                    raise
+                continue
+            self._learn(payload)
+            return response
+
+    async def _acreate(self, payload: Dict[str, object], timeout: Optional[float] = None) -> Any:
+        client = self._async_client
+        if client is None:
+            client = get_async_openai_client(
+                LlmConfiguration(api_key=self._client.api_key, base_url=self._base_url, model=self._model)
+            )
+        options = {"timeout": timeout} if timeout is not None else {}
+        while True:
+            try:
+                response = await client.chat.completions.create(**payload, **options)  # type: ignore[arg-type]
+            except Exception as exc:
+                if not self._adjust_for_error(payload, str(exc)):
+                    raise
+                continue
+            self._learn(payload)
+            return response
 
-        def try_request(p: Dict[str, object]) -> str:
-            response = self._client.chat.completions.create(**p)  # type: ignore[arg-type]
-            choice = response.choices[0]
-            return choice.message.content or ""
+    def generate(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        task: str = "default",
+        json_mode: bool = False,
+    ) -> str:
+        """Complete ``messages`` under the timeout/retry/hedging policy of ``task`` (see llm.resilience).
 
-        # First attempt
+        Identical requests already in flight (same model, messages and params) are
+        coalesced: the later callers wait for and share the first call's reply.
+        ``json_mode`` asks for a JSON object reply where the backend supports it;
+        it is not part of the cache key, as the prompt already asks for the same JSON.
+        """
+        return get_flight_group("llm").do(
+            self._flight_key(messages, temperature, max_tokens),
+            lambda: self._generate(messages, temperature, max_tokens, use_cache, task, json_mode),
+        )
+
+    def _flight_key(self, messages: Sequence[Mapping[str, str]], temperature: Optional[float], max_tokens: Optional[int]) -> str:
+        return make_cache_key(
+            self._model, messages, {"base_url": self._base_url, "temperature": temperature, "max_tokens": max_tokens}
+        )
+
+    def _generate(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        use_cache: bool,
+        task: str,
+        json_mode: bool = False,
+    ) -> str:
+        with track_llm(task, self._model) as usage:
+            cache, key, cached = self._cache_lookup(messages, temperature, max_tokens, use_cache)
+            if cached is not None:
+                usage.cached = True
+                return cached
+            started = time.perf_counter()
+            payload = self._build_payload(messages, temperature, max_tokens, json_mode)
+            with get_limiter("llm").slot(task, estimate_tokens(messages, max_tokens)) as permit:
+                # Each attempt (and hedge) gets its own payload copy, as fallbacks rewrite it
+                response = call_with_policy(task, lambda timeout: self._create(dict(payload), timeout), self._endpoint)
+                usage.from_openai(response)
+                permit.settle(usage.prompt_tokens + usage.completion_tokens)
+        choice = response.choices[0]
+        text = choice.message.content or ""
+        self._cache_store(cache, key, text, started)
+        return text
+
+    async def agenerate(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True,
+        task: str = "default",
+    ) -> str:
+        """Async twin of ``generate`` on the event loop's pooled AsyncOpenAI client."""
+        return await get_flight_group("llm").ado(
+            self._flight_key(messages, temperature, max_tokens),
+            lambda: self._agenerate(messages, temperature, max_tokens, use_cache, task),
+        )
+
+    async def _agenerate(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        use_cache: bool,
+        task: str,
+    ) -> str:
+        with track_llm(task, self._model) as usage:
+            cache, key, cached = self._cache_lookup(messages, temperature, max_tokens, use_cache)
+            if cached is not None:
+                usage.cached = True
+                return cached
+            started = time.perf_counter()
+            payload = self._build_payload(messages, temperature, max_tokens)
+            async with get_limiter("llm").aslot(task, estimate_tokens(messages, max_tokens)) as permit:
+                response = await acall_with_policy(
+                    task, lambda timeout: self._acreate(dict(payload), timeout), self._endpoint
+                )
+                usage.from_openai(response)
+                permit.settle(usage.prompt_tokens + usage.completion_tokens)
+        choice = response.choices[0]
+        text = choice.message.content or ""
+        self._cache_store(cache, key, text, started)
+        return text
+
+    def stream(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        task: str = "tutoring",
+        json_mode: bool = False,
+        use_cache: bool = True,
+    ) -> Iterator[str]:
+        """Yield the reply text chunk by chunk as the model produces it.
+
+        Only opening the stream is retried; once chunks flow, errors propagate.
+        Like ``generate``, a deterministic request answered from the response
+        cache, or identical to one already in flight, is not sent again: its
+        reply is yielded as a single chunk. A completed stream is cached.
+        """
+        cache, key, cached = self._cache_lookup(messages, temperature, max_tokens, use_cache)
+        if cached is not None:
+            with track_llm(task, self._model) as usage:
+                usage.cached = True
+            yield cached
+            return
+        group = get_flight_group("llm")
+        flight_key = self._flight_key(messages, temperature, max_tokens)
+        flight = group.begin(flight_key)
+        if flight is None:
+            yield group.do(
+                flight_key, lambda: self._generate(messages, temperature, max_tokens, use_cache, task, json_mode)
+            )
+            return
+        parts = []
+        started = time.perf_counter()
         try:
-            return try_request(payload)
-        except Exception as exc:  # Fallbacks for parameter incompatibilities
-            text = str(exc)
-            # Handle unsupported max_tokens → retry with max_completion_tokens
-            if "max_tokens" in payload and (
-                "Unsupported parameter: 'max_tokens'" in text
-                or "'max_tokens' is not supported" in text
-            ):
-                value = payload.pop("max_tokens")
-                payload["max_completion_tokens"] = value  # type: ignore[assignment]
-                try:
-                    return try_request(payload)
-                except Exception as exc2:
-                    text = str(exc2)
-                    # Continue to next fallback below
-
-            # Handle unsupported temperature value → retry without temperature
-            if "temperature" in payload and (
-                "Unsupported value: 'temperature'" in text
-                or "does not support" in text and "temperature" in text
-            ):
-                payload.pop("temperature", None)
-                return try_request(payload)
-
-            # If unknown failure, propagate original error
+            yield from self._stream_upstream(messages, temperature, max_tokens, task, json_mode, parts)
+        except Exception as exc:
+            group.end(flight_key, flight, error=exc)
             raise
+        except BaseException:
+            # Closed early: the partial reply must not be shared, so waiting callers run their own
+            group.end(flight_key, flight, abandoned=True)
+            raise
+        text = "".join(parts)
+        group.end(flight_key, flight, result=text)
+        self._cache_store(cache, key, text, started)
+
+    def _stream_upstream(
+        self,
+        messages: Sequence[Mapping[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        task: str,
+        json_mode: bool,
+        parts: list,
+    ) -> Iterator[str]:
+        payload = self._build_payload(messages, temperature, max_tokens, json_mode)
+        payload["stream"] = True
+        # The slot is held until the stream is drained or closed
+        with track_llm(task, self._model) as usage, get_limiter("llm").slot(
+            task, estimate_tokens(messages, max_tokens)
+        ) as permit:
+            started = time.perf_counter()
+            response = call_with_policy(task, lambda timeout: self._create(dict(payload), timeout), self._endpoint)
+            reported = None
+            try:
+                for chunk in response:
+                    if getattr(chunk, "usage", None) is not None:
+                        # Endpoints that send usage put it on a final chunk without choices
+                        reported = chunk
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta is not None and delta.content:
+                        if not usage.completion_tokens:
+                            LLM_FIRST_TOKEN.observe(time.perf_counter() - started, task=task, model=self._model)
+                        # Providers send about one token per chunk; close enough for throughput
+                        usage.completion_tokens += 1
+                        parts.append(delta.content)
+                        yield delta.content
+            finally:
+                # Release the pooled connection even if the consumer stops early
+                close = getattr(response, "close", None)
+                if close is not None:
+                    close()
+                if reported is not None:
+                    usage.from_openai(reported)
+                else:
+                    usage.prompt_tokens = estimate_prompt_tokens(messages)
+                # Charge the tokens/min budget what the stream used, not the up-front estimate
+                permit.settle(usage.prompt_tokens + usage.completion_tokens)
 
 
 def get_llm_provider(env: Optional[Dict[str, str]] = None) -> OpenAIProvider:
     cfg = read_llm_configuration(env)
-    if OpenAI is None:
-        raise RuntimeError(
-            "openai package is not available. Ensure dependencies are installed inside the container."
-        )
-    client = OpenAI(api_key=cfg.api_key, base_url=cfg.base_url)
-    return OpenAIProvider(client=client, model=cfg.model)
+    key = (cfg.base_url, cfg.api_key, cfg.model)
+    with _registry_lock:
+        provider = _providers.get(key)
+    if provider is None:
+        provider = OpenAIProvider(client=get_openai_client(cfg), model=cfg.model, base_url=cfg.base_url)
+        with _registry_lock:
+            provider = _providers.setdefault(key, provider)
+    return provider
 
 
@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+from pydantic import BaseModel, ConfigDict
+
+
+T = TypeVar("T")
+
+
+class CallPolicy(BaseModel):
+    """Timeout, retry and hedging settings for one kind of LLM call."""
+
+    model_config = ConfigDict(frozen=True)
+
+    timeout: float = 60.0
+    attempts: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    # Fire a duplicate request when the first is slower than this latency quantile
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_delay: float = 1.0
+    hedge_min_samples: int = 20
+
+
+class BreakerSettings(BaseModel):
+    """Circuit-breaker settings; one breaker per endpoint is shared by every task calling it."""
+
+    model_config = ConfigDict(frozen=True)
+
+    threshold: int = 5
+    reset: float = 30.0
+
+
+TASK_POLICIES: Dict[str, CallPolicy] = {
+    "default": CallPolicy(),
+    "tutoring": CallPolicy(timeout=60.0, attempts=3),
+    # Short non-streamed opener: cheap to duplicate, and the learner is waiting on it
+    "greeting": CallPolicy(timeout=20.0, attempts=2, hedge=True),
+    "quiz": CallPolicy(timeout=90.0, attempts=3),
+    "remediation": CallPolicy(timeout=90.0, attempts=3),
+    "summary": CallPolicy(timeout=30.0, attempts=2),
+    "transcription": CallPolicy(timeout=60.0, attempts=3),
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the endpoint while its circuit breaker is open."""
+
+
+def get_policy(task: str, env: Optional[Dict[str, str]] = None) -> CallPolicy:
+    """Policy for ``task`` with env overrides such as ``LLM_QUIZ_TIMEOUT=30`` or ``LLM_GREETING_HEDGE=0``."""
+    environment = env if env is not None else os.environ
+    policy = TASK_POLICIES.get(task, TASK_POLICIES["default"])
+    overrides: Dict[str, str] = {}
+    for field in CallPolicy.model_fields:
+        value = environment.get(f"LLM_{task.upper()}_{field.upper()}", "").strip()
+        if value:
+            overrides[field] = value
+    if not overrides:
+        return policy
+    return CallPolicy.model_validate({**policy.model_dump(), **overrides})
+
+
+def get_breaker_settings(env: Optional[Dict[str, str]] = None) -> BreakerSettings:
+    """Breaker settings with env overrides ``LLM_BREAKER_THRESHOLD`` and ``LLM_BREAKER_RESET``."""
+    environment = env if env is not None else os.environ
+    overrides: Dict[str, str] = {}
+    for field in BreakerSettings.model_fields:
+        value = environment.get(f"LLM_BREAKER_{field.upper()}", "").strip()
+        if value:
+            overrides[field] = value
+    return BreakerSettings.model_validate(overrides)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection failures, rate limits and 5xx responses are worth another attempt."""
+    if isinstance(exc, (TimeoutError, ConnectionError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 408 or status == 429 or status >= 500
+    # openai's APITimeoutError / APIConnectionError carry no status code
+    return type(exc).__name__ in ("APITimeoutError", "APIConnectionError")
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive retryable failures; lets one probe through after ``reset_after``."""
+
+    def __init__(self, threshold: int = 5, reset_after: float = 30.0) -> None:
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_after or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class _TaskStats:
+    # Updated from caller threads and hedge workers at once, so every access takes the lock
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: Deque[float] = deque(maxlen=200)
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+
+    def add(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self.latencies)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "rejected": self.rejected,
+            }
+        return {**counts, "p95": self.quantile(0.95)}
+
+
+_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+_stats: Dict[str, _TaskStats] = {}
+# Hedged attempts run here so the caller can wait on whichever finishes first
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+def _breaker(endpoint: str) -> CircuitBreaker:
+    with _lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            settings = get_breaker_settings()
+            breaker = CircuitBreaker(settings.threshold, settings.reset)
+            _breakers[endpoint] = breaker
+        return breaker
+
+
+def _task_stats(task: str) -> _TaskStats:
+    with _lock:
+        return _stats.setdefault(task, _TaskStats())
+
+
+def _backoff(policy: CallPolicy, attempt: int) -> float:
+    # "Full jitter": uniform in [0, capped exponential] spreads retries of many callers apart
+    return random.uniform(0, min(policy.backoff_max, policy.backoff_base * (2 ** attempt)))
+
+
+def _hedge_delay(policy: CallPolicy, stats: _TaskStats) -> Optional[float]:
+    if not policy.hedge or stats.samples() < policy.hedge_min_samples:
+        return None
+    return max(policy.hedge_min_delay, stats.quantile(policy.hedge_quantile) or 0.0)
+
+
+def _discard(result: Any) -> None:
+    # A losing attempt may hold a pooled connection (e.g. an open stream); give it back
+    close = getattr(result, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def _discard_when_done(future) -> None:
+    def close_result(done) -> None:
+        if not done.cancelled() and done.exception() is None:
+            _discard(done.result())
+
+    if not future.cancel():
+        future.add_done_callback(close_result)
+
+
+def _run_hedged(fn: Callable[[float], T], policy: CallPolicy, stats: _TaskStats, delay: float) -> T:
+    # Attempts run on pool threads with a copy of the caller's context (limiter priority, request state)
+    first = _hedge_pool.submit(contextvars.copy_context().run, fn, policy.timeout)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+    stats.add("hedges")
+    second = _hedge_pool.submit(contextvars.copy_context().run, fn, policy.timeout)
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    stats.add("hedge_wins")
+                for other in ({first, second} - {future}):
+                    _discard_when_done(other)
+                return future.result()
+            error = future.exception()
+    assert error is not None
+    raise error
+
+
+def call_with_policy(task: str, fn: Callable[[float], T], endpoint: str = "llm") -> T:
+    """Run ``fn(timeout)`` under ``task``'s policy: breaker check, optional hedge, jittered retries.
+
+    ``fn`` must apply the timeout it is given to its own request.
+    """
+    policy = get_policy(task)
+    breaker = _breaker(endpoint)
+    stats = _task_stats(task)
+    stats.add("calls")
+    attempts = max(policy.attempts, 1)
+    for attempt in range(attempts):
+        if not breaker.allow():
+            stats.add("rejected")
+            raise CircuitOpenError(f"LLM endpoint {endpoint} is unavailable; retry in a few seconds.")
+        started = time.perf_counter()
+        try:
+            delay = _hedge_delay(policy, stats)
+            result = fn(policy.timeout) if delay is None else _run_hedged(fn, policy, stats, delay)
+        except Exception as exc:
+            if not is_retryable(exc):
+                # The endpoint answered (e.g. a 400); that says nothing about its health
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            stats.add("retries")
+            time.sleep(_backoff(policy, attempt))
+            continue
+        breaker.record_success()
+        stats.observe(time.perf_counter() - started)
+        return result
+    raise AssertionError("unreachable")
+
+
+async def acall_with_policy(task: str, fn: Callable[[float], Awaitable[T]], endpoint: str = "llm") -> T:
+    """Async ``call_with_policy``: hedges are tasks on the running loop instead of pool threads."""
+    policy = get_policy(task)
+    breaker = _breaker(endpoint)
+    stats = _task_stats(task)
+    stats.add("calls")
+    attempts = max(policy.attempts, 1)
+    for attempt in range(attempts):
+        if not breaker.allow():
+            stats.add("rejected")
+            raise CircuitOpenError(f"LLM endpoint {endpoint} is unavailable; retry in a few seconds.")
+        started = time.perf_counter()
+        try:
+            delay = _hedge_delay(policy, stats)
+            if delay is None:
+                result = await asyncio.wait_for(fn(policy.timeout), policy.timeout)
+            else:
+                result = await _arun_hedged(fn, policy, stats, delay)
+        except Exception as exc:
+            if not is_retryable(exc):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            stats.add("retries")
+            await asyncio.sleep(_backoff(policy, attempt))
+            continue
+        breaker.record_success()
+        stats.observe(time.perf_counter() - started)
+        return result
+    raise AssertionError("unreachable")
+
+
+async def _arun_hedged(fn: Callable[[float], Awaitable[T]], policy: CallPolicy, stats: _TaskStats, delay: float) -> T:
+    first = asyncio.ensure_future(asyncio.wait_for(fn(policy.timeout), policy.timeout))
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+    stats.add("hedges")
+    second = asyncio.ensure_future(asyncio.wait_for(fn(policy.timeout), policy.timeout))
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        stats.add("hedge_wins")
+                    for other in done - {task}:
+                        if other.exception() is None:
+                            _discard(other.result())
+                    return task.result()
+                error = task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+    assert error is not None
+    raise error
+
+
+def resilience_stats() -> Dict[str, Dict]:
+    """Per-task call/retry/hedge counters and p95 latency, plus circuit breaker states."""
+    with _lock:
+        tasks = dict(_stats)
+        breakers = dict(_breakers)
+    return {
+        "tasks": {task: s.snapshot() for task, s in tasks.items()},
+        "breakers": {endpoint: b.state for endpoint, b in breakers.items()},
+    }
+
+
+def reset_resilience() -> None:
+    with _lock:
+        _breakers.clear()
+        _stats.clear()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Sequence
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    latency REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+"""
+
+
+def make_cache_key(model: str, messages: Sequence[Mapping[str, str]], params: Mapping[str, object]) -> str:
+    """Stable hash of a request: model, every message (role and content) and the sampling params."""
+    raw = json.dumps(
+        {
+            "model": model,
+            "messages": [[m.get("role", ""), m.get("content", "")] for m in messages],
+            "params": dict(params),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of completion texts in a SQLite file (WAL mode).
+
+    Meant for deterministic (temperature 0) calls such as quiz and remediation
+    generation. The file survives restarts and is shared by all workers on a
+    host; each entry remembers how long the original call took, so hits report
+    the latency they saved. Hit/miss counters are per process.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = Path("data") / "llm_cache.db",
+        max_entries: int = 2000,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ) -> None:
+        self.path: Path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT response, created_at, latency FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and now - row[1] > self.ttl_seconds:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            with self._stats_lock:
+                self.misses += 1
+            return None
+        conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        with self._stats_lock:
+            self.hits += 1
+            self.latency_saved += row[2]
+        return row[0]
+
+    def put(self, key: str, model: str, response: str, latency: float = 0.0) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used, latency) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, now, now, latency),
+            )
+            # Evict least recently used entries beyond the size bound
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                "entries": len(self),
+                "hits": self.hits,
+                "misses": self.misses,
+                "latency_saved": round(self.latency_saved, 3),
+            }
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def is_response_cache_enabled(env: Optional[Dict[str, str]] = None) -> bool:
+    environment = env if env is not None else os.environ
+    return environment.get("LLM_RESPONSE_CACHE", "on").strip().lower() not in ("0", "false", "off", "no")
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache configured from the environment, or ``None`` when opted out.
+
+    ``LLM_RESPONSE_CACHE=off`` disables it; ``LLM_RESPONSE_CACHE_PATH``,
+    ``LLM_RESPONSE_CACHE_MAX_ENTRIES`` and ``LLM_RESPONSE_CACHE_TTL`` (seconds) tune it.
+    """
+    global _default_cache
+    if not is_response_cache_enabled():
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                path=os.environ.get("LLM_RESPONSE_CACHE_PATH", "").strip() or Path("data") / "llm_cache.db",
+                max_entries=int(os.environ.get("LLM_RESPONSE_CACHE_MAX_ENTRIES", "2000")),
+                ttl_seconds=float(os.environ.get("LLM_RESPONSE_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+        return _default_cache
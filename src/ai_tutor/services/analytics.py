@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import io
+import json
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ai_tutor.services.fileio import atomic_write_bytes, file_lock
+
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def _grow(array: np.ndarray, size: int, axis: int) -> np.ndarray:
+    """Return ``array`` enlarged (by doubling) so that ``axis`` has at least ``size`` slots."""
+    current = array.shape[axis]
+    if size <= current:
+        return array
+    new_shape = list(array.shape)
+    new_shape[axis] = max(size, current * 2, 8)
+    grown = np.zeros(new_shape, dtype=array.dtype)
+    grown[tuple(slice(0, n) for n in array.shape)] = array
+    return grown
+
+
+class MasteryAnalytics:
+    """Incrementally maintained mastery statistics over quiz results.
+
+    Keeps attempted and correct answers per (learner, topic) cell and
+    difficulty, plus per-question attempt/miss counts, as NumPy arrays. The
+    learner x topic counts are sparse: one row per cell that has attempts
+    (coordinates in ``_cell_learner``/``_cell_topic``), so memory and
+    checkpoints grow with recorded results, not learners times topics. Each
+    recorded result is one line appended to a journal; the arrays are
+    checkpointed to ``mastery.npz`` every ``checkpoint_every`` results and the
+    journal restarted. Loading is checkpoint + journal replay, and other
+    processes' records are picked up by replaying new journal bytes.
+    """
+
+    def __init__(self, base_dir: Path | str = Path("data"), checkpoint_every: int = 1000) -> None:
+        self.dir: Path = Path(base_dir) / "analytics"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_path: Path = self.dir / "mastery.npz"
+        self.checkpoint_every = checkpoint_every
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    # ---- state -----------------------------------------------------------
+
+    def _reset(self) -> None:
+        self.learners: List[str] = []
+        self.topics: List[str] = []
+        self.questions: List[str] = []
+        self._learner_ids: Dict[str, int] = {}
+        self._topic_ids: Dict[str, int] = {}
+        self._question_ids: Dict[str, int] = {}
+        # Sparse learner x topic counts: row r holds cell (_cell_learner[r], _cell_topic[r])
+        self._cell_learner = np.zeros(0, dtype=np.int32)
+        self._cell_topic = np.zeros(0, dtype=np.int32)
+        self._attempts = np.zeros((0, len(DIFFICULTIES)), dtype=np.int32)
+        self._correct = np.zeros((0, len(DIFFICULTIES)), dtype=np.int32)
+        self._cell_ids: Dict[Tuple[int, int], int] = {}
+        self._learner_cells: Dict[int, List[int]] = {}
+        self._q_attempts = np.zeros(0, dtype=np.int32)
+        self._q_misses = np.zeros(0, dtype=np.int32)
+        self._journal_id = ""
+        self._journal_offset = 0
+        self._pending = 0
+        self._checkpoint_mtime: Optional[int] = None
+
+    def _journal_path(self, journal_id: str) -> Path:
+        return self.dir / f"journal-{journal_id}.jsonl"
+
+    def _intern(self, names: List[str], ids: Dict[str, int], name: str) -> int:
+        index = ids.get(name)
+        if index is None:
+            index = len(names)
+            ids[name] = index
+            names.append(name)
+        return index
+
+    def _cell(self, learner: int, topic: int) -> int:
+        row = self._cell_ids.get((learner, topic))
+        if row is None:
+            row = len(self._cell_ids)
+            self._cell_ids[(learner, topic)] = row
+            self._learner_cells.setdefault(learner, []).append(row)
+            self._cell_learner = _grow(self._cell_learner, row + 1, 0)
+            self._cell_topic = _grow(self._cell_topic, row + 1, 0)
+            self._attempts = _grow(self._attempts, row + 1, 0)
+            self._correct = _grow(self._correct, row + 1, 0)
+            self._cell_learner[row] = learner
+            self._cell_topic[row] = topic
+        return row
+
+    def _index_cells(self) -> None:
+        self._cell_ids = {}
+        self._learner_cells = {}
+        for row, (learner, topic) in enumerate(zip(self._cell_learner.tolist(), self._cell_topic.tolist())):
+            self._cell_ids[(learner, topic)] = row
+            self._learner_cells.setdefault(learner, []).append(row)
+
+    def _load(self) -> None:
+        self._reset()
+        if self.checkpoint_path.exists():
+            self._checkpoint_mtime = self.checkpoint_path.stat().st_mtime_ns
+            with np.load(self.checkpoint_path, allow_pickle=False) as data:
+                self.learners = [str(x) for x in data["learners"]]
+                self.topics = [str(x) for x in data["topics"]]
+                self.questions = [str(x) for x in data["questions"]]
+                if "cell_learner" in data:
+                    self._cell_learner = data["cell_learner"].copy()
+                    self._cell_topic = data["cell_topic"].copy()
+                    self._attempts = data["attempts"].copy()
+                    self._correct = data["correct"].copy()
+                else:
+                    # Checkpoint from the dense learner x topic x difficulty layout
+                    dense_attempts, dense_correct = data["attempts"], data["correct"]
+                    learners, topics = np.nonzero(dense_attempts.sum(axis=2))
+                    self._cell_learner = learners.astype(np.int32)
+                    self._cell_topic = topics.astype(np.int32)
+                    self._attempts = dense_attempts[learners, topics].astype(np.int32)
+                    self._correct = dense_correct[learners, topics].astype(np.int32)
+                self._q_attempts = data["q_attempts"].copy()
+                self._q_misses = data["q_misses"].copy()
+                self._journal_id = str(data["journal_id"])
+            self._learner_ids = {name: i for i, name in enumerate(self.learners)}
+            self._topic_ids = {name: i for i, name in enumerate(self.topics)}
+            self._question_ids = {name: i for i, name in enumerate(self.questions)}
+            self._index_cells()
+        else:
+            # Well-known name so every process appends to the same journal before the first checkpoint
+            self._journal_id = "initial"
+        self._replay()
+
+    def _refresh(self) -> None:
+        # Another process may have checkpointed (new journal) or appended records
+        mtime = self.checkpoint_path.stat().st_mtime_ns if self.checkpoint_path.exists() else None
+        if mtime != self._checkpoint_mtime:
+            self._load()
+        else:
+            self._replay()
+
+    def _replay(self) -> None:
+        path = self._journal_path(self._journal_id)
+        if not path.exists():
+            return
+        with path.open("rb") as fh:
+            fh.seek(self._journal_offset)
+            chunk = fh.read()
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except Exception:
+                continue
+            self._apply(record)
+            self._pending += 1
+        self._journal_offset += end
+
+    def _apply(self, record: Dict) -> None:
+        learner = self._intern(self.learners, self._learner_ids, record["l"])
+        topic = self._intern(self.topics, self._topic_ids, record["t"])
+        difficulty = DIFFICULTIES.index(record["d"]) if record["d"] in DIFFICULTIES else 1
+        row = self._cell(learner, topic)
+        self._attempts[row, difficulty] += record["n"]
+        self._correct[row, difficulty] += record["c"]
+
+        question_ids = [
+            self._intern(self.questions, self._question_ids, f"{record['q']}:{i}") for i in range(record["n"])
+        ]
+        if question_ids:
+            self._q_attempts = _grow(self._q_attempts, len(self.questions), 0)
+            self._q_misses = _grow(self._q_misses, len(self.questions), 0)
+            self._q_attempts[question_ids] += 1
+            missed = [question_ids[i] for i in record["x"] if 0 <= i < len(question_ids)]
+            np.add.at(self._q_misses, missed, 1)
+
+    # ---- updates ---------------------------------------------------------
+
+    def record(
+        self,
+        learner_id: str,
+        topic: str,
+        difficulty: str,
+        quiz_id: str,
+        total_questions: int,
+        correct_answers: int,
+        incorrect_indices: Sequence[int],
+    ) -> None:
+        record = {
+            "l": learner_id,
+            "t": topic,
+            "d": difficulty,
+            "q": quiz_id,
+            "n": int(total_questions),
+            "c": int(correct_answers),
+            "x": [int(i) for i in incorrect_indices],
+        }
+        # The file lock keeps other processes from switching journals mid-append
+        with self._lock, file_lock(self.dir / "journal.lock"):
+            self._refresh()
+            with self._journal_path(self._journal_id).open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._replay()
+            if self._pending >= self.checkpoint_every:
+                self._checkpoint()
+
+    def rebuild(self, results: Iterable[Dict]) -> int:
+        """Recompute everything from stored result payloads (e.g. ``QuizStore.list_results()``)."""
+        with self._lock, file_lock(self.dir / "journal.lock"):
+            old_journal = self._journal_path(self._journal_id)
+            self._reset()
+            self._journal_id = uuid.uuid4().hex
+            count = 0
+            for r in results:
+                self._apply(
+                    {
+                        "l": r.get("learner_id") or r["session_id"],
+                        "t": r.get("topic", ""),
+                        "d": r.get("difficulty", "medium"),
+                        "q": r["quiz_id"],
+                        "n": int(r.get("total_questions", 0)),
+                        "c": int(r.get("correct_answers", 0)),
+                        "x": r.get("incorrect_indices", []),
+                    }
+                )
+                count += 1
+            self._checkpoint()
+            old_journal.unlink(missing_ok=True)
+            return count
+
+    def checkpoint(self) -> None:
+        with self._lock, file_lock(self.dir / "journal.lock"):
+            self._refresh()
+            self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        old_journal = self._journal_path(self._journal_id)
+        new_id = uuid.uuid4().hex
+        nc, nq = len(self._cell_ids), len(self.questions)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            learners=np.array(self.learners, dtype=str),
+            topics=np.array(self.topics, dtype=str),
+            questions=np.array(self.questions, dtype=str),
+            cell_learner=self._cell_learner[:nc],
+            cell_topic=self._cell_topic[:nc],
+            attempts=self._attempts[:nc],
+            correct=self._correct[:nc],
+            q_attempts=self._q_attempts[:nq],
+            q_misses=self._q_misses[:nq],
+            journal_id=np.array(new_id),
+        )
+        # The checkpoint includes every journal record so far; records go to a fresh journal
+        atomic_write_bytes(self.checkpoint_path, buffer.getvalue())
+        old_journal.unlink(missing_ok=True)
+        self._journal_id = new_id
+        self._journal_offset = 0
+        self._pending = 0
+        self._checkpoint_mtime = self.checkpoint_path.stat().st_mtime_ns
+
+    # ---- queries ---------------------------------------------------------
+
+    def mastery(self, learner_id: str) -> Dict[str, Dict[str, float]]:
+        """Share of correct answers per topic and difficulty for one learner."""
+        with self._lock:
+            self._refresh()
+            learner = self._learner_ids.get(learner_id)
+            if learner is None:
+                return {}
+            rows = np.array(self._learner_cells.get(learner, []), dtype=np.intp)
+            attempts = self._attempts[rows]
+            correct = self._correct[rows]
+            out: Dict[str, Dict[str, float]] = {}
+            for i, d in zip(*np.nonzero(attempts)):
+                topic = self.topics[self._cell_topic[rows[i]]]
+                out.setdefault(topic, {})[DIFFICULTIES[d]] = float(correct[i, d] / attempts[i, d])
+            return out
+
+    def weakest_topics(self, learner_id: str, k: int = 5, min_attempts: int = 1) -> List[Dict]:
+        """Topics with the lowest share of correct answers for a learner."""
+        with self._lock:
+            self._refresh()
+            learner = self._learner_ids.get(learner_id)
+            if learner is None:
+                return []
+            rows = np.array(self._learner_cells.get(learner, []), dtype=np.intp)
+            attempts = self._attempts[rows].sum(axis=1)
+            correct = self._correct[rows].sum(axis=1)
+            eligible = np.nonzero(attempts >= max(min_attempts, 1))[0]
+            if eligible.size == 0:
+                return []
+            rates = correct[eligible] / attempts[eligible]
+            order = eligible[np.argsort(rates, kind="stable")[:k]]
+            return [
+                {
+                    "topic": self.topics[self._cell_topic[rows[i]]],
+                    "mastery": float(correct[i] / attempts[i]),
+                    "attempts": int(attempts[i]),
+                }
+                for i in order
+            ]
+
+    def hardest_questions(self, k: int = 10, min_attempts: int = 1) -> List[Dict]:
+        """Questions (``<quiz_id>:<index>``) with the highest miss rate overall."""
+        with self._lock:
+            self._refresh()
+            n = len(self.questions)
+            attempts = self._q_attempts[:n]
+            eligible = np.nonzero(attempts >= max(min_attempts, 1))[0]
+            if eligible.size == 0:
+                return []
+            rates = self._q_misses[eligible] / attempts[eligible]
+            k = min(k, eligible.size)
+            top = np.argpartition(-rates, k - 1)[:k]
+            top = top[np.argsort(-rates[top], kind="stable")]
+            return [
+                {
+                    "question": self.questions[eligible[i]],
+                    "miss_rate": float(rates[i]),
+                    "attempts": int(attempts[eligible[i]]),
+                }
+                for i in top
+            ]
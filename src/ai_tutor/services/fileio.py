@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+try:
+    import fcntl  # type: ignore
+except Exception:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore
+
+
+def atomic_write_bytes(path: Path | str, data: bytes) -> None:
+    """Write ``data`` to a temp file in the same directory and rename it over ``path``.
+
+    Readers see either the old or the new file, never a partially written one.
+    """
+    target = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write_text(path: Path | str, text: str) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+@contextmanager
+def file_lock(path: Path | str) -> Iterator[None]:
+    """Hold an exclusive advisory lock on ``path`` (created if missing).
+
+    Serializes writers across threads and processes on one host. On platforms
+    without ``fcntl`` this is a no-op. A lock file may be unlinked only by its
+    holder; a waiter that then wins the lock on the unlinked inode notices and
+    locks whatever file is now at ``path`` instead.
+    """
+    if fcntl is None:  # pragma: no cover - non-POSIX platforms
+        yield
+        return
+    while True:
+        fh = open(path, "a")
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(fh.fileno()).st_ino:
+                continue
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            return
+        finally:
+            fh.close()
+
+
+def read_tail_lines(path: Path | str, n: int, block_size: int = 8192) -> List[bytes]:
+    """Return up to the last ``n`` complete lines of a file, reading backwards from the end.
+
+    A trailing fragment without a newline (an append in progress) is ignored.
+    """
+    if n <= 0:
+        return []
+    with open(path, "rb") as fh:
+        fh.seek(0, os.SEEK_END)
+        end = fh.tell()
+        buffer = b""
+        pos = end
+        while pos > 0 and buffer.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            fh.seek(pos)
+            buffer = fh.read(step) + buffer
+    cut = buffer.rfind(b"\n")
+    if cut == -1:
+        return []
+    lines = [line for line in buffer[:cut].split(b"\n") if line.strip()]
+    if pos > 0:
+        # The first piece may be a partial line cut at the block boundary
+        lines = lines[1:]
+    return lines[-n:]
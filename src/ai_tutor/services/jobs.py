@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ai_tutor.services.limiter import speculative
+from ai_tutor.services.quiz import MCQQuiz, stream_mcq_quiz
+from ai_tutor.services.quiz_store import QuizStore
+from ai_tutor.services.remediation import generate_remediation
+from ai_tutor.services.session_store import Session
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when too many jobs are already waiting; try again shortly."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str  # "quiz" or "remediation"
+    session_id: str
+    key: str
+    status: str = "queued"  # queued, running, done, failed, cancelled
+    speculative: bool = False
+    # A click has taken this speculative job's result; the next click starts fresh work
+    claimed: bool = False
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    # quiz: {"quiz_id"}; remediation: {"quiz_id", "incorrect_indices"} of the lesson saved with QuizStore.save_lesson
+    result: Optional[Dict] = None
+    # Quiz questions parsed so far while the job runs (cleared once the quiz is saved)
+    partial: List[Dict] = field(default_factory=list)
+    # Process running the job, and its last heartbeat; lets another process tell
+    # a job that is still in progress from one whose worker has gone away
+    owner_host: str = ""
+    owner_pid: int = 0
+    updated_at: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+
+def _job_key(*parts: object) -> str:
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def is_speculation_enabled(env: Optional[Dict[str, str]] = None) -> bool:
+    environment = env if env is not None else os.environ
+    return environment.get("SPECULATIVE_GENERATION", "off").strip().lower() in ("1", "true", "on", "yes")
+
+
+_HOST = socket.gethostname()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists but belongs to another user
+        return True
+    except OSError:
+        return False
+    return True
+
+
+_executors: "weakref.WeakSet[JobExecutor]" = weakref.WeakSet()
+_executors_lock = threading.Lock()
+
+
+def job_stats() -> Dict[str, int]:
+    """Job counts by status across this process's executors."""
+    with _executors_lock:
+        executors = list(_executors)
+    totals: Dict[str, int] = {}
+    for executor in executors:
+        for status, count in executor.stats().items():
+            totals[status] = totals.get(status, 0) + count
+    return totals
+
+
+class JobExecutor:
+    """Runs quiz and remediation generation on a bounded thread pool.
+
+    ``submit_*`` returns a job ID at once; callers poll ``get``, which also
+    carries the quiz questions streamed so far (``Job.partial``). Generated
+    quizzes and lessons are saved through ``QuizStore`` and job records are
+    persisted alongside, so a page rerun (or another worker) can pick them up.
+
+    A job is identified by what it would generate (session, conversation
+    length, parameters). Submitting the same work again returns the existing
+    job, which is how speculation pays off: with ``speculate=True`` the app
+    submits the likely next quiz after each tutoring turn, and the lesson after
+    each graded quiz, at the lowest limiter priority. A click on "Create quiz"
+    then finds the job done or running. A newer speculation for the same
+    session replaces an older one that has not started yet. Outside of that,
+    only queued or running jobs are shared: asking again for work that has
+    already been delivered starts a new job (e.g. another quiz on the topic).
+
+    While jobs are queued or running, a heartbeat thread re-saves their records
+    every ``heartbeat`` seconds. Another process reading a persisted job reports
+    it interrupted only once its owner process has exited (same host) or the
+    heartbeat is older than ``stale_after`` seconds.
+    """
+
+    def __init__(
+        self,
+        quiz_store: QuizStore,
+        max_workers: int = 2,
+        max_pending: int = 32,
+        speculate: Optional[bool] = None,
+        retention: float = 3600.0,
+        heartbeat: float = 10.0,
+        stale_after: float = 60.0,
+    ) -> None:
+        self.quiz_store = quiz_store
+        self.max_pending = max_pending
+        self.retention = retention
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self.speculate = is_speculation_enabled() if speculate is None else speculate
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tutor-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._futures: Dict[str, Future] = {}
+        self._by_key: Dict[str, str] = {}
+        self._speculative: Dict[Tuple[str, str], str] = {}
+        self._persist_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        with _executors_lock:
+            _executors.add(self)
+
+    # ---- submission ------------------------------------------------------
+
+    def submit_quiz(
+        self,
+        session: Session,
+        topic: str,
+        num_questions: int = 5,
+        difficulty: str = "medium",
+        speculative_run: bool = False,
+    ) -> Optional[str]:
+        key = _job_key("quiz", session.session_id, len(session.messages), topic, num_questions, difficulty)
+        messages = list(session.messages)
+
+        def run(report: Callable[[Dict], None]) -> Dict:
+            quiz = None
+            for item in stream_mcq_quiz(
+                subject=session.subject,
+                topic=topic,
+                conversation_messages=messages,
+                num_questions=num_questions,
+                difficulty=difficulty,  # type: ignore[arg-type]
+                summary=session.summary,
+                summary_upto=session.summary_upto,
+            ):
+                if isinstance(item, MCQQuiz):
+                    quiz = item
+                else:
+                    report(item.model_dump())
+            if quiz is None:
+                raise RuntimeError("Quiz generation ended without a quiz")
+            self.quiz_store.save_quiz(session_id=session.session_id, quiz_id=quiz.quiz_id, payload=quiz.model_dump())
+            return {"quiz_id": quiz.quiz_id}
+
+        return self._submit("quiz", session.session_id, key, run, speculative_run)
+
+    def submit_remediation(
+        self,
+        session: Session,
+        quiz: Dict,
+        incorrect_indices: List[int],
+        speculative_run: bool = False,
+    ) -> Optional[str]:
+        quiz_id = quiz.get("quiz_id", "")
+        key = _job_key("remediation", session.session_id, len(session.messages), quiz_id, sorted(incorrect_indices))
+        messages = list(session.messages)
+
+        def run(report: Callable[[Dict], None]) -> Dict:
+            lesson = generate_remediation(
+                subject=session.subject,
+                topic=quiz.get("topic", ""),
+                quiz=quiz,
+                incorrect_indices=incorrect_indices,
+                language=getattr(session, "language", "en"),
+                conversation_messages=messages,
+                summary=session.summary,
+                summary_upto=session.summary_upto,
+            )
+            self.quiz_store.save_lesson(
+                session.session_id,
+                quiz_id,
+                incorrect_indices,
+                {"quiz_id": quiz_id, "incorrect_indices": incorrect_indices, "lesson": lesson},
+            )
+            return {"quiz_id": quiz_id, "incorrect_indices": incorrect_indices}
+
+        return self._submit("remediation", session.session_id, key, run, speculative_run)
+
+    def speculate_quiz(self, session: Session, topic: str, num_questions: int = 5, difficulty: str = "medium") -> Optional[str]:
+        """Pre-generate the quiz the learner would get next; no-op unless speculation is on."""
+        if not self.speculate:
+            return None
+        return self.submit_quiz(session, topic, num_questions, difficulty, speculative_run=True)
+
+    def speculate_remediation(self, session: Session, quiz: Dict, incorrect_indices: List[int]) -> Optional[str]:
+        if not self.speculate or not incorrect_indices:
+            return None
+        return self.submit_remediation(session, quiz, incorrect_indices, speculative_run=True)
+
+    def _submit(
+        self, kind: str, session_id: str, key: str, run: Callable[[Callable[[Dict], None]], Dict], speculative_run: bool
+    ) -> Optional[str]:
+        cancelled: List[Job] = []
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(key, ""))
+            if existing is not None and not speculative_run and existing.speculative and existing.status == "queued":
+                # Someone is waiting now: re-queue the work at its normal priority
+                if self._cancel_locked(existing):
+                    cancelled.append(existing)
+            if existing is not None and self._reusable_locked(existing, speculative_run):
+                if not speculative_run and existing.speculative:
+                    existing.claimed = True
+                return existing.job_id
+            if speculative_run:
+                previous = self._jobs.get(self._speculative.get((session_id, kind), ""))
+                if previous is not None and previous.status == "queued" and self._cancel_locked(previous):
+                    cancelled.append(previous)
+            self._prune_locked()
+            pending = sum(1 for job in self._jobs.values() if job.status == "queued")
+            if pending >= self.max_pending:
+                if speculative_run:
+                    return None
+                raise JobQueueFullError("Too many generation jobs are queued; please try again in a moment.")
+            job = Job(
+                job_id=uuid.uuid4().hex,
+                kind=kind,
+                session_id=session_id,
+                key=key,
+                speculative=speculative_run,
+                owner_host=_HOST,
+                owner_pid=os.getpid(),
+            )
+            self._jobs[job.job_id] = job
+            self._by_key[key] = job.job_id
+            if speculative_run:
+                self._speculative[(session_id, kind)] = job.job_id
+            self._start_heartbeat_locked()
+        for old in cancelled:
+            self._persist(old)
+        self._persist(job)
+        future = self._pool.submit(self._run, job, run)
+        with self._lock:
+            self._futures[job.job_id] = future
+        return job.job_id
+
+    @staticmethod
+    def _reusable_locked(job: Job, speculative_run: bool) -> bool:
+        if job.status in ("queued", "running"):
+            return True
+        if job.status != "done":
+            return False
+        # A finished speculative result is handed to the first click only
+        return speculative_run or (job.speculative and not job.claimed)
+
+    def _prune_locked(self) -> None:
+        # Finished jobs are polled for a little while after completion, then forgotten
+        cutoff = time.time() - self.retention
+        for job in [j for j in self._jobs.values() if j.finished and (j.finished_at or 0) < cutoff]:
+            del self._jobs[job.job_id]
+            self._futures.pop(job.job_id, None)
+            if self._by_key.get(job.key) == job.job_id:
+                del self._by_key[job.key]
+            try:
+                self.quiz_store.delete_job(job.job_id)
+            except Exception:
+                pass
+
+    def _cancel_locked(self, job: Job) -> bool:
+        future = self._futures.get(job.job_id)
+        if future is not None and not future.cancel():
+            # Already picked up by a worker
+            return False
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        if self._by_key.get(job.key) == job.job_id:
+            del self._by_key[job.key]
+        return True
+
+    # ---- execution -------------------------------------------------------
+
+    def _run(self, job: Job, run: Callable[[Callable[[Dict], None]], Dict]) -> None:
+        with self._lock:
+            if job.status != "queued":
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        self._persist(job)
+        def report(item: Dict) -> None:
+            with self._lock:
+                job.partial.append(item)
+
+        try:
+            if job.speculative:
+                with speculative():
+                    result = run(report)
+            else:
+                result = run(report)
+        except Exception as exc:
+            with self._lock:
+                job.status, job.error = "failed", str(exc)
+                job.finished_at = time.time()
+        else:
+            with self._lock:
+                job.status, job.result = "done", result
+                job.finished_at = time.time()
+                job.partial = []
+        finally:
+            with self._lock:
+                self._futures.pop(job.job_id, None)
+        self._persist(job)
+
+    def _persist(self, job: Job) -> None:
+        # Snapshot and write together, so a heartbeat never overwrites a newer record
+        with self._persist_lock:
+            with self._lock:
+                job.updated_at = time.time()
+                record = asdict(job)
+            try:
+                self.quiz_store.save_job(record)
+            except Exception:
+                # Polling still works from memory in this process
+                pass
+
+    def _start_heartbeat_locked(self) -> None:
+        if self._heartbeat_thread is None:
+            self._heartbeat_thread = threading.Thread(target=self._beat, name="tutor-job-heartbeat", daemon=True)
+            self._heartbeat_thread.start()
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.heartbeat):
+            with self._lock:
+                active = [job for job in self._jobs.values() if not job.finished]
+            for job in active:
+                self._persist(job)
+
+    def _interrupted(self, job: Job) -> bool:
+        if job.owner_host == _HOST and job.owner_pid and not _pid_alive(job.owner_pid):
+            return True
+        return time.time() - job.updated_at > self.stale_after
+
+    # ---- polling ---------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Current state of a job from this process, or its persisted record."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return Job(**asdict(job))
+        record = self.quiz_store.load_job(job_id)
+        if record is None:
+            return None
+        job = Job(**record)
+        if not job.finished and self._interrupted(job):
+            # Queued or running in a process that is gone
+            job.status, job.error = "failed", "The job was interrupted; please try again."
+        return job
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            counts["speculative"] = sum(1 for job in self._jobs.values() if job.speculative)
+            return counts
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._stop.set()
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Mapping, Optional, Sequence
+
+from pydantic import BaseModel, ConfigDict
+
+from ai_tutor.services.metrics import get_registry
+
+
+# Priority classes: lower is served first. A learner waiting on a tutoring turn
+# beats quiz/lesson generation, which beats work nobody is waiting for yet.
+INTERACTIVE = 0
+DEFAULT = 1
+BATCH = 2
+SPECULATIVE = 3
+
+TASK_PRIORITIES: Dict[str, int] = {
+    "tutoring": INTERACTIVE,
+    "greeting": INTERACTIVE,
+    # Runs inline while preparing a tutoring turn
+    "summary": INTERACTIVE,
+    "search": INTERACTIVE,
+    "transcription": INTERACTIVE,
+    "default": DEFAULT,
+    "quiz": BATCH,
+    "remediation": BATCH,
+}
+
+# Completion tokens assumed for the tokens/min budget when the caller sets no max_tokens
+DEFAULT_COMPLETION_ESTIMATE = 512
+# Async waiters re-check the queue at least this often
+_ASYNC_POLL = 0.05
+
+QUEUE_WAIT = get_registry().histogram(
+    "limiter_queue_wait_seconds", "Time spent waiting for an upstream slot", ("limiter", "priority")
+)
+REJECTED = get_registry().counter(
+    "limiter_rejected_total", "Calls that gave up waiting for an upstream slot", ("limiter", "priority")
+)
+
+
+class LimiterTimeoutError(RuntimeError):
+    """Raised when a call waited longer than ``max_wait`` for an upstream slot."""
+
+
+class LimiterSettings(BaseModel):
+    """Budget for one upstream; 0 disables a requests/min or tokens/min limit."""
+
+    model_config = ConfigDict(frozen=True)
+
+    max_in_flight: int = 16
+    requests_per_minute: float = 0.0
+    tokens_per_minute: float = 0.0
+    max_wait: float = 120.0
+
+
+_DEFAULTS: Dict[str, LimiterSettings] = {
+    "llm": LimiterSettings(max_in_flight=16),
+    "search": LimiterSettings(max_in_flight=4),
+}
+
+
+def read_limiter_settings(name: str, env: Optional[Dict[str, str]] = None) -> LimiterSettings:
+    """Settings for limiter ``name`` with overrides from ``<NAME>_MAX_IN_FLIGHT``, ``<NAME>_RPM``,
+    ``<NAME>_TPM`` and ``<NAME>_MAX_WAIT`` (e.g. ``LLM_RPM=500``, ``SEARCH_MAX_IN_FLIGHT=2``)."""
+    environment = env if env is not None else os.environ
+    settings = _DEFAULTS.get(name, LimiterSettings())
+    overrides: Dict[str, str] = {}
+    for field, suffix in (
+        ("max_in_flight", "MAX_IN_FLIGHT"),
+        ("requests_per_minute", "RPM"),
+        ("tokens_per_minute", "TPM"),
+        ("max_wait", "MAX_WAIT"),
+    ):
+        value = environment.get(f"{name.upper()}_{suffix}", "").strip()
+        if value:
+            overrides[field] = value
+    if not overrides:
+        return settings
+    return LimiterSettings.model_validate({**settings.model_dump(), **overrides})
+
+
+# Set by background jobs whose result nobody is waiting for yet (see ``speculative``)
+_priority_override: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("limiter_priority", default=None)
+
+
+def priority_for(task: str) -> int:
+    override = _priority_override.get()
+    return override if override is not None else TASK_PRIORITIES.get(task, DEFAULT)
+
+
+@contextmanager
+def speculative() -> Iterator[None]:
+    """Run calls made in this block (this thread or task) at ``SPECULATIVE`` priority."""
+    token = _priority_override.set(SPECULATIVE)
+    try:
+        yield
+    finally:
+        _priority_override.reset(token)
+
+
+def estimate_prompt_tokens(messages: Sequence[Mapping[str, str]]) -> int:
+    return sum(len(m.get("content", "") or "") for m in messages) // 4 + 4 * len(messages)
+
+
+def estimate_tokens(messages: Sequence[Mapping[str, str]], max_tokens: Optional[int] = None) -> int:
+    """Rough request size for the tokens/min budget: prompt chars/4 plus the completion allowance."""
+    return estimate_prompt_tokens(messages) + (max_tokens or DEFAULT_COMPLETION_ESTIMATE)
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute / 60`` per second up to one minute's worth.
+
+    Not thread-safe on its own; the limiter calls it under its lock.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` is available (requests larger than the bucket wait for a full one)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        # Positive returns an over-estimate; negative charges usage beyond it (the level may go below 0)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "tokens", "done")
+
+    def __init__(self, priority: int, seq: int, tokens: int) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.done = False
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Permit:
+    """An acquired slot; ``settle`` corrects the tokens/min charge once real usage is known."""
+
+    def __init__(self, limiter: "Limiter", tokens: int) -> None:
+        self._limiter = limiter
+        self.tokens = tokens
+
+    def settle(self, actual_tokens: int) -> None:
+        if actual_tokens > 0:
+            self._limiter._adjust_tokens(self.tokens - actual_tokens)
+            self.tokens = actual_tokens
+
+
+class Limiter:
+    """Caps concurrent calls to one upstream and paces them to requests/min and tokens/min budgets.
+
+    Waiting calls form one queue ordered by priority class, then arrival, so an
+    interactive turn queued behind a burst of quiz generations is granted the
+    next free slot. A call that cannot get a slot within ``max_wait`` raises
+    ``LimiterTimeoutError`` instead of piling onto an overloaded upstream.
+    """
+
+    def __init__(self, name: str, settings: Optional[LimiterSettings] = None) -> None:
+        self.name = name
+        self.settings = settings or LimiterSettings()
+        self._cond = threading.Condition()
+        self._queue: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._rpm = TokenBucket(self.settings.requests_per_minute) if self.settings.requests_per_minute > 0 else None
+        self._tpm = TokenBucket(self.settings.tokens_per_minute) if self.settings.tokens_per_minute > 0 else None
+        self.granted = 0
+        self.rejected = 0
+
+    def _enqueue(self, priority: int, tokens: int) -> _Ticket:
+        with self._cond:
+            ticket = _Ticket(priority, next(self._seq), tokens)
+            heapq.heappush(self._queue, ticket)
+            return ticket
+
+    def _try_grant(self, ticket: _Ticket) -> float:
+        """Grant ``ticket`` if it is first in line and budgets allow; else seconds to wait (inf: until notified)."""
+        while self._queue and self._queue[0].done:
+            heapq.heappop(self._queue)
+        if self._queue[0] is not ticket or self._in_flight >= self.settings.max_in_flight:
+            return math.inf
+        now = time.monotonic()
+        delay = 0.0
+        if self._rpm is not None:
+            delay = max(delay, self._rpm.wait_time(1, now))
+        if self._tpm is not None:
+            delay = max(delay, self._tpm.wait_time(ticket.tokens, now))
+        if delay > 0:
+            return delay
+        if self._rpm is not None:
+            self._rpm.take(1)
+        if self._tpm is not None:
+            self._tpm.take(ticket.tokens)
+        heapq.heappop(self._queue)
+        ticket.done = True
+        self._in_flight += 1
+        self.granted += 1
+        # The next ticket in line may be grantable too
+        self._cond.notify_all()
+        return 0.0
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        with self._cond:
+            if not ticket.done:
+                ticket.done = True
+                self.rejected += 1
+                self._cond.notify_all()
+
+    def _timeout(self, ticket: _Ticket) -> LimiterTimeoutError:
+        self._abandon(ticket)
+        REJECTED.inc(limiter=self.name, priority=str(ticket.priority))
+        return LimiterTimeoutError(
+            f"Too many requests to {self.name}; gave up after waiting {self.settings.max_wait:g}s for a slot."
+        )
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _adjust_tokens(self, amount: float) -> None:
+        if self._tpm is None:
+            return
+        with self._cond:
+            self._tpm.adjust(amount)
+            self._cond.notify_all()
+
+    def acquire(self, priority: int = DEFAULT, tokens: int = 0) -> Permit:
+        """Block until a slot is granted; pair with ``release``, or use ``slot``."""
+        ticket = self._enqueue(priority, tokens)
+        started = time.monotonic()
+        deadline = started + self.settings.max_wait
+        try:
+            with self._cond:
+                while True:
+                    delay = self._try_grant(ticket)
+                    if delay == 0:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timeout(ticket)
+                    self._cond.wait(min(delay, remaining))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        QUEUE_WAIT.observe(time.monotonic() - started, limiter=self.name, priority=str(priority))
+        return Permit(self, tokens)
+
+    async def aacquire(self, priority: int = DEFAULT, tokens: int = 0) -> Permit:
+        """Async ``acquire``: waits on the event loop instead of blocking a thread."""
+        ticket = self._enqueue(priority, tokens)
+        started = time.monotonic()
+        deadline = started + self.settings.max_wait
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_grant(ticket)
+                    if delay == 0:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timeout(ticket)
+                await asyncio.sleep(min(delay, remaining, _ASYNC_POLL))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        QUEUE_WAIT.observe(time.monotonic() - started, limiter=self.name, priority=str(priority))
+        return Permit(self, tokens)
+
+    def release(self, permit: Permit) -> None:
+        self._release()
+
+    @contextmanager
+    def slot(self, task: str = "default", tokens: int = 0) -> Iterator[Permit]:
+        permit = self.acquire(priority_for(task), tokens)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    @asynccontextmanager
+    async def aslot(self, task: str = "default", tokens: int = 0) -> AsyncIterator[Permit]:
+        permit = await self.aacquire(priority_for(task), tokens)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "queued": sum(1 for t in self._queue if not t.done),
+                "granted": self.granted,
+                "rejected": self.rejected,
+                "max_in_flight": self.settings.max_in_flight,
+                "rpm": self.settings.requests_per_minute,
+                "tpm": self.settings.tokens_per_minute,
+            }
+
+
+_limiters: Dict[str, Limiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> Limiter:
+    """Process-wide limiter for one upstream ("llm" or "search"), configured from the environment."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = Limiter(name, read_limiter_settings(name))
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, float]]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+def reset_limiters() -> None:
+    """Forget every limiter so the next call re-reads its settings (tests, config changes)."""
+    with _limiters_lock:
+        _limiters.clear()
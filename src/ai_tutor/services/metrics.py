@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+# Seconds; spans a cached store read up to a slow quiz generation
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {tuple(labelnames)}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, list(labels.values()))} {value:g}")
+        return lines
+
+
+class _Series:
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self, buckets: int, reservoir: int) -> None:
+        self.counts = [0] * (buckets + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent: Deque[float] = deque(maxlen=reservoir)
+
+
+class Histogram:
+    """Latency histogram with Prometheus buckets plus the most recent observations.
+
+    Buckets give cumulative counts for scraping; quantiles are computed exactly
+    over the last ``reservoir`` observations of each label set, so they track
+    current behaviour rather than the whole process lifetime.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        reservoir: int = 1024,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.reservoir = reservoir
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], _Series] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets), self.reservoir)
+            series.counts[bisect.bisect_left(self.buckets, value)] += 1
+            series.total += value
+            series.count += 1
+            series.recent.append(value)
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> List[Dict[str, Any]]:
+        """One row per label set: labels, count, sum and the requested quantiles of recent observations."""
+        with self._lock:
+            items = [(key, s.count, s.total, sorted(s.recent)) for key, s in self._series.items()]
+        rows: List[Dict[str, Any]] = []
+        for key, count, total, ordered in items:
+            row: Dict[str, Any] = dict(zip(self.labelnames, key))
+            row.update(count=count, sum=total)
+            for q in quantiles:
+                row[f"p{round(q * 100):d}"] = ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+            rows.append(row)
+        return rows
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(s.counts), s.total, s.count) for key, s in self._series.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = "+Inf" if bound == math.inf else f"{bound:g}"
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total:g}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named counters and histograms; registering an existing name returns the same metric."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, name: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help, labelnames, buckets))
+
+    def get(self, name: str) -> Any:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly dump: counter samples and histogram summaries by metric name."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        out: Dict[str, Any] = {}
+        for name, metric in metrics.items():
+            if isinstance(metric, Counter):
+                out[name] = [{**labels, "value": value} for labels, value in metric.samples()]
+            else:
+                out[name] = metric.summary()
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+LLM_REQUESTS = _registry.counter("llm_requests_total", "LLM calls by task, model and outcome", ("task", "model", "outcome"))
+LLM_LATENCY = _registry.histogram(
+    "llm_request_seconds", "LLM call latency including retries", ("task", "model", "outcome")
+)
+LLM_FIRST_TOKEN = _registry.histogram("llm_first_token_seconds", "Time to first streamed token", ("task", "model"))
+LLM_TOKENS = _registry.counter("llm_tokens_total", "LLM tokens by task, model and kind", ("task", "model", "kind"))
+SEARCH_REQUESTS = _registry.counter("search_requests_total", "Web search calls by outcome", ("outcome",))
+SEARCH_LATENCY = _registry.histogram("search_request_seconds", "Web search latency", ("outcome",))
+STORE_LATENCY = _registry.histogram(
+    "store_operation_seconds", "Session and quiz store call latency", ("store", "op", "outcome")
+)
+
+
+def outcome_of(exc: BaseException) -> str:
+    """Coarse outcome label for a failed call."""
+    # A consumer closing a stream early, or a cancelled task, is not a failure of the call
+    if isinstance(exc, GeneratorExit) or type(exc).__name__ == "CancelledError":
+        return "cancelled"
+    if type(exc).__name__ == "CircuitOpenError":
+        return "circuit_open"
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+        return "timeout"
+    return "error"
+
+
+class LlmUsage:
+    """Filled in by the caller inside ``track_llm``; recorded when the block exits."""
+
+    __slots__ = ("prompt_tokens", "completion_tokens", "cached")
+
+    def __init__(self) -> None:
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached = False
+
+    def from_openai(self, response: Any) -> None:
+        usage = getattr(response, "usage", None)
+        self.prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        self.completion_tokens = getattr(usage, "completion_tokens", None) or 0
+
+    def from_langchain(self, message: Any) -> None:
+        usage = getattr(message, "usage_metadata", None) or {}
+        self.prompt_tokens = usage.get("input_tokens", 0) or 0
+        self.completion_tokens = usage.get("output_tokens", 0) or 0
+
+
+@contextmanager
+def track_llm(task: str, model: str) -> Iterator[LlmUsage]:
+    """Record one LLM call's latency, outcome and token usage under ``task``/``model``."""
+    usage = LlmUsage()
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield usage
+    except BaseException as exc:
+        outcome = outcome_of(exc)
+        raise
+    finally:
+        if usage.cached and outcome == "ok":
+            outcome = "cache_hit"
+        LLM_REQUESTS.inc(task=task, model=model, outcome=outcome)
+        LLM_LATENCY.observe(time.perf_counter() - started, task=task, model=model, outcome=outcome)
+        if usage.prompt_tokens:
+            LLM_TOKENS.inc(usage.prompt_tokens, task=task, model=model, kind="prompt")
+        if usage.completion_tokens:
+            LLM_TOKENS.inc(usage.completion_tokens, task=task, model=model, kind="completion")
+
+
+@contextmanager
+def track_search() -> Iterator[None]:
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException as exc:
+        outcome = outcome_of(exc)
+        raise
+    finally:
+        SEARCH_REQUESTS.inc(outcome=outcome)
+        SEARCH_LATENCY.observe(time.perf_counter() - started, outcome=outcome)
+
+
+def timed_store_op(fn: Callable[..., T]) -> Callable[..., T]:
+    """Method decorator recording the call's latency as ``store_operation_seconds{store, op, outcome}``."""
+    op = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return fn(self, *args, **kwargs)
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            STORE_LATENCY.observe(time.perf_counter() - started, store=type(self).__name__, op=op, outcome=outcome)
+
+    return wrapper
+
+
+def llm_task_summary() -> List[Dict[str, Any]]:
+    """Per task and model: calls, errors, p50/p95/p99 of successful calls and completion tokens/sec."""
+    rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for labels, value in LLM_REQUESTS.samples():
+        row = rows.setdefault((labels["task"], labels["model"]), {"task": labels["task"], "model": labels["model"], "calls": 0, "errors": 0})
+        row["calls"] += int(value)
+        if labels["outcome"] not in ("ok", "cache_hit"):
+            row["errors"] += int(value)
+    seconds: Dict[Tuple[str, str], float] = {}
+    for series in LLM_LATENCY.summary():
+        if series["outcome"] != "ok":
+            continue
+        key = (series["task"], series["model"])
+        seconds[key] = series["sum"]
+        rows[key].update(p50=series["p50"], p95=series["p95"], p99=series["p99"])
+    for labels, value in LLM_TOKENS.samples():
+        key = (labels["task"], labels["model"])
+        if labels["kind"] == "completion" and seconds.get(key):
+            rows[key]["tokens_per_sec"] = round(value / seconds[key], 1)
+    return sorted(rows.values(), key=lambda r: (r["task"], r["model"]))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format: str, *args) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/metrics":
+            body, content_type = _registry.render_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(_registry.snapshot()).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
@@ -1,18 +1,35 @@
 from __future__ import annotations
 
+import contextvars
 import json
+import math
+import os
 import re
 import uuid
-import time
-from typing import List, Literal, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Literal, Mapping, Optional, Sequence, Tuple, Union
 
 from pydantic import BaseModel, Field, ValidationError
 
+from ai_tutor.llm.context import build_context, format_transcript
 from ai_tutor.llm.providers import get_llm_provider
+from ai_tutor.llm.resilience import CircuitOpenError
 
 
+# Token budget for the teaching context included in quiz and lesson prompts
+QUIZ_CONTEXT_TOKENS = 2000
+
 Difficulty = Literal["easy", "medium", "hard"]
 
+# Sub-focus given to each shard of a sharded quiz so shards do not write the same questions
+SHARD_FOCUSES = (
+    "core definitions and key concepts",
+    "applying the ideas to a concrete example or calculation",
+    "common mistakes and misconceptions",
+    "comparing with and connecting to related ideas",
+    "edge cases and deeper reasoning",
+)
+
 
 class MCQQuestion(BaseModel):
     question: str
@@ -35,7 +52,9 @@ class MCQQuiz(BaseModel):
     meta: Optional[QuizMeta] = None
 
 
-def _build_quiz_prompt(subject: str, topic: str, difficulty: Difficulty, num_questions: int, context: str, language: str = "en") -> List[dict]:
+def _build_quiz_prompt(
+    subject: str, topic: str, difficulty: Difficulty, num_questions: int, context: str, language: str = "en", focus: str = ""
+) -> List[dict]:
     system = (
         "You are an expert educator. Create a concise multiple-choice quiz. "
         "Return ONLY strict JSON (no markdown, no text before/after)."
@@ -46,7 +65,8 @@ def _build_quiz_prompt(subject: str, topic: str, difficulty: Difficulty, num_que
         f"Subject: {subject}. Topic: {topic}. Difficulty: {difficulty}. Number of questions: {num_questions}.\n"
         "If the topic is clearly irrelevant to the subject and context, IGNORE the topic and generate the quiz for the subject instead.\n"
         "Include a 'meta' object indicating whether the topic was used and, if not, a brief reason.\n"
-        f"Base questions on the following teaching context when relevant to the topic (may include prior Q&A):\n{context}\n"
+        + (f"Focus: {focus}. Other parts of the quiz cover other aspects, so keep every question on this focus.\n" if focus else "")
+        + f"Base questions on the following teaching context when relevant to the topic (may include prior Q&A):\n{context}\n"
         "Each question must have exactly 4 options. Use 0-based 'correct_index'. Provide a brief 'explanation' for the correct answer.\n"
         "JSON schema: {\n  'subject': str,\n  'topic': str,\n  'difficulty': 'easy'|'medium'|'hard',\n  'questions': [ { 'question': str, 'options': [str, str, str, str], 'correct_index': int, 'explanation': str } ],\n  'meta': { 'topic_used': bool, 'ignored_reason': str }\n}"
     )
@@ -65,48 +85,222 @@ def _extract_json(text: str) -> str:
     return text
 
 
-def generate_mcq_quiz(
-    subject: str,
-    topic: str,
-    conversation_messages: List[dict],
-    num_questions: int = 5,
-    difficulty: Difficulty = "medium",
-) -> MCQQuiz:
-    provider = get_llm_provider()
-    # Build prompt with exact chat context for better alignment
-    # Concatenate last ~20 messages to keep context bounded
-    ctx_msgs = conversation_messages[-20:]
-    context = "\n\n".join([f"{m.get('role','user')}: {m.get('content','')}" for m in ctx_msgs])
-    messages = _build_quiz_prompt(
-        subject=subject,
-        topic=topic,
-        difficulty=difficulty,
-        num_questions=num_questions,
-        context=context,
-        language=(conversation_messages and conversation_messages[0].get("language") or "en") if isinstance(conversation_messages, list) else "en",
-    )
-    # Try with context; on transient errors, retry once then fallback to topic-only
-    used_fallback = False
+class QuizStreamParser:
+    """Incremental scanner over a streamed quiz reply.
+
+    ``feed`` takes the next chunk of text and returns the elements of the
+    top-level ``"questions"`` array whose objects closed in it, so each
+    question can be shown before the rest of the reply arrives. Text before
+    the first ``{`` (prose, a markdown fence) is skipped. The full reply is
+    kept in ``text`` for parsing the remaining fields at the end.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_key: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._in_questions = False
+        self._item_start = -1
+
+    def feed(self, chunk: str) -> List[Dict]:
+        self.text += chunk
+        text = self.text
+        items: List[Dict] = []
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1 : i]
+                continue
+            if self._depth == 0 and c != "{":
+                continue
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and self._depth == 1:
+                self._current_key = self._last_key
+            elif c in "{[":
+                if c == "[" and self._depth == 1 and self._current_key == "questions":
+                    self._in_questions = True
+                elif c == "{" and self._in_questions and self._depth == 2:
+                    self._item_start = i
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if c == "}" and self._item_start >= 0 and self._depth == 2:
+                    try:
+                        items.append(json.loads(text[self._item_start : i + 1]))
+                    except ValueError:
+                        pass
+                    self._item_start = -1
+                elif c == "]" and self._in_questions and self._depth == 1:
+                    self._in_questions = False
+                    self._current_key = None
+        self._pos = len(text)
+        return items
+
+
+def read_quiz_shard_size(env: Optional[Dict[str, str]] = None) -> int:
+    """Questions per shard from ``QUIZ_SHARD_SIZE``; 0 (the default) generates the quiz in one call."""
+    environment = env if env is not None else os.environ
     try:
-        raw = provider.generate(messages=messages, temperature=0)
-    except Exception:
-        time.sleep(0.6)
+        return max(int(environment.get("QUIZ_SHARD_SIZE", "0").strip() or 0), 0)
+    except ValueError:
+        return 0
+
+
+def _plan_shards(num_questions: int, shard_size: int) -> List[int]:
+    """Split ``num_questions`` into near-equal shard sizes of at most ``shard_size``."""
+    shards = max(math.ceil(num_questions / shard_size), 1)
+    base, extra = divmod(num_questions, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def _normalize_question(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.casefold())).strip()
+
+
+def _valid_questions(items: object) -> List[MCQQuestion]:
+    # Malformed questions are dropped one by one instead of failing the whole shard
+    questions: List[MCQQuestion] = []
+    for item in items if isinstance(items, list) else []:
         try:
-            raw = provider.generate(messages=messages, temperature=0)
-        except Exception:
-            fallback_messages = _build_quiz_prompt(
-                subject=subject, topic=topic, difficulty=difficulty, num_questions=num_questions, context=""
-            )
-            raw = provider.generate(messages=fallback_messages, temperature=0)
-            used_fallback = True
-    # Parse JSON
+            question = MCQQuestion.model_validate(item)
+        except ValidationError:
+            continue
+        if question.question.strip() and 0 <= question.correct_index < len(question.options):
+            questions.append(question)
+    return questions
+
+
+def _generate_raw(provider, messages: List[dict], fallback_messages: List[dict]) -> Tuple[str, List[dict], bool]:
+    # Transient errors are retried with backoff by the "quiz" policy; if the call still fails,
+    # fall back to a topic-only prompt (unless the endpoint is known to be down)
+    try:
+        return provider.generate(messages=messages, temperature=0, task="quiz", json_mode=True), messages, False
+    except CircuitOpenError:
+        raise
+    except Exception:
+        return (
+            provider.generate(messages=fallback_messages, temperature=0, task="quiz", json_mode=True),
+            fallback_messages,
+            True,
+        )
+
+
+def _parse_quiz_json(provider, raw: str, messages: List[dict]) -> Dict:
     try:
         data = json.loads(raw)
     except Exception:
         try:
             data = json.loads(_extract_json(raw))
         except Exception as exc:
+            # Do not replay an unusable reply from the response cache on the next attempt
+            provider.invalidate_cached(messages)
             raise RuntimeError(f"Failed to parse quiz JSON: {exc}\nRaw: {raw[:300]}")
+    if not isinstance(data, dict):
+        provider.invalidate_cached(messages)
+        raise RuntimeError(f"Quiz JSON is not an object\nRaw: {raw[:300]}")
+    return data
+
+
+def _generate_sharded(
+    provider,
+    subject: str,
+    topic: str,
+    difficulty: Difficulty,
+    num_questions: int,
+    shard_size: int,
+    context: str,
+    language: str,
+) -> Tuple[Dict, bool]:
+    """Generate the quiz as concurrent shards, then merge and de-duplicate their questions.
+
+    A shard that fails or returns unusable JSON only loses its own questions;
+    the call raises only when no shard produced a valid question.
+    """
+    plan = _plan_shards(num_questions, shard_size)
+
+    def run_shard(index: int, count: int) -> Tuple[Dict, bool]:
+        focus = SHARD_FOCUSES[index % len(SHARD_FOCUSES)]
+        messages = _build_quiz_prompt(subject, topic, difficulty, count, context, language=language, focus=focus)
+        fallback = _build_quiz_prompt(subject, topic, difficulty, count, "", focus=focus)
+        raw, used, used_fallback = _generate_raw(provider, messages, fallback)
+        data = _parse_quiz_json(provider, raw, used)
+        data["questions"] = _valid_questions(data.get("questions"))
+        if not data["questions"]:
+            provider.invalidate_cached(used)
+        return data, used_fallback
+
+    with ThreadPoolExecutor(max_workers=len(plan), thread_name_prefix="quiz-shard") as pool:
+        # Each shard gets its own copy of the context so limiter priority (e.g. speculative) carries over
+        futures = [
+            pool.submit(contextvars.copy_context().run, run_shard, i, count) for i, count in enumerate(plan)
+        ]
+        results = []
+        errors: List[BaseException] = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except CircuitOpenError:
+                raise
+            except Exception as exc:
+                errors.append(exc)
+
+    questions: List[MCQQuestion] = []
+    seen = set()
+    for data, _ in results:
+        for question in data["questions"]:
+            key = _normalize_question(question.question)
+            if key not in seen:
+                seen.add(key)
+                questions.append(question)
+    if not questions:
+        if errors:
+            raise errors[0]
+        raise RuntimeError("Quiz validation failed: no shard produced a valid question")
+
+    metas = [data["meta"] for data, _ in results if isinstance(data.get("meta"), dict)]
+    merged: Dict = {
+        "subject": subject,
+        "topic": topic,
+        "difficulty": difficulty,
+        "questions": [q.model_dump() for q in questions[:num_questions]],
+    }
+    if metas:
+        # The topic counts as used if any shard used it
+        used = [m for m in metas if m.get("topic_used", True)]
+        merged["meta"] = used[0] if used else metas[0]
+    return merged, any(fallback for _, fallback in results)
+
+
+def _quiz_context(
+    conversation_messages: Sequence[Mapping[str, str]], summary: str, summary_upto: int
+) -> Tuple[str, str]:
+    """Teaching context (chat transcript bounded by a token budget) and language for quiz prompts."""
+    ctx_msgs = build_context(
+        conversation_messages,
+        max_tokens=QUIZ_CONTEXT_TOKENS,
+        summary=summary,
+        summary_upto=summary_upto,
+        keep_system_prompt=False,
+    )
+    language = (conversation_messages and conversation_messages[0].get("language") or "en") if isinstance(conversation_messages, list) else "en"
+    return format_transcript(ctx_msgs), language
+
+
+def _finalize_quiz(provider, data: Dict, topic: str, messages: List[dict], used_fallback: bool) -> MCQQuiz:
     # Validate
     try:
         # Assign quiz_id if missing
@@ -125,6 +319,8 @@ def generate_mcq_quiz(
             }
         quiz = MCQQuiz.model_validate(data)
     except ValidationError as exc:
+        if messages:
+            provider.invalidate_cached(messages)
         raise RuntimeError(f"Quiz validation failed: {exc}")
 
     # If we had to fallback and topic seems unused, enrich the reason
@@ -133,3 +329,110 @@ def generate_mcq_quiz(
     return quiz
 
 
+def generate_mcq_quiz(
+    subject: str,
+    topic: str,
+    conversation_messages: Sequence[Mapping[str, str]],
+    num_questions: int = 5,
+    difficulty: Difficulty = "medium",
+    summary: str = "",
+    summary_upto: int = 0,
+    shard_size: Optional[int] = None,
+) -> MCQQuiz:
+    """Generate and validate a quiz from the conversation.
+
+    With ``shard_size`` (default ``QUIZ_SHARD_SIZE``) smaller than ``num_questions``
+    the questions are requested as concurrent shards of at most that many each,
+    so latency tracks the shard size rather than the quiz length.
+    """
+    provider = get_llm_provider()
+    shard_size = read_quiz_shard_size() if shard_size is None else shard_size
+    # Build prompt with exact chat context for better alignment, bounded by a token budget
+    context, language = _quiz_context(conversation_messages, summary, summary_upto)
+    if 0 < shard_size < num_questions:
+        data, used_fallback = _generate_sharded(
+            provider, subject, topic, difficulty, num_questions, shard_size, context, language
+        )
+        # Shard replies were validated question by question; nothing to invalidate as a whole
+        messages: List[dict] = []
+    else:
+        messages = _build_quiz_prompt(
+            subject=subject,
+            topic=topic,
+            difficulty=difficulty,
+            num_questions=num_questions,
+            context=context,
+            language=language,
+        )
+        fallback_messages = _build_quiz_prompt(
+            subject=subject, topic=topic, difficulty=difficulty, num_questions=num_questions, context=""
+        )
+        raw, messages, used_fallback = _generate_raw(provider, messages, fallback_messages)
+        data = _parse_quiz_json(provider, raw, messages)
+    return _finalize_quiz(provider, data, topic, messages, used_fallback)
+
+
+def stream_mcq_quiz(
+    subject: str,
+    topic: str,
+    conversation_messages: Sequence[Mapping[str, str]],
+    num_questions: int = 5,
+    difficulty: Difficulty = "medium",
+    summary: str = "",
+    summary_upto: int = 0,
+) -> Iterator[Union[MCQQuestion, MCQQuiz]]:
+    """Yield each question as soon as the model has written it, then the validated ``MCQQuiz``.
+
+    Questions are validated one by one as their objects close; malformed ones
+    are skipped. If the stream fails before any question arrived, the quiz is
+    generated with ``generate_mcq_quiz`` instead (with its topic-only retry),
+    as it is when sharding is enabled.
+    """
+    shard_size = read_quiz_shard_size()
+    if 0 < shard_size < num_questions:
+        quiz = generate_mcq_quiz(
+            subject, topic, conversation_messages, num_questions, difficulty, summary, summary_upto, shard_size
+        )
+        yield from quiz.questions
+        yield quiz
+        return
+
+    provider = get_llm_provider()
+    context, language = _quiz_context(conversation_messages, summary, summary_upto)
+    messages = _build_quiz_prompt(
+        subject=subject, topic=topic, difficulty=difficulty, num_questions=num_questions, context=context, language=language
+    )
+    parser = QuizStreamParser()
+    questions: List[MCQQuestion] = []
+    try:
+        for chunk in provider.stream(messages, temperature=0, task="quiz", json_mode=True):
+            for question in _valid_questions(parser.feed(chunk)):
+                questions.append(question)
+                yield question
+    except CircuitOpenError:
+        raise
+    except Exception:
+        if questions:
+            raise
+        quiz = generate_mcq_quiz(
+            subject, topic, conversation_messages, num_questions, difficulty, summary, summary_upto, shard_size=0
+        )
+        yield from quiz.questions
+        yield quiz
+        return
+
+    try:
+        data = _parse_quiz_json(provider, parser.text, messages)
+    except RuntimeError:
+        if not questions:
+            raise
+        # Every question already parsed; only the trailing fields were lost
+        data = {}
+    data.update({"subject": data.get("subject") or subject, "topic": data.get("topic") or topic})
+    data.setdefault("difficulty", difficulty)
+    if not questions:
+        # The reply parsed as a whole but nothing was recognised while streaming
+        questions = _valid_questions(data.get("questions"))
+        yield from questions
+    data["questions"] = [q.model_dump() for q in questions]
+    yield _finalize_quiz(provider, data, topic, messages, used_fallback=False)
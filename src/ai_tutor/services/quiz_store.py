@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import json
+import os
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from ai_tutor.services.analytics import MasteryAnalytics
+from ai_tutor.services.fileio import atomic_write_text
+from ai_tutor.services.metrics import timed_store_op
+
 
 @dataclass
 class QuizResult:
@@ -17,27 +23,110 @@ class QuizResult:
     selected_indices: list[int]
     # Indices of questions answered incorrectly
     incorrect_indices: list[int]
+    difficulty: str = "medium"
+    # Learner the result counts towards in analytics; defaults to the session
+    learner_id: Optional[str] = None
+
+
+# Marker written once legacy flat result files have been moved into per-session folders
+_LAYOUT_MARKER = ".per_session_layout"
 
 
 class QuizStore:
-    def __init__(self, base_dir: Path | str = Path("data")) -> None:
+    """Persist quizzes and quiz results as JSON files.
+
+    Results live in one folder per session (``quiz_results/<session_id>/<quiz_id>.json``),
+    so listing a session's results only touches that folder and the latest
+    result for a quiz is a single file read. Each saved result also updates
+    the mastery analytics incrementally (see ``MasteryAnalytics``).
+    """
+
+    def __init__(self, base_dir: Path | str = Path("data"), enable_analytics: bool = True) -> None:
         self.base_dir: Path = Path(base_dir)
         self.quizzes_dir: Path = self.base_dir / "quizzes"
         self.results_dir: Path = self.base_dir / "quiz_results"
+        self.lessons_dir: Path = self.base_dir / "lessons"
+        self.jobs_dir: Path = self.base_dir / "jobs"
         self.quizzes_dir.mkdir(parents=True, exist_ok=True)
         self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.lessons_dir.mkdir(parents=True, exist_ok=True)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.enable_analytics = enable_analytics
+        self._analytics: Optional[MasteryAnalytics] = None
+        if not (self.results_dir / _LAYOUT_MARKER).exists():
+            self._migrate_flat_results()
+
+    def _migrate_flat_results(self) -> None:
+        # Older versions stored results flat as <session_id>__<quiz_id>.json
+        for file in self.results_dir.glob("*__*.json"):
+            try:
+                raw = json.loads(file.read_text(encoding="utf-8"))
+            except Exception:
+                continue
+            session_id, _, quiz_id = file.stem.partition("__")
+            raw.setdefault("saved_at", file.stat().st_mtime)
+            target = self._result_path(raw.get("session_id", session_id), raw.get("quiz_id", quiz_id))
+            target.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(target, json.dumps(raw, ensure_ascii=False, indent=2))
+            file.unlink(missing_ok=True)
+        atomic_write_text(self.results_dir / _LAYOUT_MARKER, "1\n")
+
+    @property
+    def analytics(self) -> MasteryAnalytics:
+        # Created lazily: loading the checkpoint is only needed once results are saved or queried
+        if self._analytics is None:
+            self._analytics = MasteryAnalytics(self.base_dir)
+        return self._analytics
+
+    def _result_path(self, session_id: str, quiz_id: str) -> Path:
+        return self.results_dir / session_id / f"{quiz_id}.json"
 
+    @timed_store_op
     def save_quiz(self, session_id: str, quiz_id: str, payload: Dict) -> None:
         path = self.quizzes_dir / f"{session_id}__{quiz_id}.json"
-        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        atomic_write_text(path, json.dumps(payload, ensure_ascii=False, indent=2))
 
+    @timed_store_op
     def load_quiz(self, session_id: str, quiz_id: str) -> Dict:
         path = self.quizzes_dir / f"{session_id}__{quiz_id}.json"
         raw = json.loads(path.read_text(encoding="utf-8"))
         return raw
 
+    def _lesson_path(self, session_id: str, quiz_id: str, incorrect_indices: List[int]) -> Path:
+        wrong = "-".join(str(i) for i in sorted(set(incorrect_indices)))
+        return self.lessons_dir / f"{session_id}__{quiz_id}__{wrong}.json"
+
+    @timed_store_op
+    def save_lesson(self, session_id: str, quiz_id: str, incorrect_indices: List[int], payload: Dict) -> None:
+        """Persist the remediation lesson generated for one set of missed questions of a quiz."""
+        atomic_write_text(
+            self._lesson_path(session_id, quiz_id, incorrect_indices), json.dumps(payload, ensure_ascii=False, indent=2)
+        )
+
+    @timed_store_op
+    def load_lesson(self, session_id: str, quiz_id: str, incorrect_indices: List[int]) -> Optional[Dict]:
+        try:
+            return json.loads(self._lesson_path(session_id, quiz_id, incorrect_indices).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def save_job(self, job: Dict) -> None:
+        """Persist a background job record (see ``services.jobs``) so its status survives reruns."""
+        atomic_write_text(self.jobs_dir / f"{job['job_id']}.json", json.dumps(job, ensure_ascii=False, indent=2))
+
+    def load_job(self, job_id: str) -> Optional[Dict]:
+        try:
+            return json.loads((self.jobs_dir / f"{job_id}.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def delete_job(self, job_id: str) -> None:
+        (self.jobs_dir / f"{job_id}.json").unlink(missing_ok=True)
+
+    @timed_store_op
     def save_result(self, result: QuizResult) -> None:
-        path = self.results_dir / f"{result.session_id}__{result.quiz_id}.json"
+        path = self._result_path(result.session_id, result.quiz_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
         payload = {
             "session_id": result.session_id,
             "quiz_id": result.quiz_id,
@@ -46,16 +135,45 @@ class QuizStore:
             "correct_answers": result.correct_answers,
             "selected_indices": result.selected_indices,
             "incorrect_indices": result.incorrect_indices,
+            "difficulty": result.difficulty,
+            "learner_id": result.learner_id or result.session_id,
+            "saved_at": time.time(),
         }
-        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        atomic_write_text(path, json.dumps(payload, ensure_ascii=False, indent=2))
+        if self.enable_analytics:
+            self.analytics.record(
+                learner_id=result.learner_id or result.session_id,
+                topic=result.topic,
+                difficulty=result.difficulty,
+                quiz_id=result.quiz_id,
+                total_questions=result.total_questions,
+                correct_answers=result.correct_answers,
+                incorrect_indices=result.incorrect_indices,
+            )
+
+    @timed_store_op
+    def latest_result(self, session_id: str, quiz_id: str) -> Optional[Dict]:
+        """Return the most recent result saved for a quiz, or None."""
+        try:
+            return json.loads(self._result_path(session_id, quiz_id).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
 
+    @timed_store_op
     def list_results(self, session_id: Optional[str] = None) -> List[Dict[str, str]]:
-        items: List[Dict[str, str]] = []
-        for file in sorted(self.results_dir.glob("*.json")):
-            raw = json.loads(file.read_text(encoding="utf-8"))
-            if session_id and raw.get("session_id") != session_id:
+        """List results oldest first, for one session or (if None) for all sessions."""
+        if session_id:
+            folders = [self.results_dir / session_id]
+        else:
+            folders = [p for p in self.results_dir.iterdir() if p.is_dir()]
+        items: List[Dict] = []
+        for folder in folders:
+            if not folder.is_dir():
                 continue
-            items.append(raw)
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    items.append(json.loads(Path(entry.path).read_text(encoding="utf-8")))
+        items.sort(key=lambda r: (r.get("saved_at") or 0, r.get("quiz_id", "")))
         return items
-
-
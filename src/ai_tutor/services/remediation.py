@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, List, Mapping, Sequence
 
+from ai_tutor.llm.context import build_context, format_transcript
 from ai_tutor.llm.providers import get_llm_provider
+from ai_tutor.services.quiz import QUIZ_CONTEXT_TOKENS
 
 
-def build_remediation_prompt(subject: str, topic: str, quiz: Dict, incorrect_indices: List[int], language: str = "en") -> List[Dict[str, str]]:
+def build_remediation_prompt(subject: str, topic: str, quiz: Dict, incorrect_indices: List[int], language: str = "en", context: str = "") -> List[Dict[str, str]]:
     system = (
         "You are a kind, effective tutor. Diagnose misconceptions and teach with concise steps, examples, and quick checks."
     )
@@ -27,12 +29,32 @@ def build_remediation_prompt(subject: str, topic: str, quiz: Dict, incorrect_ind
         "For each mistake: explain the core concept, show a clear example, and include a quick 1-question check.\n"
         f"Mistakes:\n{mistakes_summary}"
     )
+    if context:
+        user += f"\n\nRecent lesson context (use it to connect to what was already taught):\n{context}"
     return [{"role": "system", "content": system}, {"role": "user", "content": user}]
 
 
-def generate_remediation(subject: str, topic: str, quiz: Dict, incorrect_indices: List[int], language: str = "en") -> str:
+def generate_remediation(
+    subject: str,
+    topic: str,
+    quiz: Dict,
+    incorrect_indices: List[int],
+    language: str = "en",
+    conversation_messages: Sequence[Mapping[str, str]] = (),
+    summary: str = "",
+    summary_upto: int = 0,
+) -> str:
     provider = get_llm_provider()
-    messages = build_remediation_prompt(subject=subject, topic=topic, quiz=quiz, incorrect_indices=incorrect_indices, language=language)
-    return provider.generate(messages=messages, temperature=0)
+    context = format_transcript(
+        build_context(
+            conversation_messages,
+            max_tokens=QUIZ_CONTEXT_TOKENS,
+            summary=summary,
+            summary_upto=summary_upto,
+            keep_system_prompt=False,
+        )
+    )
+    messages = build_remediation_prompt(subject=subject, topic=topic, quiz=quiz, incorrect_indices=incorrect_indices, language=language, context=context)
+    return provider.generate(messages=messages, temperature=0, task="remediation")
 
 
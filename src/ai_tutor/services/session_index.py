@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from ai_tutor.services.fileio import file_lock
+
+
+SORT_FIELDS = ("updated_at", "created_at", "subject", "message_count", "session_id")
+
+
+def subject_goal_key(subject: str, goal: Optional[str]) -> str:
+    """Stable hash used for duplicate-session lookup by exact subject and goal."""
+    raw = f"{subject}\x00{goal or ''}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+class SessionIndex:
+    """Manifest of session metadata kept next to the session files.
+
+    The manifest is a JSONL journal of ``put``/``touch``/``del`` records that is
+    replayed into memory, so every update is a single appended line and other
+    processes pick up changes by reading only the bytes added since their last
+    look. The journal is rewritten compactly once it holds many stale records.
+
+    Appends and compaction hold an advisory lock on a sidecar ``.lock`` file
+    (not the journal itself, whose inode compaction replaces), so no record is
+    lost to a concurrent rewrite. In-memory replay is guarded by a thread lock.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path: Path = Path(path)
+        self.lock_path: Path = self.path.with_name(self.path.name + ".lock")
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict] = {}
+        self._by_key: Dict[str, str] = {}
+        self._offset: int = 0
+        self._inode: Optional[int] = None
+        # First line of the journal; compaction starts it with a unique "gen" record,
+        # which tells a rewrite apart from the old file even if the inode number is reused
+        self._head: bytes = b""
+        self._signature: Optional[tuple] = None
+        self._records: int = 0
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    # ---- journal replay -------------------------------------------------
+
+    def _reset(self) -> None:
+        self._entries = {}
+        self._by_key = {}
+        self._offset = 0
+        self._records = 0
+
+    def _apply(self, record: Dict) -> None:
+        op = record.get("op")
+        if op == "put":
+            entry = record["entry"]
+            self._drop(entry["session_id"])
+            self._entries[entry["session_id"]] = entry
+            self._by_key[entry["key"]] = entry["session_id"]
+        elif op == "touch":
+            entry = self._entries.get(record["session_id"])
+            if entry is not None:
+                entry["updated_at"] = record["updated_at"]
+                entry["message_count"] = entry.get("message_count", 0) + record.get("added", 0)
+        elif op == "del":
+            self._drop(record["session_id"])
+        self._records += 1
+
+    def _drop(self, session_id: str) -> None:
+        old = self._entries.pop(session_id, None)
+        if old is not None and self._by_key.get(old["key"]) == session_id:
+            del self._by_key[old["key"]]
+
+    def refresh(self) -> None:
+        """Replay journal records written since the last refresh (by any process)."""
+        with self._lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self) -> None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._reset()
+            self._inode = None
+            self._head = b""
+            self._signature = None
+            return
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if signature == self._signature:
+            return
+        with self.path.open("rb") as fh:
+            first = fh.readline(4096)
+            head = first if first.endswith(b"\n") else b""
+            if stat.st_ino != self._inode or stat.st_size < self._offset or (self._offset and head != self._head):
+                # The journal was compacted (replaced) by someone; replay from scratch
+                self._reset()
+                self._inode = stat.st_ino
+            self._head = head
+            fh.seek(self._offset)
+            chunk = fh.read()
+        self._signature = signature
+        # Only consume complete lines; a concurrent writer may be mid-append
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except Exception:
+                continue
+        self._offset += end
+
+    def _write(self, records: Iterable[Dict]) -> None:
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(data)
+        with self._lock:
+            self._refresh_locked()
+            needs_compaction = self._records > 4 * len(self._entries) + 256
+        if needs_compaction:
+            self.compact()
+
+    # ---- updates --------------------------------------------------------
+
+    def put(
+        self,
+        session_id: str,
+        subject: str,
+        goal: Optional[str],
+        language: str,
+        created_at: float,
+        updated_at: float,
+        message_count: int,
+    ) -> None:
+        entry = {
+            "session_id": session_id,
+            "subject": subject,
+            "goal": goal,
+            "language": language,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "message_count": message_count,
+            "key": subject_goal_key(subject, goal),
+        }
+        self._write([{"op": "put", "entry": entry}])
+
+    def touch(self, session_id: str, updated_at: float, added: int = 0) -> None:
+        self._write([{"op": "touch", "session_id": session_id, "updated_at": updated_at, "added": added}])
+
+    def remove(self, session_id: str) -> None:
+        self._write([{"op": "del", "session_id": session_id}])
+
+    def _replace_locked(self, entries: Iterable[Dict]) -> None:
+        # Caller holds the file lock
+        fd, tmp = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(json.dumps({"op": "gen", "id": uuid.uuid4().hex}) + "\n")
+                for entry in entries:
+                    entry = dict(entry)
+                    entry["key"] = subject_goal_key(entry.get("subject", ""), entry.get("goal"))
+                    fh.write(json.dumps({"op": "put", "entry": entry}, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def replace_all(self, entries: Iterable[Dict]) -> None:
+        """Atomically replace the journal with one ``put`` record per entry."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            self._replace_locked(entries)
+        self.refresh()
+
+    def compact(self) -> None:
+        # Appends wait on the lock, so every record up to the replace is in the rewrite
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            with self._lock:
+                self._refresh_locked()
+                entries = [dict(e) for e in self._entries.values()]
+            self._replace_locked(entries)
+        self.refresh()
+
+    # ---- queries --------------------------------------------------------
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh_locked()
+            entry = self._entries.get(session_id)
+            return dict(entry) if entry is not None else None
+
+    def find(self, subject: str, goal: Optional[str]) -> Optional[str]:
+        with self._lock:
+            self._refresh_locked()
+            return self._by_key.get(subject_goal_key(subject, goal))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh_locked()
+            return len(self._entries)
+
+    def list(
+        self,
+        sort_by: str = "updated_at",
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {sort_by}")
+        with self._lock:
+            self._refresh_locked()
+            entries = list(self._entries.values())
+        numeric = sort_by in ("updated_at", "created_at", "message_count")
+        ordered = sorted(
+            entries,
+            key=lambda e: (e.get(sort_by) or 0) if numeric else (e.get(sort_by) or ""),
+            reverse=descending,
+        )
+        end = None if limit is None else offset + limit
+        return [dict(e) for e in ordered[offset:end]]
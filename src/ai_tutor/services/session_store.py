@@ -1,115 +1,754 @@
 from __future__ import annotations
 
+import argparse
+import gzip
 import json
+import os
+import sys
+import threading
+import time
 import uuid
-from dataclasses import dataclass
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Dict, Iterable, List, Literal, Optional
+from typing import Dict, Iterable, Iterator, List, Literal, Optional, Tuple, overload
+
+from ai_tutor.services.fileio import atomic_write_bytes, atomic_write_text, file_lock, read_tail_lines
+from ai_tutor.services.metrics import timed_store_op
+from ai_tutor.services.session_index import SessionIndex
+
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    zstandard = None  # type: ignore
 
 
 Role = Literal["system", "user", "assistant"]
 
 
-@dataclass
-class ChatMessage:
+@dataclass(frozen=True, slots=True)
+class ChatMessage(Mapping):
+    """One chat turn, immutable and slotted to keep long histories compact.
+
+    ``role`` is interned so every message shares one string per role. The
+    message also reads as the provider's ``{"role", "content"}`` dict
+    (``m["role"]``, ``m.get("content")``, ``dict(m)``), so histories can be
+    passed to the LLM layer without building per-message dict copies.
+    """
+
     role: Role
     content: str
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "role", sys.intern(self.role))
+
+    def __getitem__(self, key: str) -> str:
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("role", "content"))
+
+    def __len__(self) -> int:
+        return 2
+
+
+class MessageView(Sequence):
+    """Read-only window over a list of messages; slicing returns another view, not a copy."""
+
+    __slots__ = ("_items", "_start", "_stop")
+
+    def __init__(self, items: List[ChatMessage], start: int = 0, stop: Optional[int] = None) -> None:
+        self._items = items
+        self._start, self._stop, _ = slice(start, stop).indices(len(items))
+        self._stop = max(self._stop, self._start)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> ChatMessage: ...
 
-@dataclass
+    @overload
+    def __getitem__(self, index: slice) -> "MessageView": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("MessageView does not support stepped slices")
+            return MessageView(self._items, self._start + start, self._start + max(stop, start))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message index out of range")
+        return self._items[self._start + index]
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        for i in range(self._start, self._stop):
+            yield self._items[i]
+
+
+@dataclass(slots=True)
 class Session:
     session_id: str
     subject: str
     goal: Optional[str]
     messages: List[ChatMessage]
     language: str = "en"
+    created_at: Optional[float] = None
+    # Number of committed writes; save_session refuses to overwrite a newer version
+    version: int = 0
+    # Rolling summary of messages[:summary_upto] (maintained by llm.context.ContextManager)
+    summary: str = ""
+    summary_upto: int = 0
+
+    def view(self, start: int = 0, stop: Optional[int] = None) -> MessageView:
+        """Zero-copy view of the messages in the provider's ``{"role", "content"}`` format."""
+        return MessageView(self.messages, start, stop)
+
+
+class SessionConflictError(RuntimeError):
+    """Raised when a session changed on disk since it was loaded."""
+
+
+def _message_to_dict(message: ChatMessage) -> Dict[str, str]:
+    return {"role": message.role, "content": message.content}
+
+
+def _header_payload(session: Session) -> Dict:
+    return {
+        "session_id": session.session_id,
+        "subject": session.subject,
+        "goal": session.goal,
+        "language": getattr(session, "language", "en"),
+        "created_at": session.created_at,
+        "version": session.version,
+        "summary": session.summary,
+        "summary_upto": session.summary_upto,
+        "messages": [_message_to_dict(m) for m in session.messages],
+    }
+
+
+def _copy_session(session: Session) -> Session:
+    # Messages are shared; only the list is copied so callers can append freely
+    return replace(session, messages=list(session.messages))
+
+
+# (header mtime_ns, header size, log mtime_ns, log size) identifying on-disk state
+_Stamp = Tuple[int, int, int, int]
+
+# Cold-tier archive suffix per codec
+_COLD_SUFFIXES = {"gzip": ".json.gz", "zstd": ".json.zst"}
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard package is not installed; use the gzip codec instead.")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard package is required to read this archived session.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
 
 
 class SessionStore:
     """Persist sessions as JSON files under a base directory.
 
     Ensures all state is JSON-serializable as required by project rules.
+
+    With ``append_log=True`` a session is stored as a header file
+    (``<id>.json``: metadata plus a compacted message prefix) and an
+    append-only message log (``<id>.jsonl``, one message per line), so appending
+    a turn is a single small write instead of a rewrite of the whole history.
+    The log is folded back into the header once it grows past
+    ``compact_threshold`` bytes. Plain ``<id>.json`` files without a log are
+    read transparently in either mode.
+
+    Listing and duplicate detection are served from a manifest
+    (``session_index.jsonl``) that is updated on every write, so they never
+    parse session files. ``rebuild_index`` recreates it from disk.
+
+    Loaded sessions are kept in a bounded in-process LRU cache validated
+    against the files' mtime and size, so repeated loads of an unchanged
+    session are memory lookups. Writes through the store refresh the cached
+    entry instead of dropping it.
+
+    Files are replaced atomically (temp file + rename) and every session
+    carries a version (header version plus appended log lines). Writers take a
+    short per-session file lock; ``save_session`` raises
+    ``SessionConflictError`` if the session moved on since it was loaded,
+    while ``append_messages`` merges onto the latest state.
+
+    Sessions untouched for a while can be moved to a compressed cold tier
+    (``sessions_cold/<id>.json.gz`` or ``.json.zst``) by ``archive_inactive``.
+    Any load or write rehydrates them into the hot tier first; they stay in
+    the manifest throughout.
+
+    ``load_tail`` and ``load_messages`` return a slice of the history without
+    building the whole session: the tail is read backwards from the end of the
+    log, and a prefix slice stops reading as soon as it is complete.
     """
 
-    def __init__(self, base_dir: Path | str = Path("data")) -> None:
+    def __init__(
+        self,
+        base_dir: Path | str = Path("data"),
+        append_log: bool = False,
+        compact_threshold: int = 256 * 1024,
+        cache_size: int = 64,
+        max_merge_retries: int = 5,
+        cold_codec: str = "gzip",
+    ) -> None:
         self.base_dir: Path = Path(base_dir)
         self.sessions_dir: Path = self.base_dir / "sessions"
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self.append_log = append_log
+        self.compact_threshold = compact_threshold
+        self.cache_size = cache_size
+        self.max_merge_retries = max_merge_retries
+        if cold_codec not in _COLD_SUFFIXES:
+            raise ValueError(f"Unsupported cold codec: {cold_codec}")
+        self.cold_codec = cold_codec
+        self.cold_dir: Path = self.base_dir / "sessions_cold"
+        self._cache: "OrderedDict[str, Tuple[_Stamp, Session]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self.index = SessionIndex(self.base_dir / "session_index.jsonl")
+        if not self.index.exists() and (
+            any(self.sessions_dir.glob("*.json")) or any(self.cold_dir.glob("*.json.*"))
+        ):
+            # First run against a pre-existing data directory
+            self.rebuild_index()
 
     def _session_path(self, session_id: str) -> Path:
         return self.sessions_dir / f"{session_id}.json"
 
+    def _log_path(self, session_id: str) -> Path:
+        return self.sessions_dir / f"{session_id}.jsonl"
+
+    def _lock_path(self, session_id: str) -> Path:
+        return self.sessions_dir / f"{session_id}.lock"
+
+    def _cold_path(self, session_id: str) -> Optional[Tuple[Path, str]]:
+        """Return the archive path and codec of a cold session, if one exists."""
+        for codec, suffix in _COLD_SUFFIXES.items():
+            path = self.cold_dir / f"{session_id}{suffix}"
+            if path.exists():
+                return path, codec
+        return None
+
+    def _exists(self, session_id: str) -> bool:
+        return self._session_path(session_id).exists() or self._cold_path(session_id) is not None
+
+    def _ensure_hot(self, session_id: str) -> None:
+        """Move an archived session back into the hot tier. Must not hold its lock."""
+        if self._session_path(session_id).exists():
+            return
+        if self._cold_path(session_id) is None:
+            return
+        with file_lock(self._lock_path(session_id)):
+            self._ensure_hot_locked(session_id)
+
+    def _ensure_hot_locked(self, session_id: str) -> None:
+        # Caller holds the session lock, so archiving cannot interleave
+        if self._session_path(session_id).exists():
+            return
+        cold = self._cold_path(session_id)
+        if cold is None:
+            return
+        path, codec = cold
+        raw = json.loads(_decompress(path.read_bytes(), codec).decode("utf-8"))
+        atomic_write_text(
+            self._session_path(session_id), json.dumps(raw, ensure_ascii=False, separators=(",", ":"))
+        )
+        path.unlink(missing_ok=True)
+
     def create_session(self, subject: str, goal: Optional[str], language: str = "en") -> Session:
         session_id = uuid.uuid4().hex
-        session = Session(session_id=session_id, subject=subject, goal=goal, messages=[], language=language)
+        session = Session(
+            session_id=session_id,
+            subject=subject,
+            goal=goal,
+            messages=[],
+            language=language,
+            created_at=time.time(),
+        )
         self.save_session(session)
         return session
 
+    def _read_log(self, session_id: str) -> List[ChatMessage]:
+        path = self._log_path(session_id)
+        if not path.exists():
+            return []
+        messages: List[ChatMessage] = []
+        with path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages.append(ChatMessage(**json.loads(line)))
+                except Exception:
+                    # A torn trailing line from an interrupted append; ignore it
+                    continue
+        return messages
+
+    def _stamp(self, session_id: str) -> Optional[_Stamp]:
+        try:
+            header = os.stat(self._session_path(session_id))
+        except FileNotFoundError:
+            return None
+        try:
+            log = os.stat(self._log_path(session_id))
+            log_mtime, log_size = log.st_mtime_ns, log.st_size
+        except FileNotFoundError:
+            log_mtime, log_size = 0, 0
+        return (header.st_mtime_ns, header.st_size, log_mtime, log_size)
+
+    def _cache_put(self, session_id: str, stamp: Optional[_Stamp], session: Session) -> None:
+        if self.cache_size <= 0 or stamp is None:
+            return
+        with self._cache_lock:
+            self._cache[session_id] = (stamp, _copy_session(session))
+            self._cache.move_to_end(session_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, session_id: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(session_id, None)
+
+    def cache_stats(self) -> Dict[str, int]:
+        with self._cache_lock:
+            return {"hits": self._cache_hits, "misses": self._cache_misses, "size": len(self._cache)}
+
+    @timed_store_op
     def load_session(self, session_id: str) -> Session:
+        # Stamp before reading: a concurrent write then only makes the entry look stale
+        stamp = self._stamp(session_id)
+        if stamp is None and self._cold_path(session_id) is not None:
+            self._ensure_hot(session_id)
+            stamp = self._stamp(session_id)
+        if stamp is None:
+            self._cache_drop(session_id)
+            raise FileNotFoundError(f"Session not found: {session_id}")
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if entry is not None and entry[0] == stamp:
+                self._cache.move_to_end(session_id)
+                self._cache_hits += 1
+                return _copy_session(entry[1])
+            self._cache_misses += 1
+        session = self._read_session(session_id)
+        self._cache_put(session_id, stamp, session)
+        return session
+
+    def _cached_messages(self, session_id: str) -> Optional[List[ChatMessage]]:
+        stamp = self._stamp(session_id)
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if stamp is None or entry is None or entry[0] != stamp:
+                return None
+            self._cache.move_to_end(session_id)
+            self._cache_hits += 1
+            return entry[1].messages
+
+    @timed_store_op
+    def load_tail(self, session_id: str, n: int) -> List[ChatMessage]:
+        """Return the last ``n`` messages of a session."""
+        if n <= 0:
+            return []
+        cached = self._cached_messages(session_id)
+        if cached is not None:
+            return cached[-n:]
+        self._ensure_hot(session_id)
+        log_path = self._log_path(session_id)
+        for _ in range(3):
+            stamp = self._stamp(session_id)
+            if stamp is None:
+                raise FileNotFoundError(f"Session not found: {session_id}")
+            tail: List[ChatMessage] = []
+            if log_path.exists():
+                for line in read_tail_lines(log_path, n):
+                    try:
+                        tail.append(ChatMessage(**json.loads(line)))
+                    except Exception:
+                        continue
+            if len(tail) < n:
+                raw = json.loads(self._session_path(session_id).read_text(encoding="utf-8"))
+                header_messages = raw.get("messages", [])
+                tail = [ChatMessage(**m) for m in header_messages[max(0, len(header_messages) - (n - len(tail))) :]] + tail
+            if self._stamp(session_id) == stamp:
+                return tail
+        # The session kept changing under us (e.g. compaction); fall back to a full load
+        return self.load_session(session_id).messages[-n:]
+
+    @timed_store_op
+    def load_messages(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ChatMessage]:
+        """Return ``limit`` messages starting at ``offset`` (0 = oldest)."""
+        end = None if limit is None else offset + limit
+        cached = self._cached_messages(session_id)
+        if cached is not None:
+            return cached[offset:end]
+        self._ensure_hot(session_id)
+        for _ in range(3):
+            stamp = self._stamp(session_id)
+            if stamp is None:
+                raise FileNotFoundError(f"Session not found: {session_id}")
+            raw = json.loads(self._session_path(session_id).read_text(encoding="utf-8"))
+            header_messages = raw.get("messages", [])
+            selected = [ChatMessage(**m) for m in header_messages[offset:end]]
+            log_path = self._log_path(session_id)
+            if (end is None or end > len(header_messages)) and log_path.exists():
+                position = len(header_messages)
+                with log_path.open("r", encoding="utf-8") as fh:
+                    for line in fh:
+                        if not line.strip() or not line.endswith("\n"):
+                            continue
+                        if end is not None and position >= end:
+                            break
+                        if position >= offset:
+                            try:
+                                selected.append(ChatMessage(**json.loads(line)))
+                            except Exception:
+                                continue
+                        position += 1
+            if self._stamp(session_id) == stamp:
+                return selected
+        return self.load_session(session_id).messages[offset:end]
+
+    def _read_session(self, session_id: str) -> Session:
         path = self._session_path(session_id)
         if not path.exists():
             raise FileNotFoundError(f"Session not found: {session_id}")
         raw = json.loads(path.read_text(encoding="utf-8"))
-        messages = [ChatMessage(**m) for m in raw["messages"]]
+        messages = [ChatMessage(**m) for m in raw.get("messages", [])]
+        logged = self._read_log(session_id)
+        messages.extend(logged)
         return Session(
             session_id=raw["session_id"],
             subject=raw.get("subject", ""),
             goal=raw.get("goal"),
             messages=messages,
             language=raw.get("language", "en"),
+            created_at=raw.get("created_at"),
+            version=raw.get("version", 0) + len(logged),
+            summary=raw.get("summary", ""),
+            summary_upto=raw.get("summary_upto", 0),
         )
 
+    @timed_store_op
     def save_session(self, session: Session) -> None:
-        path = self._session_path(session.session_id)
-        payload = {
-            "session_id": session.session_id,
-            "subject": session.subject,
-            "goal": session.goal,
-            "language": getattr(session, "language", "en"),
-            "messages": [
-                {"role": m.role, "content": m.content} for m in session.messages
-            ],
-        }
-        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    def append_message(self, session_id: str, message: ChatMessage) -> Session:
-        session = self.load_session(session_id)
-        session.messages.append(message)
-        self.save_session(session)
-        return session
+        """Write the full session, bumping its version.
 
-    def list_sessions(self) -> List[Dict[str, str]]:
-        items: List[Dict[str, str]] = []
-        for file in sorted(self.sessions_dir.glob("*.json")):
+        Raises ``SessionConflictError`` if the stored session has a different
+        version than ``session`` (someone else wrote since it was loaded).
+        """
+        with file_lock(self._lock_path(session.session_id)):
+            self._ensure_hot_locked(session.session_id)
             try:
-                raw = json.loads(file.read_text(encoding="utf-8"))
-            except Exception:
-                continue
-            items.append(
-                {
-                    "session_id": raw.get("session_id", file.stem),
-                    "subject": raw.get("subject", ""),
-                    "goal": raw.get("goal", ""),
-                }
+                current = self.load_session(session.session_id).version
+            except FileNotFoundError:
+                current = 0
+            if current != session.version:
+                raise SessionConflictError(
+                    f"Session {session.session_id} is at version {current}, expected {session.version}"
+                )
+            session.version = current + 1
+            self._write_header(session)
+        self._index_put(session)
+
+    def _write_header(self, session: Session) -> None:
+        # Callers hold the session lock
+        path = self._session_path(session.session_id)
+        payload = _header_payload(session)
+        if self.append_log:
+            text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        else:
+            text = json.dumps(payload, ensure_ascii=False, indent=2)
+        atomic_write_text(path, text)
+        # The header now holds the full history, so any pending log is folded in
+        self._log_path(session.session_id).unlink(missing_ok=True)
+        self._cache_put(session.session_id, self._stamp(session.session_id), session)
+
+    def _index_put(self, session: Session) -> None:
+        now = time.time()
+        self.index.put(
+            session_id=session.session_id,
+            subject=session.subject,
+            goal=session.goal,
+            language=getattr(session, "language", "en"),
+            created_at=session.created_at or now,
+            updated_at=now,
+            message_count=len(session.messages),
+        )
+
+    @timed_store_op
+    def append_messages(self, session_id: str, messages: Iterable[ChatMessage]) -> None:
+        """Persist new messages at the end of a session's history.
+
+        In append-log mode this writes only the new lines under the session
+        lock; otherwise the latest session is loaded, extended and saved,
+        retrying on version conflicts so concurrent turns are merged rather
+        than overwritten.
+        """
+        new_messages = list(messages)
+        if not new_messages:
+            return
+        if not self.append_log:
+            for attempt in range(self.max_merge_retries):
+                session = self.load_session(session_id)
+                session.messages.extend(new_messages)
+                try:
+                    self.save_session(session)
+                    return
+                except SessionConflictError:
+                    if attempt == self.max_merge_retries - 1:
+                        raise
+            return
+        log_path = self._log_path(session_id)
+        data = "".join(
+            json.dumps(_message_to_dict(m), ensure_ascii=False) + "\n" for m in new_messages
+        ).encode("utf-8")
+        with file_lock(self._lock_path(session_id)):
+            self._ensure_hot_locked(session_id)
+            if not self._session_path(session_id).exists():
+                raise FileNotFoundError(f"Session not found: {session_id}")
+            before = self._stamp(session_id)
+            with log_path.open("ab") as fh:
+                fh.write(data)
+            after = self._stamp(session_id)
+            self._cache_extend(session_id, before, after, len(data), new_messages)
+            # Sized under the lock: once released, the session may be archived and its log gone
+            log_size = log_path.stat().st_size
+        self.index.touch(session_id, updated_at=time.time(), added=len(new_messages))
+        if log_size > self.compact_threshold:
+            self.compact_session(session_id)
+
+    def _cache_extend(
+        self,
+        session_id: str,
+        before: Optional[_Stamp],
+        after: Optional[_Stamp],
+        written: int,
+        new_messages: List[ChatMessage],
+    ) -> None:
+        with self._cache_lock:
+            entry = self._cache.get(session_id)
+            if entry is None:
+                return
+            # Extend in place only if the log grew by exactly our bytes (no other writer)
+            unchanged = (
+                before is not None
+                and after is not None
+                and entry[0] == before
+                and after[:2] == before[:2]
+                and after[3] - before[3] == written
             )
-        return items
+            if unchanged:
+                entry[1].messages.extend(new_messages)
+                entry[1].version += len(new_messages)
+                self._cache[session_id] = (after, entry[1])
+            else:
+                del self._cache[session_id]
 
+    def append_message(self, session_id: str, message: ChatMessage) -> None:
+        """Persist one message; use ``load_session`` when the full history is needed."""
+        self.append_messages(session_id, [message])
+
+    @timed_store_op
+    def update_summary(self, session_id: str, summary: str, summary_upto: int) -> None:
+        """Store a session's rolling summary covering its first ``summary_upto`` messages.
+
+        The summary is derived data, so the session version is left unchanged.
+        """
+        with file_lock(self._lock_path(session_id)):
+            self._ensure_hot_locked(session_id)
+            session = self.load_session(session_id)
+            session.summary, session.summary_upto = summary, summary_upto
+            self._write_header(session)
+
+    def compact_session(self, session_id: str) -> None:
+        """Fold the append-only log of a session back into its header file.
+
+        Compaction does not change the session's content, so its version is kept.
+        """
+        with file_lock(self._lock_path(session_id)):
+            if not self._log_path(session_id).exists():
+                return
+            self._write_header(self.load_session(session_id))
+
+    @timed_store_op
+    def list_sessions(
+        self,
+        sort_by: str = "updated_at",
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """List session metadata from the manifest, most recently updated first.
+
+        Each item carries ``session_id``, ``subject``, ``goal``, ``language``,
+        ``created_at``, ``updated_at`` and ``message_count``.
+        """
+        return self.index.list(sort_by=sort_by, descending=descending, offset=offset, limit=limit)
+
+    def count_sessions(self) -> int:
+        return len(self.index)
+
+    @timed_store_op
     def delete_session(self, session_id: str) -> bool:
         path = self._session_path(session_id)
-        if not path.exists():
+        cold = self._cold_path(session_id)
+        if not path.exists() and cold is None:
+            if self.index.get(session_id) is not None:
+                self.index.remove(session_id)
             return False
         try:
-            path.unlink()
+            with file_lock(self._lock_path(session_id)):
+                self._cache_drop(session_id)
+                path.unlink(missing_ok=True)
+                cold = self._cold_path(session_id)
+                if cold is not None:
+                    cold[0].unlink(missing_ok=True)
+                self._log_path(session_id).unlink(missing_ok=True)
+                # Only the holder may unlink the lock file (see file_lock)
+                self._lock_path(session_id).unlink(missing_ok=True)
+            self.index.remove(session_id)
             return True
         except Exception:
             return False
 
+    @timed_store_op
     def find_session_by_subject_goal(self, subject: str, goal: Optional[str]) -> Optional[str]:
         """Return an existing session_id if one matches the exact subject and goal."""
-        normalized_goal = goal or ""
-        for info in self.list_sessions():
-            if info.get("subject", "") == subject and (info.get("goal", "") or "") == normalized_goal:
-                return info.get("session_id")
-        return None
+        session_id = self.index.find(subject, goal)
+        if session_id and not self._exists(session_id):
+            # The manifest drifted from disk (file removed out of band)
+            self.index.remove(session_id)
+            return None
+        return session_id
+
+    def rebuild_index(self) -> int:
+        """Recreate the manifest by scanning every session file. Returns the entry count."""
+        entries: List[Dict] = []
+        for codec, suffix in _COLD_SUFFIXES.items():
+            for file in sorted(self.cold_dir.glob(f"*{suffix}")):
+                try:
+                    raw = json.loads(_decompress(file.read_bytes(), codec).decode("utf-8"))
+                except Exception:
+                    continue
+                mtime = file.stat().st_mtime
+                entries.append(
+                    {
+                        "session_id": raw.get("session_id", file.name[: -len(suffix)]),
+                        "subject": raw.get("subject", ""),
+                        "goal": raw.get("goal"),
+                        "language": raw.get("language", "en"),
+                        "created_at": raw.get("created_at") or mtime,
+                        "updated_at": mtime,
+                        "message_count": len(raw.get("messages", [])),
+                    }
+                )
+        for file in sorted(self.sessions_dir.glob("*.json")):
+            try:
+                raw = json.loads(file.read_text(encoding="utf-8"))
+            except Exception:
+                continue
+            session_id = raw.get("session_id", file.stem)
+            log_path = self._log_path(session_id)
+            logged = 0
+            mtime = file.stat().st_mtime
+            if log_path.exists():
+                with log_path.open("rb") as fh:
+                    logged = sum(1 for line in fh if line.strip())
+                mtime = max(mtime, log_path.stat().st_mtime)
+            entries.append(
+                {
+                    "session_id": session_id,
+                    "subject": raw.get("subject", ""),
+                    "goal": raw.get("goal"),
+                    "language": raw.get("language", "en"),
+                    "created_at": raw.get("created_at") or mtime,
+                    "updated_at": mtime,
+                    "message_count": len(raw.get("messages", [])) + logged,
+                }
+            )
+        self.index.replace_all(entries)
+        return len(entries)
+
+    def archive_inactive(self, older_than: float, now: Optional[float] = None) -> Dict[str, int]:
+        """Move sessions not updated for ``older_than`` seconds into the cold tier.
+
+        Returns counts of archived sessions and the hot/cold byte sizes involved.
+        """
+        cutoff = (now if now is not None else time.time()) - older_than
+        report = {"archived": 0, "bytes_before": 0, "bytes_after": 0}
+        self.cold_dir.mkdir(parents=True, exist_ok=True)
+        suffix = _COLD_SUFFIXES[self.cold_codec]
+        for entry in self.index.list(sort_by="updated_at", descending=False):
+            if (entry.get("updated_at") or 0) > cutoff:
+                break
+            session_id = entry["session_id"]
+            header = self._session_path(session_id)
+            log_path = self._log_path(session_id)
+            with file_lock(self._lock_path(session_id)):
+                stamp = self._stamp(session_id)
+                # Use file times too, in case the manifest lags behind another writer
+                if stamp is None or max(stamp[0], stamp[2]) / 1e9 > cutoff:
+                    continue
+                session = self._read_session(session_id)
+                before = header.stat().st_size + (log_path.stat().st_size if log_path.exists() else 0)
+                data = _compress(
+                    json.dumps(_header_payload(session), ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                    self.cold_codec,
+                )
+                atomic_write_bytes(self.cold_dir / f"{session_id}{suffix}", data)
+                header.unlink()
+                log_path.unlink(missing_ok=True)
+                self._cache_drop(session_id)
+                self._lock_path(session_id).unlink(missing_ok=True)
+            report["archived"] += 1
+            report["bytes_before"] += before
+            report["bytes_after"] += len(data)
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Session storage maintenance")
+    parser.add_argument("--data-dir", default="data", help="Base data directory (default: data)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild-index", help="Recreate the session manifest from the session files")
+    archive = sub.add_parser("archive", help="Compress sessions untouched for a while into the cold tier")
+    archive.add_argument("--older-than-days", type=float, default=30.0)
+    archive.add_argument("--codec", choices=sorted(_COLD_SUFFIXES), default="gzip")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild-index":
+        store = SessionStore(base_dir=args.data_dir)
+        count = store.rebuild_index()
+        print(f"Indexed {count} sessions into {store.index.path}")
+    elif args.command == "archive":
+        store = SessionStore(base_dir=args.data_dir, cold_codec=args.codec)
+        report = store.archive_inactive(older_than=args.older_than_days * 86400)
+        saved = report["bytes_before"] - report["bytes_after"]
+        print(
+            f"Archived {report['archived']} sessions: {report['bytes_before']} -> "
+            f"{report['bytes_after']} bytes ({saved} bytes saved)"
+        )
+    return 0
 
 
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from ai_tutor.services.metrics import timed_store_op
+from ai_tutor.services.session_index import SORT_FIELDS, subject_goal_key
+from ai_tutor.services.session_store import ChatMessage, Session
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    subject TEXT NOT NULL,
+    goal TEXT,
+    language TEXT NOT NULL DEFAULT 'en',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    subject_goal_key TEXT NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    summary_upto INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_key ON sessions (subject_goal_key);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SqliteSessionStore:
+    """SessionStore-compatible backend on a single SQLite database in WAL mode.
+
+    Appending a turn inserts rows into ``messages`` keyed by (session_id, seq);
+    listing and duplicate detection are indexed queries on ``sessions``. WAL
+    lets readers in other worker processes proceed while a turn is written.
+    """
+
+    def __init__(self, base_dir: Path | str = Path("data"), db_path: Optional[Path | str] = None) -> None:
+        self.base_dir: Path = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path: Path = Path(db_path) if db_path is not None else self.base_dir / "sessions.db"
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # Databases created before rolling summaries lack these columns
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+            if "summary" not in columns:
+                conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+            if "summary_upto" not in columns:
+                conn.execute("ALTER TABLE sessions ADD COLUMN summary_upto INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connect())
+
+    def create_session(self, subject: str, goal: Optional[str], language: str = "en") -> Session:
+        session = Session(
+            session_id=uuid.uuid4().hex,
+            subject=subject,
+            goal=goal,
+            messages=[],
+            language=language,
+            created_at=time.time(),
+        )
+        self.save_session(session)
+        return session
+
+    @timed_store_op
+    def load_session(self, session_id: str) -> Session:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT session_id, subject, goal, language, created_at, summary, summary_upto FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Session not found: {session_id}")
+        messages = [
+            ChatMessage(role=role, content=content)
+            for role, content in conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            )
+        ]
+        return Session(
+            session_id=row[0],
+            subject=row[1],
+            goal=row[2],
+            messages=messages,
+            language=row[3],
+            created_at=row[4],
+            summary=row[5],
+            summary_upto=row[6],
+        )
+
+    def _require(self, conn: sqlite3.Connection, session_id: str) -> None:
+        if conn.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone() is None:
+            raise FileNotFoundError(f"Session not found: {session_id}")
+
+    @timed_store_op
+    def load_tail(self, session_id: str, n: int) -> List[ChatMessage]:
+        """Return the last ``n`` messages of a session."""
+        conn = self._connect()
+        self._require(conn, session_id)
+        rows = conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, max(n, 0)),
+        ).fetchall()
+        return [ChatMessage(role=role, content=content) for role, content in reversed(rows)]
+
+    @timed_store_op
+    def load_messages(self, session_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ChatMessage]:
+        """Return ``limit`` messages starting at ``offset`` (0 = oldest)."""
+        conn = self._connect()
+        self._require(conn, session_id)
+        rows = conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+            (session_id, -1 if limit is None else limit, offset),
+        )
+        return [ChatMessage(role=role, content=content) for role, content in rows]
+
+    @timed_store_op
+    def save_session(self, session: Session) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO sessions (
+                    session_id, subject, goal, language, created_at, updated_at, message_count, subject_goal_key,
+                    summary, summary_upto
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    subject = excluded.subject,
+                    goal = excluded.goal,
+                    language = excluded.language,
+                    updated_at = excluded.updated_at,
+                    message_count = excluded.message_count,
+                    subject_goal_key = excluded.subject_goal_key,
+                    summary = excluded.summary,
+                    summary_upto = excluded.summary_upto
+                """,
+                (
+                    session.session_id,
+                    session.subject,
+                    session.goal,
+                    getattr(session, "language", "en"),
+                    session.created_at or now,
+                    now,
+                    len(session.messages),
+                    subject_goal_key(session.subject, session.goal),
+                    session.summary,
+                    session.summary_upto,
+                ),
+            )
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session.session_id,))
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(session.session_id, i, m.role, m.content) for i, m in enumerate(session.messages)],
+            )
+
+    @timed_store_op
+    def append_messages(self, session_id: str, messages: Iterable[ChatMessage]) -> None:
+        new_messages = list(messages)
+        if not new_messages:
+            return
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT message_count FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                raise FileNotFoundError(f"Session not found: {session_id}")
+            start = row[0]
+            conn.executemany(
+                "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(session_id, start + i, m.role, m.content) for i, m in enumerate(new_messages)],
+            )
+            conn.execute(
+                "UPDATE sessions SET message_count = ?, updated_at = ? WHERE session_id = ?",
+                (start + len(new_messages), time.time(), session_id),
+            )
+
+    @timed_store_op
+    def update_summary(self, session_id: str, summary: str, summary_upto: int) -> None:
+        """Store a session's rolling summary covering its first ``summary_upto`` messages."""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE sessions SET summary = ?, summary_upto = ? WHERE session_id = ?",
+                (summary, summary_upto, session_id),
+            ).rowcount
+        if not updated:
+            raise FileNotFoundError(f"Session not found: {session_id}")
+
+    def append_message(self, session_id: str, message: ChatMessage) -> None:
+        """Persist one message; use ``load_session`` when the full history is needed."""
+        self.append_messages(session_id, [message])
+
+    @timed_store_op
+    def list_sessions(
+        self,
+        sort_by: str = "updated_at",
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {sort_by}")
+        direction = "DESC" if descending else "ASC"
+        rows = self._connect().execute(
+            f"""
+            SELECT session_id, subject, goal, language, created_at, updated_at, message_count
+            FROM sessions ORDER BY {sort_by} {direction} LIMIT ? OFFSET ?
+            """,
+            (-1 if limit is None else limit, offset),
+        ).fetchall()
+        keys = ("session_id", "subject", "goal", "language", "created_at", "updated_at", "message_count")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count_sessions(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    @timed_store_op
+    def delete_session(self, session_id: str) -> bool:
+        try:
+            with self._transaction() as conn:
+                deleted = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+                conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            return deleted > 0
+        except Exception:
+            return False
+
+    @timed_store_op
+    def find_session_by_subject_goal(self, subject: str, goal: Optional[str]) -> Optional[str]:
+        """Return an existing session_id if one matches the exact subject and goal."""
+        row = self._connect().execute(
+            "SELECT session_id FROM sessions WHERE subject_goal_key = ? LIMIT 1",
+            (subject_goal_key(subject, goal),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def import_json_sessions(self, sessions_dir: Path | str) -> int:
+        """Import every session of the JSON store whose session files live in ``sessions_dir``.
+
+        Sessions are enumerated from that store's manifest and read with its
+        ``load_session``, so messages still in ``<id>.jsonl`` logs and sessions
+        archived to the cold tier are included (archived ones are rehydrated in
+        the JSON store as a side effect). Sessions already present in the
+        database are replaced. Returns the number of sessions imported.
+        """
+        from ai_tutor.services.session_store import SessionStore
+
+        source_dir = Path(sessions_dir)
+        source = SessionStore(base_dir=source_dir.parent)
+        imported = 0
+        for entry in source.list_sessions(sort_by="created_at", descending=False):
+            try:
+                session = source.load_session(entry["session_id"])
+            except Exception:
+                continue
+            if session.created_at is None:
+                session.created_at = entry.get("created_at") or entry.get("updated_at")
+            self.save_session(session)
+            imported += 1
+        return imported
+
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT``/``ROLLBACK`` on an autocommit connection."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SQLite session store tools")
+    parser.add_argument("--data-dir", default="data", help="Base data directory (default: data)")
+    parser.add_argument("--db", default=None, help="Database path (default: <data-dir>/sessions.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="Import <data-dir>/sessions/*.json into the database")
+    args = parser.parse_args(argv)
+
+    store = SqliteSessionStore(base_dir=args.data_dir, db_path=args.db)
+    if args.command == "migrate":
+        count = store.import_json_sessions(Path(args.data_dir) / "sessions")
+        print(f"Imported {count} sessions into {store.db_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "abandoned")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # The leader stopped without a result (e.g. a stream closed early); followers retry
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait and receive the same result or exception.
+    Nothing is cached once the call finishes. Results are shared objects, so
+    callers must not mutate them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[Tuple[int, str], "asyncio.Future[Any]"] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = _Flight()
+                    self._flights[key] = flight
+                    self.executed += 1
+                else:
+                    self.coalesced += 1
+            if leader:
+                break
+            flight.done.wait()
+            if flight.abandoned:
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def begin(self, key: str) -> Optional[_Flight]:
+        """Open a flight the caller leads and closes with ``end``; None if one is already open.
+
+        For calls that cannot be wrapped in ``do`` (a streamed reply is produced
+        chunk by chunk): identical ``do`` calls made meanwhile wait for ``end``.
+        """
+        with self._lock:
+            if key in self._flights:
+                return None
+            flight = self._flights[key] = _Flight()
+            self.executed += 1
+            return flight
+
+    def end(self, key: str, flight: _Flight, result: Any = None, error: Optional[BaseException] = None, abandoned: bool = False) -> None:
+        flight.result, flight.error, flight.abandoned = result, error, abandoned
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Async ``do``; calls are coalesced among tasks of the same event loop."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            shared = self._async_flights.get(flight_key)
+            leader = shared is None
+            if leader:
+                shared = loop.create_future()
+                self._async_flights[flight_key] = shared
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            # shield: a cancelled follower must not cancel the shared call
+            return await asyncio.shield(shared)
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            shared.cancel()
+            raise
+        except BaseException as exc:
+            if not shared.done():
+                shared.set_exception(exc)
+                # Mark retrieved so an unobserved failure is not logged as a loop warning
+                shared.exception()
+            raise
+        else:
+            shared.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._async_flights.pop(flight_key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights) + len(self._async_flights),
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_flight_group(name: str) -> SingleFlight:
+    """Process-wide group for one kind of upstream call (e.g. "llm", "search")."""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = SingleFlight()
+            _groups[name] = group
+        return group
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    with _groups_lock:
+        groups = dict(_groups)
+    return {name: group.stats() for name, group in groups.items()}
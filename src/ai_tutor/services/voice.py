@@ -3,7 +3,9 @@ from __future__ import annotations
 import io
 from typing import Optional
 
-from ai_tutor.llm.providers import read_llm_configuration
+from ai_tutor.llm.providers import get_openai_client
+from ai_tutor.llm.resilience import call_with_policy
+from ai_tutor.services.metrics import track_llm
 
 
 def ensure_wav_mono_16k(raw_wav: bytes) -> bytes:
@@ -14,20 +16,19 @@ def ensure_wav_mono_16k(raw_wav: bytes) -> bytes:
 def transcribe_wav_to_text(raw_wav: bytes, model: str = "whisper-1") -> str:
     """Transcribe a WAV byte stream using OpenAI Whisper via env config.
 
-    Uses OPENAI_API_KEY and OPENAI_BASE_URL from .env (same as chat provider).
+    Uses OPENAI_API_KEY and OPENAI_BASE_URL from .env (same as chat provider)
+    and reuses the chat provider's pooled client.
     """
-    try:
-        from openai import OpenAI  # type: ignore
-    except Exception as exc:  # pragma: no cover
-        raise RuntimeError("openai package not installed in environment") from exc
-
-    cfg = read_llm_configuration()
-    client = OpenAI(api_key=cfg.api_key, base_url=cfg.base_url)
-
-    buffer = io.BytesIO(raw_wav)
-    # name is required by the SDK to infer filename/content-type
-    buffer.name = "audio.wav"  # type: ignore[attr-defined]
-    response = client.audio.transcriptions.create(model=model, file=buffer)
+    client = get_openai_client()
+
+    def transcribe(timeout: float):
+        buffer = io.BytesIO(raw_wav)
+        # name is required by the SDK to infer filename/content-type
+        buffer.name = "audio.wav"  # type: ignore[attr-defined]
+        return client.audio.transcriptions.create(model=model, file=buffer, timeout=timeout)
+
+    with track_llm("transcription", model):
+        response = call_with_policy("transcription", transcribe, str(client.base_url))
     return getattr(response, "text", "") or ""
 
 
@@ -1,42 +1,50 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
-import httpx
+from ai_tutor.llm.providers import get_shared_async_http_client, get_shared_http_client, read_stub_url
+from ai_tutor.services.limiter import get_limiter
+from ai_tutor.services.metrics import track_search
+from ai_tutor.services.singleflight import get_flight_group
 
 
 class TavilySearchError(RuntimeError):
     pass
 
 
+TAVILY_BASE_URL = "https://api.tavily.com"
+
+
 def is_tavily_configured(env: Optional[Dict[str, str]] = None) -> bool:
     environment = env if env is not None else os.environ
-    return bool(environment.get("TAVILY_API_KEY"))
+    return bool(environment.get("TAVILY_API_KEY")) or bool(read_stub_url(environment))
 
 
-def tavily_search(query: str, max_results: int = 5, env: Optional[Dict[str, str]] = None) -> List[Dict[str, str]]:
+def tavily_search_url(env: Optional[Dict[str, str]] = None) -> str:
+    """Search endpoint: the stub server when ``AI_TUTOR_STUB_URL`` is set, else ``TAVILY_BASE_URL``."""
     environment = env if env is not None else os.environ
-    api_key = environment.get("TAVILY_API_KEY", "").strip()
+    base_url = read_stub_url(environment) or environment.get("TAVILY_BASE_URL", "").strip() or TAVILY_BASE_URL
+    return base_url.rstrip("/") + "/search"
+
+
+def _build_payload(query: str, max_results: int, env: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    environment = env if env is not None else os.environ
+    api_key = environment.get("TAVILY_API_KEY", "").strip() or ("stub" if read_stub_url(environment) else "")
     if not api_key:
         raise TavilySearchError("TAVILY_API_KEY is not set.")
-
-    url = "https://api.tavily.com/search"
-    payload = {
+    return {
         "api_key": api_key,
         "query": query,
         "search_depth": "basic",
         "include_answer": False,
         "max_results": max_results,
     }
-    try:
-        with httpx.Client(timeout=15.0) as client:
-            res = client.post(url, json=payload)
-            res.raise_for_status()
-            data = res.json()
-    except Exception as exc:  # pragma: no cover - network failures
-        raise TavilySearchError(str(exc)) from exc
 
+
+def _simplify(data: Dict[str, Any]) -> List[Dict[str, str]]:
     results = data.get("results", [])
     simplified: List[Dict[str, str]] = []
     for item in results:
@@ -50,3 +58,45 @@ def tavily_search(query: str, max_results: int = 5, env: Optional[Dict[str, str]
     return simplified
 
 
+def _flight_key(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def tavily_search(query: str, max_results: int = 5, env: Optional[Dict[str, str]] = None) -> List[Dict[str, str]]:
+    """Search Tavily over the shared keep-alive pool; identical concurrent queries share one request."""
+    payload = _build_payload(query, max_results, env)
+    url = tavily_search_url(env)
+
+    def search() -> List[Dict[str, str]]:
+        try:
+            with get_limiter("search").slot("search"), track_search():
+                res = get_shared_http_client().post(url, json=payload, timeout=15.0)
+                res.raise_for_status()
+                data = res.json()
+        except Exception as exc:  # pragma: no cover - network failures
+            raise TavilySearchError(str(exc)) from exc
+        return _simplify(data)
+
+    # Coalesced callers receive the same list; hand each its own copy
+    return [dict(r) for r in get_flight_group("search").do(_flight_key(payload), search)]
+
+
+async def atavily_search(
+    query: str, max_results: int = 5, env: Optional[Dict[str, str]] = None
+) -> List[Dict[str, str]]:
+    """Async twin of ``tavily_search`` on the event loop's shared ``httpx.AsyncClient``."""
+    payload = _build_payload(query, max_results, env)
+    url = tavily_search_url(env)
+
+    async def search() -> List[Dict[str, str]]:
+        try:
+            async with get_limiter("search").aslot("search"):
+                with track_search():
+                    res = await get_shared_async_http_client().post(url, json=payload, timeout=15.0)
+                    res.raise_for_status()
+                    data = res.json()
+        except Exception as exc:  # pragma: no cover - network failures
+            raise TavilySearchError(str(exc)) from exc
+        return _simplify(data)
+
+    return [dict(r) for r in await get_flight_group("search").ado(_flight_key(payload), search)]
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import numpy as np
+
+from ai_tutor.services.analytics import MasteryAnalytics
+from ai_tutor.services.quiz_store import QuizResult, QuizStore
+
+
+def test_save_result_updates_mastery_incrementally(tmp_path: Path) -> None:
+    store = QuizStore(base_dir=tmp_path)
+    store.save_result(QuizResult("s1", "q1", "Fractions", 4, 1, [0, 0, 0, 0], [1, 2, 3], difficulty="easy"))
+    store.save_result(QuizResult("s1", "q2", "Decimals", 4, 4, [0, 0, 0, 0], [], difficulty="easy"))
+    store.save_result(QuizResult("s2", "q1", "Fractions", 4, 3, [0, 0, 0, 0], [3], difficulty="easy"))
+
+    weakest = store.analytics.weakest_topics("s1", k=1)
+    assert weakest[0]["topic"] == "Fractions" and weakest[0]["mastery"] == 0.25
+    hardest = store.analytics.hardest_questions(k=1)
+    assert hardest[0] == {"question": "q1:3", "miss_rate": 1.0, "attempts": 2}
+
+    # Survives a checkpoint and a reload from disk
+    store.analytics.checkpoint()
+    store.save_result(QuizResult("s1", "q3", "Fractions", 2, 2, [0, 0], [], difficulty="hard"))
+    reloaded = MasteryAnalytics(tmp_path)
+    assert reloaded.mastery("s1")["Fractions"] == {"easy": 0.25, "hard": 1.0}
+
+
+def test_counts_stay_sparse_with_many_learners_and_topics(tmp_path: Path) -> None:
+    learners, topics = 3000, 3000
+    results = [
+        {
+            "session_id": f"s{i}",
+            "quiz_id": f"q{i}",
+            # Each learner touches three of the 3000 topics
+            "topic": f"topic {(i * 7 + j) % topics}",
+            "difficulty": "medium",
+            "total_questions": 2,
+            "correct_answers": j % 3,
+            "incorrect_indices": [],
+        }
+        for i in range(learners)
+        for j in range(3)
+    ]
+    analytics = MasteryAnalytics(tmp_path)
+    assert analytics.rebuild(results) == 9000
+    assert len(analytics.topics) == topics
+
+    # Dense learner x topic x difficulty int32 counts would need 2 x 108 MB
+    counts_bytes = sum(a.nbytes for a in (analytics._attempts, analytics._correct, analytics._cell_learner, analytics._cell_topic))
+    assert counts_bytes < 1_000_000
+    assert analytics.checkpoint_path.stat().st_size < 1_000_000
+
+    reloaded = MasteryAnalytics(tmp_path)
+    assert reloaded.mastery("s10") == {"topic 70": {"medium": 0.0}, "topic 71": {"medium": 0.5}, "topic 72": {"medium": 1.0}}
+    assert reloaded.weakest_topics("s10", k=1)[0] == {"topic": "topic 70", "mastery": 0.0, "attempts": 2}
+
+
+def test_dense_checkpoints_are_converted_on_load(tmp_path: Path) -> None:
+    directory = tmp_path / "analytics"
+    directory.mkdir()
+    attempts = np.zeros((2, 2, 3), dtype=np.int32)
+    correct = np.zeros((2, 2, 3), dtype=np.int32)
+    attempts[1, 0, 2], correct[1, 0, 2] = 4, 3
+    np.savez_compressed(
+        directory / "mastery.npz",
+        learners=np.array(["a", "b"]),
+        topics=np.array(["Fractions", "Decimals"]),
+        questions=np.array([], dtype=str),
+        attempts=attempts,
+        correct=correct,
+        q_attempts=np.zeros(0, dtype=np.int32),
+        q_misses=np.zeros(0, dtype=np.int32),
+        journal_id=np.array("j1"),
+    )
+    analytics = MasteryAnalytics(tmp_path)
+    assert analytics.mastery("b") == {"Fractions": {"hard": 0.75}}
+    assert analytics.mastery("a") == {}
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage
+
+import ai_tutor.graph.lang_tutor as lang_tutor
+from ai_tutor.llm.capabilities import CapabilityCache
+from ai_tutor.llm.providers import OpenAIProvider
+from ai_tutor.services.session_store import SessionStore
+
+
+class _SlowChat:
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(0.2)
+        return AIMessage(content=f"echo: {messages[-1].content}")
+
+
+def test_acontinue_session_runs_turns_concurrently(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(lang_tutor, "get_langchain_chat", lambda: _SlowChat())
+    store = SessionStore(base_dir=tmp_path, append_log=True)
+    graph = lang_tutor.LangTutorGraph(store=store)
+    ids = [store.create_session(f"Subject {i}", None).session_id for i in range(5)]
+
+    async def run():
+        return await asyncio.gather(*(graph.acontinue_session(sid, f"q{i}") for i, sid in enumerate(ids)))
+
+    started = time.perf_counter()
+    sessions = asyncio.run(run())
+    # Five 0.2 s model calls overlap on one event loop instead of queueing
+    assert time.perf_counter() - started < 0.8
+    for i, (sid, session) in enumerate(zip(ids, sessions)):
+        assert session.messages[-1].content == f"echo: q{i}"
+        assert [m.content for m in store.load_session(sid).messages] == [f"q{i}", f"echo: q{i}"]
+
+
+def test_agenerate_applies_parameter_fallbacks() -> None:
+    calls = []
+
+    async def create(**payload):
+        calls.append(dict(payload))
+        if "max_tokens" in payload:
+            raise RuntimeError("Unsupported parameter: 'max_tokens' is not supported with this model.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+    async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    provider = OpenAIProvider(
+        None, "o-mini", base_url="http://llm", capabilities=CapabilityCache(), async_client=async_client
+    )
+    messages = [{"role": "user", "content": "hi"}]
+    assert asyncio.run(provider.agenerate(messages, max_tokens=20)) == "ok"
+    assert asyncio.run(provider.agenerate(messages, max_tokens=20)) == "ok"
+    assert [sorted(c) for c in calls] == [
+        ["max_tokens", "messages", "model", "temperature", "timeout"],
+        ["max_completion_tokens", "messages", "model", "temperature", "timeout"],
+        ["max_completion_tokens", "messages", "model", "temperature", "timeout"],
+    ]
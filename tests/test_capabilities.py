@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from ai_tutor.llm.capabilities import CapabilityCache
+from ai_tutor.llm.providers import OpenAIProvider
+
+
+class _StrictCompletions:
+    """Rejects max_tokens and non-default temperature like reasoning models do."""
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def create(self, **payload):
+        self.calls.append(dict(payload))
+        if "max_tokens" in payload:
+            raise RuntimeError("Unsupported parameter: 'max_tokens' is not supported with this model.")
+        if "temperature" in payload:
+            raise RuntimeError("Unsupported value: 'temperature' does not support 0.2 with this model.")
+        message = SimpleNamespace(content="ok")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _provider(cache: CapabilityCache) -> tuple:
+    completions = _StrictCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return OpenAIProvider(client, "o-mini", base_url="http://llm", capabilities=cache), completions
+
+
+def test_rejected_parameters_are_learned_once(tmp_path) -> None:
+    cache = CapabilityCache(tmp_path / "caps.json")
+    provider, completions = _provider(cache)
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert provider.generate(messages, temperature=0.2, max_tokens=50) == "ok"
+    assert len(completions.calls) == 3
+    assert cache.lookup("http://llm", "o-mini") == {"token_param": "max_completion_tokens", "temperature": False}
+
+    completions.calls.clear()
+    assert provider.generate(messages, temperature=0.2, max_tokens=50) == "ok"
+    assert completions.calls == [
+        {"model": "o-mini", "messages": messages, "max_completion_tokens": 50, "timeout": 60.0}
+    ]
+
+    # A fresh process reads the learned capabilities back from disk
+    provider2, completions2 = _provider(CapabilityCache(tmp_path / "caps.json"))
+    provider2.generate(messages, temperature=0.2, max_tokens=50)
+    assert len(completions2.calls) == 1
+    assert provider2._capabilities.stats()["hits"] == 1
+
+
+def test_json_mode_is_dropped_for_backends_that_reject_it() -> None:
+    calls = []
+
+    def create(**payload):
+        calls.append(dict(payload))
+        if "response_format" in payload:
+            raise RuntimeError("Invalid parameter: 'response_format' of type 'json_object' is not supported with this model.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))])
+
+    cache = CapabilityCache()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    provider = OpenAIProvider(client, "local-model", base_url="http://llm", capabilities=cache)
+    messages = [{"role": "user", "content": "quiz"}]
+
+    assert provider.generate(messages, temperature=1, json_mode=True, use_cache=False) == "{}"
+    assert [("response_format" in c) for c in calls] == [True, False]
+    assert cache.lookup("http://llm", "local-model") == {"json_mode": False}
+    calls.clear()
+    provider.generate(messages, temperature=1, json_mode=True, use_cache=False)
+    assert len(calls) == 1 and "response_format" not in calls[0]
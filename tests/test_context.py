@@ -0,0 +1,56 @@
+from ai_tutor.llm.context import ContextManager, build_context, count_tokens
+from ai_tutor.services.session_store import ChatMessage, SessionStore
+
+
+def _turns(n: int, words: int = 40):
+    return [
+        ChatMessage(role="user" if i % 2 == 0 else "assistant", content=f"turn {i} " + "word " * words)
+        for i in range(n)
+    ]
+
+
+def test_build_context_keeps_system_prompt_and_recent_turns() -> None:
+    messages = [ChatMessage(role="system", content="You are a tutor.")] + _turns(40)
+    context = build_context(messages, max_tokens=500, summary="Learner knows limits.", summary_upto=10)
+    assert context[0]["content"] == "You are a tutor."
+    assert context[1]["content"].endswith("Learner knows limits.")
+    assert context[-1] is messages[-1]
+    kept = context[2:]
+    assert 0 < len(kept) < 40
+    assert sum(count_tokens(m["content"]) for m in context) <= 500
+    # Tiny budgets still keep the newest turns verbatim
+    assert build_context(messages, max_tokens=10, min_recent=3)[1:] == messages[-3:]
+
+
+def test_context_manager_folds_old_turns_incrementally(tmp_path) -> None:
+    store = SessionStore(base_dir=tmp_path, append_log=True)
+    session = store.create_session("Math", None)
+    store.append_messages(session.session_id, [ChatMessage(role="system", content="You are a tutor.")] + _turns(30))
+    calls = []
+
+    def summarizer(previous, turns, language):
+        calls.append((previous, [m["content"].split()[1] for m in turns]))
+        return f"summary after {len(calls)} folds"
+
+    manager = ContextManager(store=store, max_tokens=600, summarizer=summarizer)
+    session = store.load_session(session.session_id)
+    context = manager.prepare(session)
+    assert len(calls) == 1 and calls[0][0] == ""
+    upto = session.summary_upto
+    assert calls[0][1][0] == "0" and 1 < upto < 31
+    assert context[1]["content"].endswith("summary after 1 folds")
+
+    # Stored with the session; the next turn fits without another summarizer call
+    reloaded = store.load_session(session.session_id)
+    assert (reloaded.summary, reloaded.summary_upto) == ("summary after 1 folds", upto)
+    reloaded.messages.append(ChatMessage(role="user", content="short question"))
+    manager.prepare(reloaded)
+    assert len(calls) == 1
+
+    # Once recent turns overflow again only the new overflow is summarized
+    store.append_messages(session.session_id, _turns(20))
+    grown = store.load_session(session.session_id)
+    manager.prepare(grown)
+    assert len(calls) == 2
+    assert calls[1][0] == "summary after 1 folds"
+    assert grown.summary_upto > upto
@@ -0,0 +1,164 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from ai_tutor.services import jobs as jobs_module
+from ai_tutor.services.jobs import JobExecutor, JobQueueFullError
+from ai_tutor.services.limiter import SPECULATIVE, priority_for
+from ai_tutor.services.quiz import MCQQuestion, MCQQuiz
+from ai_tutor.services.quiz_store import QuizStore
+from ai_tutor.services.session_store import SessionStore
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Fake quiz generator that blocks until the returned event is set and records call priorities."""
+    release = threading.Event()
+    calls = []
+
+    def fake_stream(**kwargs):
+        topic = kwargs["topic"]
+        calls.append((topic, priority_for("quiz")))
+        question = MCQQuestion(question=f"{topic}?", options=["a", "b"], correct_index=0, explanation="")
+        yield question
+        release.wait(timeout=5)
+        yield MCQQuiz(quiz_id=f"quiz-{topic}", subject="Math", topic=topic, difficulty="medium", questions=[question])
+
+    monkeypatch.setattr(jobs_module, "stream_mcq_quiz", fake_stream)
+    release.calls = calls
+    return release
+
+
+def _wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def _session(tmp_path):
+    return SessionStore(base_dir=tmp_path / "sessions").create_session("Math", None)
+
+
+def test_quiz_job_runs_in_background_and_saves_the_quiz(tmp_path, gate) -> None:
+    quiz_store = QuizStore(base_dir=tmp_path / "quizzes")
+    executor = JobExecutor(quiz_store, max_workers=1)
+    job_id = executor.submit_quiz(_session(tmp_path), topic="fractions")
+    # Questions streamed so far are visible while the job is still running
+    _wait_until(lambda: executor.get(job_id).partial)
+    assert executor.get(job_id).partial[0]["question"] == "fractions?"
+    gate.set()
+
+    job = executor.wait(job_id, timeout=5)
+    assert job.status == "done" and job.result == {"quiz_id": "quiz-fractions"} and job.partial == []
+    assert quiz_store.load_quiz(job.session_id, "quiz-fractions")["topic"] == "fractions"
+    # A fresh executor (another worker or a restart) still reports the persisted outcome
+    assert JobExecutor(quiz_store, speculate=False).get(job_id).status == "done"
+    executor.shutdown()
+
+
+def test_click_reuses_the_speculative_job_and_stale_speculation_is_dropped(tmp_path, gate) -> None:
+    executor = JobExecutor(QuizStore(base_dir=tmp_path / "quizzes"), max_workers=1, speculate=True)
+    session = _session(tmp_path)
+    blocker = executor.submit_quiz(session, topic="warmup")
+    stale = executor.speculate_quiz(session, topic="algebra")
+    latest = executor.speculate_quiz(session, topic="geometry")
+    assert executor.get(stale).status == "cancelled"
+
+    clicked = executor.submit_quiz(session, topic="geometry")
+    gate.set()
+    assert executor.wait(blocker, timeout=5).status == "done"
+    assert executor.wait(clicked, timeout=5).status == "done"
+    # The queued speculation was promoted to a normal-priority job rather than run twice
+    assert executor.get(latest).status == "cancelled"
+    assert [topic for topic, _ in gate.calls] == ["warmup", "geometry"]
+    assert all(priority != SPECULATIVE for _, priority in gate.calls)
+
+    # Once a speculative job is running or done, the click gets it directly
+    speculated = executor.speculate_quiz(session, topic="ratios")
+    assert executor.wait(speculated, timeout=5).status == "done"
+    assert executor.submit_quiz(session, topic="ratios") == speculated
+    assert gate.calls[-1] == ("ratios", SPECULATIVE)
+    executor.shutdown()
+
+
+def test_full_queue_rejects_requests_and_skips_speculation(tmp_path, gate) -> None:
+    executor = JobExecutor(QuizStore(base_dir=tmp_path / "quizzes"), max_workers=1, max_pending=1, speculate=True)
+    session = _session(tmp_path)
+    first = executor.submit_quiz(session, topic="a")
+    _wait_until(lambda: executor.get(first).status == "running")
+    executor.submit_quiz(session, topic="b")
+    assert executor.speculate_quiz(session, topic="c") is None
+    with pytest.raises(JobQueueFullError):
+        executor.submit_quiz(session, topic="d")
+    gate.set()
+    executor.shutdown()
+
+
+def test_speculation_is_off_unless_enabled(tmp_path) -> None:
+    assert not jobs_module.is_speculation_enabled({})
+    assert jobs_module.is_speculation_enabled({"SPECULATIVE_GENERATION": "on"})
+    executor = JobExecutor(QuizStore(base_dir=tmp_path / "quizzes"), speculate=False)
+    assert executor.speculate_quiz(_session(tmp_path), topic="x") is None
+    assert executor.stats() == {"speculative": 0}
+
+
+def test_persisted_job_is_interrupted_only_when_its_owner_is_gone(tmp_path, gate) -> None:
+    quiz_store = QuizStore(base_dir=tmp_path / "quizzes")
+    executor = JobExecutor(quiz_store, max_workers=1, heartbeat=0.02)
+    job_id = executor.submit_quiz(_session(tmp_path), topic="fractions")
+    first_beat = quiz_store.load_job(job_id)["updated_at"]
+    _wait_until(lambda: quiz_store.load_job(job_id)["updated_at"] > first_beat)
+
+    # Another worker sees the job still running while its owner is alive and beating
+    other = JobExecutor(quiz_store, speculate=False)
+    assert other.get(job_id).status == "running"
+
+    record = quiz_store.load_job(job_id)
+    finished = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    quiz_store.save_job(dict(record, job_id="dead-owner", owner_pid=int(finished.stdout)))
+    assert other.get("dead-owner").status == "failed"
+    quiz_store.save_job(dict(record, job_id="stale", owner_host="elsewhere", updated_at=time.time() - 120))
+    assert other.get("stale").status == "failed"
+
+    gate.set()
+    assert executor.wait(job_id, timeout=5).status == "done"
+    executor.shutdown()
+
+
+def test_delivered_quiz_is_not_reused_for_the_next_click(tmp_path, gate) -> None:
+    gate.set()
+    executor = JobExecutor(QuizStore(base_dir=tmp_path / "quizzes"), max_workers=1, speculate=False)
+    session = _session(tmp_path)
+    first = executor.submit_quiz(session, topic="fractions")
+    assert executor.submit_quiz(session, topic="fractions") == first
+    assert executor.wait(first, timeout=5).status == "done"
+
+    again = executor.submit_quiz(session, topic="fractions")
+    assert again != first
+    assert executor.wait(again, timeout=5).status == "done"
+    executor.shutdown()
+
+
+def test_lessons_are_kept_per_set_of_missed_questions(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(
+        jobs_module, "generate_remediation", lambda **kwargs: f"review {kwargs['incorrect_indices']}"
+    )
+    quiz_store = QuizStore(base_dir=tmp_path / "quizzes")
+    executor = JobExecutor(quiz_store, max_workers=1, speculate=True)
+    session = _session(tmp_path)
+    quiz = {"quiz_id": "q1", "topic": "fractions"}
+
+    asked = executor.submit_remediation(session, quiz, [0, 2])
+    speculated = executor.speculate_remediation(session, quiz, [1])
+    lesson_job = executor.wait(asked, timeout=5)
+    assert executor.wait(speculated, timeout=5).status == "done"
+
+    # The later speculative lesson does not replace the one the learner asked for
+    saved = quiz_store.load_lesson(session.session_id, "q1", lesson_job.result["incorrect_indices"])
+    assert saved["lesson"] == "review [0, 2]"
+    assert quiz_store.load_lesson(session.session_id, "q1", [1])["lesson"] == "review [1]"
+    executor.shutdown()
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ai_tutor.services.limiter import (
+    BATCH,
+    INTERACTIVE,
+    QUEUE_WAIT,
+    Limiter,
+    LimiterSettings,
+    LimiterTimeoutError,
+    TokenBucket,
+    read_limiter_settings,
+)
+
+
+def _wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_interactive_calls_are_served_before_queued_batch_work() -> None:
+    limiter = Limiter("test-priority", LimiterSettings(max_in_flight=1))
+    held = limiter.acquire(INTERACTIVE)
+    order = []
+
+    def worker(name: str, priority: int) -> None:
+        permit = limiter.acquire(priority)
+        order.append(name)
+        limiter.release(permit)
+
+    threads = [threading.Thread(target=worker, args=("quiz-1", BATCH)), threading.Thread(target=worker, args=("quiz-2", BATCH))]
+    for t in threads:
+        t.start()
+    _wait_until(lambda: limiter.stats()["queued"] == 2)
+    tutoring = threading.Thread(target=worker, args=("tutoring", INTERACTIVE))
+    tutoring.start()
+    _wait_until(lambda: limiter.stats()["queued"] == 3)
+
+    limiter.release(held)
+    for t in threads + [tutoring]:
+        t.join(timeout=2)
+    assert order == ["tutoring", "quiz-1", "quiz-2"]
+    assert limiter.stats()["in_flight"] == 0
+    assert any(r["limiter"] == "test-priority" for r in QUEUE_WAIT.summary())
+
+
+def test_waiting_past_max_wait_raises_and_frees_the_queue() -> None:
+    limiter = Limiter("test-timeout", LimiterSettings(max_in_flight=1, max_wait=0.05))
+    held = limiter.acquire()
+    with pytest.raises(LimiterTimeoutError):
+        limiter.acquire()
+    stats = limiter.stats()
+    assert stats["rejected"] == 1 and stats["queued"] == 0
+    limiter.release(held)
+    limiter.release(limiter.acquire())
+
+
+def test_token_bucket_paces_to_the_per_minute_budget() -> None:
+    bucket = TokenBucket(per_minute=60)
+    now = time.monotonic()
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0, rel=0.05)
+    # Usage below the estimate is returned to the bucket
+    bucket.adjust(30)
+    assert bucket.wait_time(30, now) == 0
+
+
+def test_tokens_per_minute_budget_delays_the_next_call() -> None:
+    limiter = Limiter("test-tpm", LimiterSettings(max_in_flight=4, tokens_per_minute=6000))
+    with limiter.slot("quiz", tokens=6000):
+        pass
+    started = time.monotonic()
+    with limiter.slot("quiz", tokens=10):
+        pass
+    # 10 tokens at 100 tokens/s
+    assert time.monotonic() - started >= 0.08
+
+
+def test_async_slots_respect_max_in_flight() -> None:
+    limiter = Limiter("test-async", LimiterSettings(max_in_flight=2))
+    active = 0
+    peak = 0
+
+    async def call() -> None:
+        nonlocal active, peak
+        async with limiter.aslot("tutoring"):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+
+    async def main() -> None:
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2 and limiter.stats()["granted"] == 6
+
+
+def test_settings_come_from_the_environment() -> None:
+    settings = read_limiter_settings("llm", {"LLM_MAX_IN_FLIGHT": "4", "LLM_RPM": "500", "LLM_TPM": "90000"})
+    assert (settings.max_in_flight, settings.requests_per_minute, settings.tokens_per_minute) == (4, 500, 90000)
+    assert read_limiter_settings("search", {}).max_in_flight == 4
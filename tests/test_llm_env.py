@@ -29,3 +29,20 @@ def test_read_llm_configuration_requires_env(monkeypatch) -> None:
         assert False, "Expected RuntimeError when env is missing"
 
 
+def test_llm_provider_is_pooled_per_configuration(monkeypatch) -> None:
+    from ai_tutor.llm.providers import get_llm_provider, read_pool_settings, reset_llm_clients
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o-mini")
+    monkeypatch.setenv("OPENAI_MAX_CONNECTIONS", "5")
+    reset_llm_clients()
+    try:
+        assert read_pool_settings().max_connections == 5
+        first = get_llm_provider()
+        assert get_llm_provider() is first
+        monkeypatch.setenv("OPENAI_MODEL", "gpt-4o")
+        other = get_llm_provider()
+        assert other is not first and other._client is first._client
+    finally:
+        reset_llm_clients()
@@ -0,0 +1,76 @@
+import httpx
+
+from ai_tutor.devtools.stub_server import StubConfig, StubServer
+from ai_tutor.llm.providers import get_llm_provider, reset_llm_clients
+from ai_tutor.services.metrics import (
+    LLM_REQUESTS,
+    LLM_TOKENS,
+    STORE_LATENCY,
+    MetricsRegistry,
+    get_registry,
+    llm_task_summary,
+    start_metrics_server,
+)
+from ai_tutor.services.session_store import SessionStore
+
+
+def test_histogram_quantiles_and_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    hist = registry.histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.2, 0.3, 2.0):
+        hist.observe(value, op="read")
+    registry.counter("ops_total", "Ops", ("op",)).inc(op='say "hi"')
+
+    [row] = hist.summary()
+    assert row["count"] == 4 and row["p50"] == 0.3 and row["p99"] == 2.0
+    text = registry.render_prometheus()
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 4' in text
+    assert 'op_seconds_count{op="read"} 4' in text
+    assert 'ops_total{op="say \\"hi\\""} 1' in text
+    assert registry.histogram("op_seconds", "Op latency", ("op",)) is hist
+
+
+def test_provider_and_store_calls_are_recorded(tmp_path, monkeypatch) -> None:
+    get_registry().clear()
+    server = StubServer(StubConfig(latency_ms=1, latency_dist="fixed", tokens_per_sec=0, reply_tokens=5))
+    monkeypatch.setenv("AI_TUTOR_STUB_URL", server.start())
+    monkeypatch.setenv("LLM_RESPONSE_CACHE", "off")
+    reset_llm_clients()
+    try:
+        provider = get_llm_provider()
+        provider.generate([{"role": "user", "content": "hi"}], task="quiz")
+        assert "".join(provider.stream([{"role": "user", "content": "hi"}]))
+    finally:
+        reset_llm_clients()
+        server.stop()
+
+    assert LLM_REQUESTS.value(task="quiz", model="stub-model", outcome="ok") == 1
+    assert LLM_REQUESTS.value(task="tutoring", model="stub-model", outcome="ok") == 1
+    # The stub reports completion tokens; the streamed reply is counted chunk by chunk
+    completion = LLM_TOKENS.value(task="quiz", model="stub-model", kind="completion")
+    assert completion > 0
+    assert LLM_TOKENS.value(task="tutoring", model="stub-model", kind="completion") == completion
+    rows = {r["task"]: r for r in llm_task_summary()}
+    assert rows["quiz"]["calls"] == 1 and rows["quiz"]["errors"] == 0 and rows["quiz"]["tokens_per_sec"] > 0
+
+    store = SessionStore(base_dir=tmp_path)
+    session = store.create_session("Math", None)
+    store.load_session(session.session_id)
+    ops = {(r["store"], r["op"]) for r in STORE_LATENCY.summary()}
+    assert {("SessionStore", "save_session"), ("SessionStore", "load_session")} <= ops
+
+
+def test_metrics_endpoint_serves_prometheus_and_json() -> None:
+    LLM_REQUESTS.inc(task="probe", model="m", outcome="error")
+    server = start_metrics_server(0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        text = httpx.get(base + "/metrics").text
+        assert 'llm_requests_total{task="probe",model="m",outcome="error"}' in text
+        data = httpx.get(base + "/metrics.json").json()
+        assert any(s["task"] == "probe" for s in data["llm_requests_total"])
+        assert httpx.get(base + "/nope").status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+
+from ai_tutor.devtools.stub_server import StubConfig, StubServer
+from ai_tutor.llm import response_cache
+from ai_tutor.llm.providers import reset_llm_clients
+from ai_tutor.services import quiz as quiz_module
+from ai_tutor.services.quiz import (
+    MCQQuestion,
+    MCQQuiz,
+    QuizStreamParser,
+    _plan_shards,
+    generate_mcq_quiz,
+    read_quiz_shard_size,
+    stream_mcq_quiz,
+)
+
+
+def _question(text: str, correct_index: int = 0) -> dict:
+    return {"question": text, "options": ["a", "b", "c", "d"], "correct_index": correct_index, "explanation": "because"}
+
+
+class _ShardProvider:
+    """Answers each shard by its focus line; records which replies were invalidated."""
+
+    def __init__(self, replies: dict) -> None:
+        self.replies = replies
+        self.invalidated = []
+
+    def generate(self, messages, temperature=0, task="default", json_mode=False):
+        user = messages[-1]["content"]
+        for focus, reply in self.replies.items():
+            if f"Focus: {focus}" in user:
+                if isinstance(reply, Exception):
+                    raise reply
+                return reply
+        raise AssertionError("unexpected prompt")
+
+    def invalidate_cached(self, messages) -> None:
+        self.invalidated.append(messages)
+
+
+def test_shard_plan_and_setting() -> None:
+    assert _plan_shards(10, 3) == [3, 3, 2, 2]
+    assert _plan_shards(5, 5) == [5]
+    assert read_quiz_shard_size({}) == 0
+    assert read_quiz_shard_size({"QUIZ_SHARD_SIZE": "3"}) == 3
+    assert read_quiz_shard_size({"QUIZ_SHARD_SIZE": "many"}) == 0
+
+
+def test_shards_are_merged_deduplicated_and_validated_per_question(monkeypatch) -> None:
+    focuses = quiz_module.SHARD_FOCUSES
+    provider = _ShardProvider(
+        {
+            focuses[0]: json.dumps({"questions": [_question("What is 1/2?"), _question("Broken", correct_index=7)]}),
+            # Same question with different case and punctuation is dropped
+            focuses[1]: "Sure! " + json.dumps({"questions": [_question("what is 1/2"), _question("What is 3/4?")]}),
+            focuses[2]: RuntimeError("upstream failed"),
+        }
+    )
+    monkeypatch.setattr(quiz_module, "get_llm_provider", lambda: provider)
+
+    quiz = generate_mcq_quiz("Math", "Fractions", [], num_questions=6, shard_size=2)
+    assert [q.question for q in quiz.questions] == ["What is 1/2?", "What is 3/4?"]
+    assert quiz.subject == "Math" and quiz.topic == "Fractions"
+    assert provider.invalidated == []
+
+
+def test_sharded_quiz_runs_shards_concurrently_against_stub(monkeypatch) -> None:
+    server = StubServer(StubConfig(latency_ms=300, latency_dist="fixed", tokens_per_sec=0))
+    monkeypatch.setenv("AI_TUTOR_STUB_URL", server.start())
+    monkeypatch.setenv("LLM_RESPONSE_CACHE", "off")
+    reset_llm_clients()
+    try:
+        started = time.monotonic()
+        quiz = generate_mcq_quiz("Math", "Fractions", [], num_questions=10, shard_size=3)
+        elapsed = time.monotonic() - started
+    finally:
+        reset_llm_clients()
+        server.stop()
+    assert len(quiz.questions) == 10
+    assert len({q.question for q in quiz.questions}) == 10
+    # Four shards of ~0.3s each would take ~1.2s one after another
+    assert elapsed < 0.9
+
+
+def test_stream_parser_returns_each_question_when_its_object_closes() -> None:
+    tricky = _question('Which is "bigger": {1/2} or [1/3]?')
+    text = "```json\n" + json.dumps({"subject": "Math", "questions": [tricky, _question("Q2")], "meta": {}}) + "\n```"
+    parser = QuizStreamParser()
+    seen = []
+    for i in range(0, len(text), 5):
+        seen.extend((i, item["question"]) for item in parser.feed(text[i : i + 5]))
+    assert [q for _, q in seen] == [tricky["question"], "Q2"]
+    # The first question is available before the second one has been written
+    assert seen[0][0] < text.index('"Q2"')
+    assert parser.text == text
+
+
+def test_stream_yields_questions_before_the_quiz_against_stub(monkeypatch) -> None:
+    server = StubServer(StubConfig(latency_ms=1, latency_dist="fixed", tokens_per_sec=0))
+    monkeypatch.setenv("AI_TUTOR_STUB_URL", server.start())
+    monkeypatch.setenv("LLM_RESPONSE_CACHE", "off")
+    reset_llm_clients()
+    try:
+        items = list(stream_mcq_quiz("Math", "Fractions", [], num_questions=3))
+    finally:
+        reset_llm_clients()
+        server.stop()
+    assert [type(item) for item in items] == [MCQQuestion] * 3 + [MCQQuiz]
+    quiz = items[-1]
+    assert quiz.questions == items[:3] and quiz.topic == "Fractions" and quiz.meta.topic_used
+
+
+def test_stream_falls_back_to_the_parsed_reply_when_no_question_was_streamed(monkeypatch) -> None:
+    class _Provider(_ShardProvider):
+        def stream(self, messages, temperature=0, task="default", json_mode=False):
+            yield json.dumps({"questions": [_question("What is 2/4?"), _question("Broken", correct_index=9)]})
+
+    class _BlindParser(QuizStreamParser):
+        # Stands in for a reply shape the incremental scanner does not recognise
+        def feed(self, chunk):
+            super().feed(chunk)
+            return []
+
+    monkeypatch.setattr(quiz_module, "get_llm_provider", lambda: _Provider({}))
+    monkeypatch.setattr(quiz_module, "QuizStreamParser", _BlindParser)
+    items = list(stream_mcq_quiz("Math", "Fractions", [], num_questions=1))
+    assert [type(item) for item in items] == [MCQQuestion, MCQQuiz]
+    assert [q.question for q in items[-1].questions] == ["What is 2/4?"]
+
+
+def _quiz_calls(server: StubServer) -> int:
+    return server.counters.requests.get("/v1/chat/completions", 0)
+
+
+def test_streamed_quizzes_use_the_response_cache_and_coalesce(tmp_path, monkeypatch) -> None:
+    server = StubServer(StubConfig(latency_ms=200, latency_dist="fixed", tokens_per_sec=0))
+    monkeypatch.setenv("AI_TUTOR_STUB_URL", server.start())
+    monkeypatch.setenv("LLM_RESPONSE_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(response_cache, "_default_cache", None)
+    reset_llm_clients()
+    try:
+        # Two identical quizzes at once: the second waits for the first stream's reply
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(list(stream_mcq_quiz("Math", "Ratios", [], num_questions=3))))
+            for _ in range(2)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+        assert _quiz_calls(server) == 1
+        assert [len(items) for items in results] == [4, 4]
+
+        # A repeat a moment later is replayed from the cache
+        repeat = list(stream_mcq_quiz("Math", "Ratios", [], num_questions=3))
+        assert _quiz_calls(server) == 1
+        assert [q.question for q in repeat[-1].questions] == [q.question for q in results[0][-1].questions]
+    finally:
+        reset_llm_clients()
+        server.stop()
@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+
+from ai_tutor.services.quiz_store import QuizResult, QuizStore
+
+
+def _result(session_id: str, quiz_id: str, correct: int) -> QuizResult:
+    return QuizResult(
+        session_id=session_id,
+        quiz_id=quiz_id,
+        topic="Algebra",
+        total_questions=3,
+        correct_answers=correct,
+        selected_indices=[0, 1, 2],
+        incorrect_indices=list(range(3 - correct)),
+    )
+
+
+def test_results_are_listed_per_session_with_latest_lookup(tmp_path: Path) -> None:
+    store = QuizStore(base_dir=tmp_path)
+    store.save_result(_result("s1", "q1", 1))
+    store.save_result(_result("s1", "q2", 2))
+    store.save_result(_result("s2", "q3", 3))
+    store.save_result(_result("s1", "q1", 3))
+
+    assert [r["quiz_id"] for r in store.list_results(session_id="s1")] == ["q2", "q1"]
+    assert len(store.list_results()) == 3
+    assert store.latest_result("s1", "q1")["correct_answers"] == 3
+    assert store.latest_result("s1", "missing") is None
+
+
+def test_legacy_flat_results_are_migrated(tmp_path: Path) -> None:
+    legacy_dir = tmp_path / "quiz_results"
+    legacy_dir.mkdir(parents=True)
+    payload = {"session_id": "s1", "quiz_id": "q1", "topic": "T", "total_questions": 1, "correct_answers": 0,
+               "selected_indices": [1], "incorrect_indices": [0]}
+    (legacy_dir / "s1__q1.json").write_text(json.dumps(payload), encoding="utf-8")
+
+    store = QuizStore(base_dir=tmp_path)
+    assert store.latest_result("s1", "q1")["incorrect_indices"] == [0]
+    assert not (legacy_dir / "s1__q1.json").exists()
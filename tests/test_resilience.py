@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from ai_tutor.llm.resilience import CircuitOpenError, call_with_policy, get_policy, reset_resilience, resilience_stats
+from ai_tutor.services.limiter import SPECULATIVE, priority_for, speculative
+
+
+class _Unavailable(Exception):
+    status_code = 503
+
+
+class _BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.setenv("LLM_TEST_BACKOFF_BASE", "0")
+    reset_resilience()
+    yield
+    reset_resilience()
+
+
+def test_policy_env_overrides(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_QUIZ_TIMEOUT", "12.5")
+    assert get_policy("quiz").timeout == 12.5
+    assert get_policy("quiz").attempts == 3
+
+
+def test_retryable_errors_are_retried_with_the_task_timeout(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_TEST_ATTEMPTS", "3")
+    monkeypatch.setenv("LLM_TEST_TIMEOUT", "7")
+    seen = []
+
+    def flaky(timeout):
+        seen.append(timeout)
+        if len(seen) < 3:
+            raise _Unavailable()
+        return "ok"
+
+    assert call_with_policy("test", flaky) == "ok"
+    assert seen == [7.0, 7.0, 7.0]
+    assert resilience_stats()["tasks"]["test"]["retries"] == 2
+
+    calls = []
+    with pytest.raises(_BadRequest):
+        call_with_policy("test", lambda timeout: calls.append(1) or (_ for _ in ()).throw(_BadRequest()))
+    assert len(calls) == 1
+
+
+def test_circuit_breaker_fails_fast_then_probes(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_TEST_ATTEMPTS", "1")
+    monkeypatch.setenv("LLM_QUIZ_ATTEMPTS", "1")
+    monkeypatch.setenv("LLM_BREAKER_THRESHOLD", "2")
+    monkeypatch.setenv("LLM_BREAKER_RESET", "0.1")
+
+    def down(timeout):
+        raise _Unavailable()
+
+    # Failures from different tasks count toward the endpoint's one breaker
+    for task in ("test", "quiz"):
+        with pytest.raises(_Unavailable):
+            call_with_policy(task, down, endpoint="http://llm")
+    called = []
+    with pytest.raises(CircuitOpenError):
+        call_with_policy("test", lambda timeout: called.append(1), endpoint="http://llm")
+    assert called == []
+    assert resilience_stats()["breakers"]["http://llm"] == "open"
+
+    time.sleep(0.15)
+    assert call_with_policy("test", lambda timeout: "back", endpoint="http://llm") == "back"
+    assert resilience_stats()["breakers"]["http://llm"] == "closed"
+
+
+def test_hedged_request_wins_when_first_is_slow(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_TEST_HEDGE", "1")
+    monkeypatch.setenv("LLM_TEST_HEDGE_MIN_SAMPLES", "1")
+    monkeypatch.setenv("LLM_TEST_HEDGE_MIN_DELAY", "0.05")
+    assert call_with_policy("test", lambda timeout: "warm") == "warm"
+
+    release = threading.Event()
+    calls = []
+
+    def sometimes_slow(timeout):
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return "slow"
+        return "fast"
+
+    started = time.perf_counter()
+    assert call_with_policy("test", sometimes_slow) == "fast"
+    assert time.perf_counter() - started < 1
+    release.set()
+    stats = resilience_stats()["tasks"]["test"]
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_hedged_attempts_keep_the_caller_context_and_close_the_loser(monkeypatch) -> None:
+    monkeypatch.setenv("LLM_TEST_HEDGE", "1")
+    monkeypatch.setenv("LLM_TEST_HEDGE_MIN_SAMPLES", "1")
+    monkeypatch.setenv("LLM_TEST_HEDGE_MIN_DELAY", "0.05")
+    assert call_with_policy("test", lambda timeout: "warm") == "warm"
+
+    class _Reply:
+        def __init__(self, name: str) -> None:
+            self.name = name
+            self.closed = threading.Event()
+
+        def close(self) -> None:
+            self.closed.set()
+
+    replies = []
+    priorities = []
+
+    def attempt(timeout):
+        priorities.append(priority_for("quiz"))
+        reply = _Reply("slow" if not replies else "fast")
+        replies.append(reply)
+        if reply.name == "slow":
+            time.sleep(0.3)
+        return reply
+
+    with speculative():
+        winner = call_with_policy("test", attempt)
+    assert winner.name == "fast" and not winner.closed.is_set()
+    assert priorities == [SPECULATIVE, SPECULATIVE]
+    # The slower attempt finishes later and is closed instead of holding its connection
+    assert replies[0].closed.wait(2)
@@ -0,0 +1,64 @@
+import time
+from types import SimpleNamespace
+
+from ai_tutor.llm.capabilities import CapabilityCache
+from ai_tutor.llm.providers import OpenAIProvider
+from ai_tutor.llm.response_cache import ResponseCache, make_cache_key
+
+
+def _provider(cache: ResponseCache):
+    calls = []
+
+    def create(**payload):
+        calls.append(payload)
+        time.sleep(0.01)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"reply {len(calls)}"))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    provider = OpenAIProvider(
+        client, "gpt-4o-mini", base_url="http://llm", capabilities=CapabilityCache(), response_cache=cache
+    )
+    return provider, calls
+
+
+def test_deterministic_calls_are_served_from_disk(tmp_path) -> None:
+    messages = [{"role": "user", "content": "Make a quiz"}]
+    provider, calls = _provider(ResponseCache(tmp_path / "cache.db"))
+    assert provider.generate(messages, temperature=0) == "reply 1"
+    assert provider.generate(messages, temperature=0) == "reply 1"
+    assert len(calls) == 1
+
+    # Non-zero temperature and explicit opt-out always reach the model
+    provider.generate(messages, temperature=0.2)
+    provider.generate(messages, temperature=0, use_cache=False)
+    assert len(calls) == 3
+
+    # Another worker (or a restart) shares the file
+    cache = ResponseCache(tmp_path / "cache.db")
+    other, other_calls = _provider(cache)
+    assert other.generate(messages, temperature=0) == "reply 1"
+    assert other_calls == []
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 0 and stats["latency_saved"] > 0
+
+    other.invalidate_cached(messages)
+    assert other.generate(messages, temperature=0) == "reply 1"
+    assert len(other_calls) == 1
+
+
+def test_lru_bound_and_ttl(tmp_path) -> None:
+    cache = ResponseCache(tmp_path / "cache.db", max_entries=2, ttl_seconds=60)
+    keys = [make_cache_key("m", [{"role": "user", "content": str(i)}], {}) for i in range(3)]
+    cache.put(keys[0], "m", "a")
+    time.sleep(0.01)
+    cache.put(keys[1], "m", "b")
+    time.sleep(0.01)
+    assert cache.get(keys[0]) == "a"  # now more recently used than keys[1]
+    time.sleep(0.01)
+    cache.put(keys[2], "m", "c")
+    assert len(cache) == 2
+    assert cache.get(keys[1]) is None
+
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert cache.get(keys[0]) is None
@@ -1,6 +1,10 @@
+import threading
+import time
 from pathlib import Path
 
-from ai_tutor.services.session_store import ChatMessage, SessionStore
+from ai_tutor.services.fileio import file_lock
+from ai_tutor.services.session_index import SessionIndex
+from ai_tutor.services.session_store import ChatMessage, SessionConflictError, SessionStore
 
 
 def test_create_and_persist_session(tmp_path: Path) -> None:
@@ -25,3 +29,203 @@ def test_list_sessions(tmp_path: Path) -> None:
     assert s1.session_id in session_ids and s2.session_id in session_ids
 
 
+def test_append_log_mode_appends_without_rewriting_header(tmp_path: Path) -> None:
+    store = SessionStore(base_dir=tmp_path, append_log=True)
+    session = store.create_session(subject="Chemistry", goal=None)
+    header = tmp_path / "sessions" / f"{session.session_id}.json"
+    before = header.read_text(encoding="utf-8")
+
+    store.append_messages(
+        session.session_id,
+        [ChatMessage(role="user", content="What is a mole?"), ChatMessage(role="assistant", content="A unit.")],
+    )
+    assert header.read_text(encoding="utf-8") == before
+    loaded = store.load_session(session.session_id)
+    assert [m.role for m in loaded.messages] == ["user", "assistant"]
+
+    store.compact_session(session.session_id)
+    assert not (tmp_path / "sessions" / f"{session.session_id}.jsonl").exists()
+    assert len(store.load_session(session.session_id).messages) == 2
+
+
+def test_append_log_mode_reads_legacy_json(tmp_path: Path) -> None:
+    legacy = SessionStore(base_dir=tmp_path)
+    session = legacy.create_session(subject="Biology", goal="Cells")
+    legacy.append_message(session.session_id, ChatMessage(role="user", content="Hi"))
+
+    store = SessionStore(base_dir=tmp_path, append_log=True)
+    store.append_message(session.session_id, ChatMessage(role="assistant", content="Hello"))
+    loaded = store.load_session(session.session_id)
+    assert [m.content for m in loaded.messages] == ["Hi", "Hello"]
+
+
+def test_manifest_lookup_pagination_and_rebuild(tmp_path: Path) -> None:
+    store = SessionStore(base_dir=tmp_path)
+    ids = [store.create_session(subject=f"Subject {i}", goal=None).session_id for i in range(5)]
+    assert store.find_session_by_subject_goal("Subject 3", None) == ids[3]
+    assert store.find_session_by_subject_goal("Subject 3", "other goal") is None
+
+    page = store.list_sessions(sort_by="created_at", descending=False, offset=1, limit=2)
+    assert [it["session_id"] for it in page] == ids[1:3]
+
+    store.delete_session(ids[0])
+    (tmp_path / "session_index.jsonl").unlink()
+    assert SessionStore(base_dir=tmp_path).count_sessions() == 4
+
+
+def test_load_cache_hits_and_external_change(tmp_path: Path) -> None:
+    store = SessionStore(base_dir=tmp_path, append_log=True)
+    session = store.create_session(subject="Art", goal=None)
+    store.append_messages(session.session_id, [ChatMessage(role="user", content="Hi")])
+
+    store.load_session(session.session_id)
+    loaded = store.load_session(session.session_id)
+    assert store.cache_stats()["misses"] == 0
+    assert store.cache_stats()["hits"] == 2
+    loaded.messages.append(ChatMessage(role="user", content="not persisted"))
+    assert len(store.load_session(session.session_id).messages) == 1
+
+    # A write by another process (separate store instance) invalidates the entry
+    other = SessionStore(base_dir=tmp_path, append_log=True)
+    other.append_messages(session.session_id, [ChatMessage(role="assistant", content="Hello")])
+    assert [m.content for m in store.load_session(session.session_id).messages] == ["Hi", "Hello"]
+    assert store.cache_stats()["misses"] == 1
+
+
+def test_stale_save_raises_conflict_and_append_merges(tmp_path: Path) -> None:
+    store = SessionStore(base_dir=tmp_path)
+    session = store.create_session(subject="Music", goal=None)
+    tab_a = store.load_session(session.session_id)
+    tab_b = store.load_session(session.session_id)
+
+    tab_a.messages.append(ChatMessage(role="user", content="from tab A"))
+    store.save_session(tab_a)
+    tab_b.messages.append(ChatMessage(role="user", content="from tab B"))
+    try:
+        store.save_session(tab_b)
+    except SessionConflictError:
+        pass
+    else:  # pragma: no cover - safety
+        assert False, "Expected SessionConflictError for a stale save"
+
+    store.append_messages(session.session_id, [ChatMessage(role="user", content="from tab B")])
+    contents = [m.content for m in store.load_session(session.session_id).messages]
+    assert contents == ["from tab A", "from tab B"]
+
+
+def test_archive_inactive_and_rehydrate(tmp_path: Path) -> None:
+    store = SessionStore(base_dir=tmp_path, append_log=True)
+    session = store.create_session(subject="Geography", goal="Capitals")
+    store.append_messages(session.session_id, [ChatMessage(role="user", content="Capital of Peru?" * 50)])
+
+    report = store.archive_inactive(older_than=60, now=time.time() + 3600)
+    assert report["archived"] == 1
+    assert report["bytes_after"] < report["bytes_before"]
+    assert not (tmp_path / "sessions" / f"{session.session_id}.json").exists()
+    assert store.find_session_by_subject_goal("Geography", "Capitals") == session.session_id
+
+    loaded = store.load_session(session.session_id)
+    assert loaded.messages[0].content.startswith("Capital of Peru?")
+    assert (tmp_path / "sessions" / f"{session.session_id}.json").exists()
+    assert not list((tmp_path / "sessions_cold").iterdir())
+
+
+def test_load_tail_and_message_pages(tmp_path: Path) -> None:
+    store = SessionStore(base_dir=tmp_path, append_log=True, cache_size=0)
+    session = store.create_session(subject="Logic", goal=None)
+    session.messages = [ChatMessage(role="user", content=f"h{i}") for i in range(3)]
+    store.save_session(session)
+    store.append_messages(session.session_id, [ChatMessage(role="user", content=f"l{i}") for i in range(4)])
+
+    assert [m.content for m in store.load_tail(session.session_id, 2)] == ["l2", "l3"]
+    assert [m.content for m in store.load_tail(session.session_id, 5)] == ["h1", "h2", "l0", "l1", "l2", "l3"][-5:]
+    assert [m.content for m in store.load_messages(session.session_id, offset=2, limit=3)] == ["h2", "l0", "l1"]
+    assert len(store.load_tail(session.session_id, 100)) == 7
+
+
+def test_chat_message_reads_as_provider_dict_and_view_is_zero_copy(tmp_path: Path) -> None:
+    message = ChatMessage(role="user", content="Hi")
+    assert dict(message) == {"role": "user", "content": "Hi"}
+    assert message.get("content") == "Hi" and message.get("language") is None
+
+    store = SessionStore(base_dir=tmp_path)
+    session = store.create_session(subject="Latin", goal=None)
+    session.messages.extend(ChatMessage(role="assistant", content=str(i)) for i in range(5))
+    view = session.view()[1:4]
+    assert [m["content"] for m in view] == ["1", "2", "3"]
+    assert view[0] is session.messages[1]
+
+
+def test_index_keeps_every_record_across_concurrent_compactions(tmp_path: Path) -> None:
+    path = tmp_path / "session_index.jsonl"
+    writers = [SessionIndex(path) for _ in range(4)]
+    for i in range(4):
+        writers[0].put(f"s{i}", f"Subject {i}", None, "en", 0.0, 0.0, 0)
+
+    def touch_many(index: SessionIndex, session_id: str) -> None:
+        for n in range(150):
+            index.touch(session_id, float(n), added=1)
+
+    # Two threads share each index instance; the journal passes the compaction threshold repeatedly
+    threads = [threading.Thread(target=touch_many, args=(writers[i % 4], f"s{i % 4}")) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for index in writers + [SessionIndex(path)]:
+        assert [index.get(f"s{i}")["message_count"] for i in range(4)] == [300] * 4
+        assert index.find("Subject 2", None) == "s2"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_file_lock_stays_exclusive_when_the_holder_unlinks_it(tmp_path: Path) -> None:
+    lock = tmp_path / "s.lock"
+    inside = []
+    overlaps = []
+
+    def worker() -> None:
+        for _ in range(50):
+            with file_lock(lock):
+                inside.append(1)
+                if len(inside) > 1:
+                    overlaps.append(1)
+                time.sleep(0.0005)
+                inside.pop()
+                # As archive_inactive and delete_session do
+                lock.unlink(missing_ok=True)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert overlaps == []
+
+
+def test_appends_survive_concurrent_archiving(tmp_path: Path) -> None:
+    store = SessionStore(base_dir=tmp_path, append_log=True)
+    session = store.create_session(subject="Astronomy", goal=None)
+    errors = []
+    done = threading.Event()
+
+    def append() -> None:
+        try:
+            for i in range(100):
+                store.append_messages(session.session_id, [ChatMessage(role="user", content=f"m{i}")])
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+        finally:
+            done.set()
+
+    def archive() -> None:
+        while not done.is_set():
+            store.archive_inactive(older_than=0, now=time.time() + 3600)
+
+    threads = [threading.Thread(target=append), threading.Thread(target=archive)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert [m.content for m in store.load_session(session.session_id).messages] == [f"m{i}" for i in range(100)]
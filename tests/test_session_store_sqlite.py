@@ -0,0 +1,61 @@
+import time
+from pathlib import Path
+
+from ai_tutor.services.session_store import ChatMessage, SessionStore
+from ai_tutor.services.session_store_sqlite import SqliteSessionStore
+
+
+def test_sqlite_store_roundtrip(tmp_path: Path) -> None:
+    store = SqliteSessionStore(base_dir=tmp_path)
+    session = store.create_session(subject="Math", goal="Fractions")
+    store.append_messages(
+        session.session_id,
+        [ChatMessage(role="user", content="1/2 + 1/4?"), ChatMessage(role="assistant", content="3/4")],
+    )
+    loaded = store.load_session(session.session_id)
+    assert [m.content for m in loaded.messages] == ["1/2 + 1/4?", "3/4"]
+    assert store.find_session_by_subject_goal("Math", "Fractions") == session.session_id
+    assert store.list_sessions()[0]["message_count"] == 2
+    assert store.delete_session(session.session_id)
+    assert store.count_sessions() == 0
+
+
+def test_sqlite_store_imports_json_sessions(tmp_path: Path) -> None:
+    json_store = SessionStore(base_dir=tmp_path, append_log=True)
+    session = json_store.create_session(subject="Physics", goal=None)
+    json_store.append_message(session.session_id, ChatMessage(role="user", content="What is inertia?"))
+
+    store = SqliteSessionStore(base_dir=tmp_path)
+    assert store.import_json_sessions(tmp_path / "sessions") == 1
+    loaded = store.load_session(session.session_id)
+    assert loaded.subject == "Physics"
+    assert loaded.messages[0].content == "What is inertia?"
+
+
+def test_import_includes_archived_sessions_and_pending_log_entries(tmp_path: Path) -> None:
+    json_store = SessionStore(base_dir=tmp_path, append_log=True)
+    archived = json_store.create_session(subject="History", goal=None)
+    json_store.append_messages(archived.session_id, [ChatMessage(role="user", content="Who was Cyrus?")])
+    assert json_store.archive_inactive(older_than=60, now=time.time() + 3600)["archived"] == 1
+    logged = json_store.create_session(subject="Chemistry", goal=None)
+    json_store.append_messages(
+        logged.session_id, [ChatMessage(role="user", content="What is pH?"), ChatMessage(role="assistant", content="Acidity.")]
+    )
+    # The second session's messages are still only in its append-only log
+    assert (tmp_path / "sessions" / f"{logged.session_id}.jsonl").exists()
+    assert not list((tmp_path / "sessions").glob(f"{archived.session_id}.json"))
+
+    store = SqliteSessionStore(base_dir=tmp_path)
+    assert store.import_json_sessions(tmp_path / "sessions") == 2
+    assert [m.content for m in store.load_session(archived.session_id).messages] == ["Who was Cyrus?"]
+    assert [m.content for m in store.load_session(logged.session_id).messages] == ["What is pH?", "Acidity."]
+
+
+def test_update_summary_round_trips(tmp_path) -> None:
+    store = SqliteSessionStore(base_dir=tmp_path)
+    session = store.create_session("Math", None)
+    store.append_messages(session.session_id, [ChatMessage(role="user", content="hi")])
+    store.update_summary(session.session_id, "Learner said hi.", 1)
+    loaded = store.load_session(session.session_id)
+    assert (loaded.summary, loaded.summary_upto) == ("Learner said hi.", 1)
+    assert [m.content for m in loaded.messages] == ["hi"]
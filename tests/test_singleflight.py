@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from ai_tutor.llm.capabilities import CapabilityCache
+from ai_tutor.llm.providers import OpenAIProvider
+from ai_tutor.services.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution() -> None:
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        started.set()
+        release.wait(2)
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        leader = pool.submit(flight.do, "k", slow)
+        started.wait(2)
+        followers = [pool.submit(flight.do, "k", slow) for _ in range(4)]
+        while flight.stats()["coalesced"] < 4:
+            time.sleep(0.005)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+    assert results == ["answer"] * 5
+    assert runs == [1]
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+    # Finished calls are not cached
+    assert flight.do("k", lambda: "fresh") == "fresh"
+
+
+def test_followers_of_an_abandoned_flight_run_their_own_call() -> None:
+    flight = SingleFlight()
+    held = flight.begin("k")
+    assert held is not None and flight.begin("k") is None
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        follower = pool.submit(flight.do, "k", lambda: "own")
+        while flight.stats()["coalesced"] < 1:
+            time.sleep(0.005)
+        # e.g. a stream closed before it finished: its partial reply is not shared
+        flight.end("k", held, abandoned=True)
+        assert follower.result(timeout=2) == "own"
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter() -> None:
+    flight = SingleFlight()
+
+    async def run():
+        async def boom():
+            await asyncio.sleep(0.05)
+            raise ValueError("upstream failed")
+
+        return await asyncio.gather(*(flight.ado("k", boom) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert [type(e) for e in errors] == [ValueError] * 3
+    assert flight.stats()["executed"] == 1 and flight.stats()["coalesced"] == 2
+
+
+def test_provider_coalesces_identical_prompts() -> None:
+    calls = []
+
+    def create(**payload):
+        calls.append(payload)
+        time.sleep(0.2)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="greeting"))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    provider = OpenAIProvider(client, "gpt-4o-mini", base_url="http://llm", capabilities=CapabilityCache())
+    messages = [{"role": "user", "content": "Start a Mathematics lesson"}]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        replies = list(pool.map(lambda _: provider.generate(messages), range(4)))
+    assert replies == ["greeting"] * 4
+    assert len(calls) == 1
@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import ai_tutor.graph.lang_tutor as lang_tutor
+from ai_tutor.llm import providers
+from ai_tutor.llm.capabilities import CapabilityCache
+from ai_tutor.llm.context import count_tokens
+from ai_tutor.llm.providers import OpenAIProvider
+from ai_tutor.services.limiter import estimate_prompt_tokens
+from ai_tutor.services.metrics import LLM_TOKENS, get_registry, llm_task_summary
+from ai_tutor.services.session_store import ChatMessage, SessionStore
+
+
+def test_provider_stream_yields_delta_content() -> None:
+    def chunk(text):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    calls = []
+
+    def create(**payload):
+        calls.append(payload)
+        return iter([chunk("Hel"), chunk(None), SimpleNamespace(choices=[]), chunk("lo")])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    provider = OpenAIProvider(client, "gpt-4o-mini", base_url="http://llm", capabilities=CapabilityCache())
+    assert list(provider.stream([{"role": "user", "content": "hi"}])) == ["Hel", "lo"]
+    assert calls[0]["stream"] is True
+
+
+def test_provider_stream_settles_the_limiter_permit_with_actual_usage(monkeypatch) -> None:
+    settled = []
+
+    class _Permit:
+        def settle(self, tokens):
+            settled.append(tokens)
+
+    class _Limiter:
+        @contextmanager
+        def slot(self, task="default", tokens=0):
+            yield _Permit()
+
+    monkeypatch.setattr(providers, "get_limiter", lambda name: _Limiter())
+
+    def chunk(text):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+    replies = [
+        [chunk("Hel"), chunk("lo")],
+        # Endpoints that report usage send it on a last chunk without choices
+        [chunk("Hi"), SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=11, completion_tokens=3))],
+    ]
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **payload: iter(replies.pop(0)))))
+    provider = OpenAIProvider(client, "gpt-4o-mini", base_url="http://llm", capabilities=CapabilityCache())
+    messages = [{"role": "user", "content": "hi"}]
+    assert "".join(provider.stream(messages, use_cache=False)) == "Hello"
+    assert "".join(provider.stream(messages, use_cache=False)) == "Hi"
+    assert settled == [estimate_prompt_tokens(messages) + 2, 14]
+
+
+def test_stream_session_yields_tokens_and_persists_reply(tmp_path, monkeypatch) -> None:
+    fake = GenericFakeChatModel(messages=iter([AIMessage(content="Derivatives measure change")]))
+    monkeypatch.setattr(lang_tutor, "get_langchain_chat", lambda: fake)
+    store = SessionStore(base_dir=tmp_path, append_log=True)
+    graph = lang_tutor.LangTutorGraph(store=store)
+    session = store.create_session("Math", None)
+    store.append_messages(session.session_id, [ChatMessage(role="system", content="Be helpful")])
+
+    stream = graph.stream_session(session.session_id, "What is a derivative?")
+    first = next(stream)
+    assert first == "Derivatives"
+    # Nothing is persisted until the reply is complete
+    assert len(store.load_session(session.session_id).messages) == 1
+
+    assert first + "".join(stream) == "Derivatives measure change"
+    stored = store.load_session(session.session_id).messages
+    assert [(m.role, m.content) for m in stored[1:]] == [
+        ("user", "What is a derivative?"),
+        ("assistant", "Derivatives measure change"),
+    ]
+
+
+def test_streamed_tutoring_turn_records_completion_tokens(tmp_path, monkeypatch) -> None:
+    get_registry().clear()
+    fake = GenericFakeChatModel(messages=iter([AIMessage(content="Integrals add up small pieces")]))
+    monkeypatch.setattr(lang_tutor, "get_langchain_chat", lambda: fake)
+    store = SessionStore(base_dir=tmp_path)
+    graph = lang_tutor.LangTutorGraph(store=store)
+    session = store.create_session("Math", None)
+
+    assert "".join(graph.stream_session(session.session_id, "What is an integral?")) == "Integrals add up small pieces"
+    # The streamed reply carries no usage metadata, so its text is counted
+    model = "GenericFakeChatModel"
+    assert LLM_TOKENS.value(task="tutoring", model=model, kind="completion") == count_tokens("Integrals add up small pieces")
+    assert LLM_TOKENS.value(task="tutoring", model=model, kind="prompt") > 0
+    rows = {(r["task"], r["model"]): r for r in llm_task_summary()}
+    assert rows[("tutoring", model)]["tokens_per_sec"] > 0
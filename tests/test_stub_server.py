@@ -0,0 +1,84 @@
+import httpx
+import pytest
+
+from ai_tutor.devtools.stub_server import StubConfig, StubServer
+from ai_tutor.llm.providers import get_llm_provider, read_llm_configuration, reset_llm_clients
+from ai_tutor.llm.resilience import reset_resilience
+from ai_tutor.services.quiz import generate_mcq_quiz
+from ai_tutor.services.voice import transcribe_wav_to_text
+from ai_tutor.services.web_search import is_tavily_configured, tavily_search, tavily_search_url
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubServer(StubConfig(latency_ms=1, latency_dist="fixed", tokens_per_sec=0, reply_tokens=8, seed=1))
+    url = server.start()
+    monkeypatch.setenv("AI_TUTOR_STUB_URL", url)
+    monkeypatch.setenv("LLM_RESPONSE_CACHE", "off")
+    reset_llm_clients()
+    reset_resilience()
+    try:
+        yield server
+    finally:
+        reset_llm_clients()
+        server.stop()
+
+
+def test_stub_url_points_llm_and_search_at_the_stub(monkeypatch) -> None:
+    env = {"AI_TUTOR_STUB_URL": "http://127.0.0.1:9999/", "OPENAI_BASE_URL": "https://api.openai.com/v1"}
+    cfg = read_llm_configuration(env)
+    assert cfg.base_url == "http://127.0.0.1:9999/v1"
+    assert cfg.model == "stub-model"
+    assert is_tavily_configured(env)
+    assert tavily_search_url(env) == "http://127.0.0.1:9999/search"
+    assert tavily_search_url({"TAVILY_BASE_URL": "http://search.local"}) == "http://search.local/search"
+
+
+def test_provider_generate_and_stream_against_stub(stub) -> None:
+    provider = get_llm_provider()
+    messages = [{"role": "user", "content": "What is a fraction?"}]
+    text = provider.generate(messages, use_cache=False)
+    assert text.startswith("(stub reply to: What is a fraction?)")
+    assert "".join(provider.stream(messages)) == text
+
+
+def test_quiz_search_and_transcription_against_stub(stub) -> None:
+    quiz = generate_mcq_quiz("Math", "Fractions", [], num_questions=3, difficulty="easy")
+    assert len(quiz.questions) == 3 and quiz.topic == "Fractions"
+
+    results = tavily_search("photosynthesis", max_results=2)
+    assert [r["url"] for r in results] == [
+        "https://example.org/photosynthesis/1",
+        "https://example.org/photosynthesis/2",
+    ]
+    assert transcribe_wav_to_text(b"RIFF") == "This is a stub transcription."
+
+
+def test_searches_reuse_the_shared_connection_pool(stub, monkeypatch) -> None:
+    created = []
+
+    class CountingClient(httpx.Client):
+        def __init__(self, *args, **kwargs) -> None:
+            created.append(1)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(httpx, "Client", CountingClient)
+    for query in ("cells", "atoms", "tides"):
+        assert len(tavily_search(query, max_results=1)) == 1
+    assert len(created) == 1
+
+
+def test_stub_injects_errors_and_rejects_max_tokens(stub) -> None:
+    stub.config.error_rate = 1.0
+    stub.config.error_statuses = (429,)
+    res = httpx.post(stub.base_url + "/search", json={"query": "x"})
+    assert res.status_code == 429
+
+    stub.config.error_rate = 0.0
+    stub.config.reject_max_tokens = True
+    provider = get_llm_provider()
+    # The provider learns the parameter rename from the 400 and retries with max_completion_tokens
+    assert provider.generate([{"role": "user", "content": "hi"}], max_tokens=20, use_cache=False)
+    stats = httpx.get(stub.base_url + "/stats").json()
+    assert stats["errors"] == 1
+    assert stats["requests"]["/v1/chat/completions"] == 2